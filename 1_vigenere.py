@@ -1,89 +1,388 @@
+import argparse
+import heapq
+import json
+import os
+import sys
+from bisect import bisect_left
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, lru_cache, partial
+from itertools import islice
+from operator import add
+
+import alphabets
+import cipher_io
+import instrumentation
+import ngram_model
+
 # ------------------------- РІВЕНЬ 1 -------------------------
-def prepare_text_with_positions(text):
+# Алфавіт за замовчуванням - латиниця з поведінкою, що була до появи інших алфавітів
+LATIN = alphabets.LATIN
+
+# Кількість скомпільованих ключів, що зберігаються в кеші
+KEY_CACHE_SIZE = 256
+
+# Позначка літери в шаблоні: байт 0xFF у байтовому буфері, '\xff' у рядковому
+LETTER_MARK = '\xff'
+MARK_BYTE = 0xFF
+
+
+class TextLayout:
+    """
+    Компактне представлення форматування тексту.
+
+    Зберігає оригінальний буфер, у якому кожна літера замінена позначкою 0xFF,
+    тобто маску літер і всі спеціальні символи в одному байтовому рядку
+    (1 байт на символ замість запису словника на кожен спеціальний символ).
+    Відновлення тексту виконується однією операцією % над усім буфером.
+    Буфер записаний однобайтовим кодуванням алфавіту (latin-1, cp1251, ...), а символи
+    поза ним (у тексті їх зазвичай лише кілька різних) тимчасово замінені вільними
+    символами, яким відповідають байти 0x80-0xFE.
+    """
+
+    def __init__(self, buffer, letter_count, wide_chars=None, codec='latin-1', mark=LETTER_MARK):
+        self.buffer = buffer
+        self.letter_count = letter_count
+        self.wide_chars = wide_chars or {}
+        self.codec = codec
+        self.mark = mark
+
+    def __len__(self):
+        return len(self.buffer)
+
+    @instrumentation.instrument()
+    def merge(self, letters):
+        """Вставляє літери на їхні місця у буфері"""
+        # upper() може подовжити текст (наприклад, 'ß' -> 'SS'), зайві літери відкидаються
+        letters = letters[:self.letter_count]
+        if isinstance(self.buffer, str):
+            return self.buffer.replace('%', '%%').replace(self.mark, '%c') % tuple(letters)
+
+        if isinstance(letters, str):
+            letters = letters.encode(self.codec)
+        template = self.buffer.replace(b'%', b'%%').replace(bytes([MARK_BYTE]), b'%c')
+        return decode_wide(template % tuple(letters), self.wide_chars, self.codec)
+
+
+def decode_wide(data, wide_chars, codec='latin-1'):
+    """Декодує байти буфера, повертаючи на місце символи, тимчасово замінені вільними"""
+    text = data.decode(codec)
+    for placeholder, char in wide_chars.items():
+        text = text.replace(placeholder, char)
+    return text
+
+@instrumentation.instrument()
+def split_layout(text, alphabet=LATIN):
+    """
+    Відокремлює літери тексту від його форматування
+
+    Літери визначає алфавіт: для латиниці - усе, що str.isalpha (як раніше),
+    для інших алфавітів - лише їхні літери в будь-якому регістрі.
+
+    Returns:
+        tuple: (літери у верхньому регістрі, TextLayout)
+    """
+    chars = set(text)
+    is_letter = alphabet.is_letter
+    # Символ байта 0xFF може стояти в тексті, лише якщо він літера (інакше його замінює вільний)
+    mark = alphabet.byte_chars[MARK_BYTE] if alphabet.codec else ''
+    wide = sorted(char for char in chars if char not in alphabet.encodable or (char == mark and not is_letter(char)))
+    free_chars = [char for char in alphabet.placeholders if char not in chars]
+    if not alphabet.codec or len(wide) > len(free_chars):
+        # Занадто багато різних символів для байтового буфера (або алфавіт без однобайтового кодування)
+        mark = LETTER_MARK
+        if mark in chars and not is_letter(mark):
+            mark = next(chr(code) for code in range(0xE000, 0xF900) if chr(code) not in chars)
+        letters = {ord(char): mark for char in chars if is_letter(char)}
+        raw = text.translate({ord(char): None for char in chars if not is_letter(char)})
+        return raw.upper(), TextLayout(text.translate(letters), len(raw), mark=mark)
+
+    wide_chars = dict(zip(free_chars, wide))
+    for placeholder, char in wide_chars.items():
+        text = text.replace(char, placeholder)
+    data = text.encode(alphabet.codec)
+
+    # Байт 0xFF у тексті завжди літера, тому в буфері він означає позначку літери
+    originals = [wide_chars.get(char, char) for char in alphabet.byte_chars]
+    letters = bytes(code for code in range(256) if is_letter(originals[code]))
+    raw = data.translate(None, bytes(code for code in range(256) if code not in letters))
+    buffer = data.translate(bytes.maketrans(letters, bytes([MARK_BYTE]) * len(letters)))
+
+    if not alphabet.legacy:
+        clean_text = raw.translate(alphabet.upper_bytes)
+    else:
+        # Верхній регістр літер Latin-1 може вийти за межі кодування ('ß' -> 'SS')
+        clean_text = raw.upper() if raw.isascii() else decode_wide(raw, wide_chars).upper()
+    return clean_text, TextLayout(buffer, len(raw), wide_chars, alphabet.codec)
+
+def prepare_text_with_positions(text, alphabet=LATIN):
     """
     Підготовка тексту із збереженням позицій спеціальних символів
     
     Returns:
-        tuple: (підготовлений текст, словник спеціальних символів)
+        tuple: (підготовлений текст, TextLayout з позиціями спеціальних символів)
     """
-    special_chars = {}
-    text_without_spaces = ""
-    for i, char in enumerate(text):
-        if char.isalpha():
-            text_without_spaces += char.upper()
-        else:
-            special_chars[i] = char
-    return text_without_spaces, special_chars
+    clean_text, layout = split_layout(text, alphabet)
+    if isinstance(clean_text, bytes):
+        clean_text = clean_text.decode(alphabet.codec)
+    return clean_text, layout
 
 def restore_special_chars(text, special_chars, original_length):
     """Відновлення спеціальних символів у тексті"""
-    result = ""
-    text_pos = 0
-    
-    for i in range(original_length):
-        if i in special_chars:
-            result += special_chars[i]
-        else:
-            result += text[text_pos]
-            text_pos += 1
-    return result
+    if len(special_chars) != original_length:
+        raise ValueError("Layout does not match the original text length.")
+    return special_chars.merge(text)
+
+def key_shifts(key, alphabet=LATIN):
+    """Перетворює ключ на список зсувів (0 - alphabet.size-1)"""
+    key = ''.join(char.upper() for char in key if alphabet.is_letter(char))
+    if not key:
+        raise ValueError("Key must contain at least one letter.")
+    return [alphabet.index_of(char) for char in key]
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def compile_key(key, alphabet=LATIN):
+    """
+    Скомпільований ключ: зсуви для шифрування та дешифрування
+
+    Результати зберігаються в обмеженому LRU-кеші, тому для повторюваних ключів
+    підготовка ключа не виконується повторно (статистика - compile_key.cache_info()).
+
+    Returns:
+        tuple: (зсуви для шифрування, зсуви для дешифрування)
+    """
+    shifts = tuple(key_shifts(key, alphabet))
+    return shifts, tuple(-shift % alphabet.size for shift in shifts)
+
+@instrumentation.instrument()
+def apply_shifts(clean_text, shifts, alphabet=LATIN):
+    """
+    Застосовує періодичні зсуви до чистого тексту.
+
+    Замість обробки кожного символу текст ділиться на смуги clean_text[i::len(shifts)],
+    кожна з яких має один зсув і перетворюється одним викликом translate.
+    """
+    period = len(shifts)
+    instrumentation.count('vigenere.letters_shifted', len(clean_text))
+    if isinstance(clean_text, bytes):
+        result = bytearray(len(clean_text))
+        for phase, shift in enumerate(shifts[:len(clean_text)]):
+            result[phase::period] = clean_text[phase::period].translate(alphabet.byte_shift_tables[shift])
+        return bytes(result)
+
+    if not clean_text.isalpha():
+        # Рідкісний випадок: після upper() з'явились не-літери, які лише зсувають ключ
+        tables = alphabet.shift_tables
+        return ''.join(tables[shifts[i % period]][ord(char)] for i, char in enumerate(clean_text))
+
+    result = [''] * len(clean_text)
+    for phase, shift in enumerate(shifts[:len(clean_text)]):
+        result[phase::period] = clean_text[phase::period].translate(alphabet.shift_tables[shift])
+    return ''.join(result)
 
-def vigenere_encrypt(text, key):
+@instrumentation.instrument()
+def vigenere_encrypt(text, key, alphabet=LATIN):
     """
     Шифрування тексту за допомогою шифру Віженера зі збереженням форматування
     
     Args:
         text (str): Вхідний текст для шифрування
         key (str): Ключ шифрування
+        alphabet (Alphabet): Алфавіт (за замовчуванням - латиниця)
     
     Returns:
         str: Зашифрований текст з оригінальним форматуванням
     """
+    shifts, _ = compile_key(key, alphabet)
+
     # Підготовка тексту зі збереженням спеціальних символів
-    clean_text, special_chars = prepare_text_with_positions(text)
-    key = ''.join(char.upper() for char in key if char.isalpha())
-    
-    # Розширення ключа
-    key_repeated = (key * (len(clean_text) // len(key) + 1))[:len(clean_text)]
-    
-    # Шифрування
-    encrypted = ''
-    for i in range(len(clean_text)):
-        if clean_text[i].isalpha():
-            shift = (ord(clean_text[i]) + ord(key_repeated[i]) - 2 * ord('A')) % 26
-            encrypted += chr(shift + ord('A'))
-    
-    # Відновлення форматування
-    return restore_special_chars(encrypted, special_chars, len(text))
+    clean_text, layout = split_layout(text, alphabet)
+
+    # Шифрування та відновлення форматування
+    return layout.merge(apply_shifts(clean_text, shifts, alphabet))
 
-def vigenere_decrypt(encrypted_text, key):
+@instrumentation.instrument()
+def vigenere_decrypt(encrypted_text, key, alphabet=LATIN):
     """
     Дешифрування тексту, зашифрованого шифром Віженера, зі збереженням форматування
     
     Args:
         encrypted_text (str): Зашифрований текст
         key (str): Ключ шифрування
+        alphabet (Alphabet): Алфавіт (за замовчуванням - латиниця)
     
     Returns:
         str: Розшифрований текст з оригінальним форматуванням
     """
+    _, shifts = compile_key(key, alphabet)
+
     # Підготовка тексту зі збереженням спеціальних символів
-    clean_text, special_chars = prepare_text_with_positions(encrypted_text)
-    key = ''.join(char.upper() for char in key if char.isalpha())
-    
-    # Розширення ключа
-    key_repeated = (key * (len(clean_text) // len(key) + 1))[:len(clean_text)]
-    
-    # Дешифрування
-    decrypted = ''
-    for i in range(len(clean_text)):
-        if clean_text[i].isalpha():
-            shift = (ord(clean_text[i]) - ord(key_repeated[i])) % 26
-            decrypted += chr(shift + ord('A'))
-    
-    # Відновлення форматування
-    return restore_special_chars(decrypted, special_chars, len(encrypted_text))
+    clean_text, layout = split_layout(encrypted_text, alphabet)
+
+    # Дешифрування та відновлення форматування
+    return layout.merge(apply_shifts(clean_text, shifts, alphabet))
+
+def vigenere_stream(chunks, key, decrypt=False, alphabet=LATIN):
+    """
+    Потокове шифрування (дешифрування) послідовності фрагментів тексту
+
+    Фаза ключа переноситься між фрагментами, тому результат збігається з обробкою
+    всього тексту одразу, а в пам'яті одночасно знаходиться лише один фрагмент.
+    Якщо upper() подовжує фрагмент ('ß' -> 'SS'), зайві літери переносяться
+    на початок наступного фрагмента, як при обробці всього тексту.
+
+    Args:
+        chunks (iterable): Фрагменти тексту (str)
+        key (str): Ключ шифрування
+        decrypt (bool): True для дешифрування
+        alphabet (Alphabet): Алфавіт
+
+    Yields:
+        str: Оброблені фрагменти з оригінальним форматуванням
+    """
+    shifts = compile_key(key, alphabet)[1 if decrypt else 0]
+
+    phase = 0
+    carry = ''
+    for chunk in chunks:
+        clean_text, layout = split_layout(chunk, alphabet)
+        letters = apply_shifts(clean_text, shifts[phase:] + shifts[:phase], alphabet)
+        if carry or len(letters) > layout.letter_count:
+            if isinstance(letters, bytes):
+                letters = letters.decode(alphabet.codec)
+            letters = carry + letters
+            carry = letters[layout.letter_count:]
+        yield layout.merge(letters)
+        phase = (phase + len(clean_text)) % len(shifts)
+
+def read_chunks(file, chunk_size=1 << 20):
+    """Читає текстовий файл фрагментами по chunk_size символів"""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
 
+def vigenere_file(source, target, key, decrypt=False, chunk_size=1 << 20, alphabet=LATIN):
+    """
+    Шифрування (дешифрування) файлового об'єкта з постійним використанням пам'яті
+
+    Args:
+        source: Текстовий файл для читання
+        target: Текстовий файл для запису результату
+        key (str): Ключ шифрування
+        decrypt (bool): True для дешифрування
+        chunk_size (int): Розмір фрагмента в символах
+        alphabet (Alphabet): Алфавіт
+    """
+    for chunk in vigenere_stream(read_chunks(source, chunk_size), key, decrypt, alphabet):
+        target.write(chunk)
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def compile_byte_key(key, decrypt=False):
+    """
+    Таблиці bytes.translate для байтового режиму (зсув mod 256), по одній на байт ключа
+
+    Args:
+        key (str | bytes): Ключ (рядок кодується в UTF-8)
+        decrypt (bool): True для дешифрування
+
+    Returns:
+        tuple: 256-байтові таблиці перекладу
+    """
+    key = key.encode('utf-8') if isinstance(key, str) else bytes(key)
+    if not key:
+        raise ValueError("Key must not be empty.")
+    sign = -1 if decrypt else 1
+    return tuple(bytes((code + sign * shift) % 256 for code in range(256)) for shift in key)
+
+@instrumentation.instrument()
+def vigenere_bytes(data, key, out=None, decrypt=False, position=0, chunk_size=1 << 20):
+    """
+    Шифр Віженера над байтами (mod 256) без декодування тексту
+
+    Вхід - будь-який буфер (bytes, bytearray, memoryview, mmap); результат записується
+    у буфер out, який може збігатися з data (обробка на місці, зокрема у відображеному
+    в пам'ять файлі). Смуги data[i::len(key)] перекладаються фрагментами по chunk_size
+    байтів (кратно довжині ключа), тому тимчасова пам'ять не залежить від розміру даних.
+
+    Args:
+        data: Вхідний буфер
+        key (str | bytes): Ключ (рядок кодується в UTF-8)
+        out: Буфер для запису (за замовчуванням - новий bytearray)
+        decrypt (bool): True для дешифрування
+        position (int): Позиція першого байта в потоці (фаза ключа для наступних фрагментів)
+        chunk_size (int): Розмір фрагмента в байтах
+
+    Returns:
+        Буфер out
+    """
+    tables = compile_byte_key(key if isinstance(key, str) else bytes(key), decrypt)
+    source = memoryview(data).cast('B')
+    if out is None:
+        out = bytearray(len(source))
+    target = memoryview(out).cast('B')
+    if len(target) < len(source):
+        raise ValueError("Output buffer is too small.")
+
+    # Фрагмент копіюється суцільно: зрізи з кроком у bytes/bytearray значно швидші, ніж у memoryview
+    period = len(tables)
+    chunk_size = max(chunk_size - chunk_size % period, period)
+    block = bytearray(min(chunk_size, len(source)))
+    for start in range(0, len(source), chunk_size):
+        chunk = bytes(source[start:start + chunk_size])
+        if len(chunk) < len(block):
+            block = bytearray(len(chunk))
+        for phase in range(min(period, len(chunk))):
+            block[phase::period] = chunk[phase::period].translate(tables[(position + start + phase) % period])
+        target[start:start + len(chunk)] = block
+    return out
+
+def vigenere_binary_file(source, target, key, decrypt=False, chunk_size=1 << 20):
+    """
+    Байтовий режим для двійкових файлових об'єктів: один буфер на весь потік
+
+    Args:
+        source: Двійковий файл для читання (readinto)
+        target: Двійковий файл для запису
+        key (str | bytes): Ключ
+        decrypt (bool): True для дешифрування
+        chunk_size (int): Розмір буфера в байтах
+    """
+    buffer = memoryview(bytearray(chunk_size))
+    position = 0
+    while size := source.readinto(buffer):
+        vigenere_bytes(buffer[:size], key, buffer, decrypt, position)
+        target.write(buffer[:size])
+        position += size
+
+def vigenere_path(input_path, output_path, key, decrypt=False, chunk_size=1 << 20, alphabet=LATIN, binary=False):
+    """
+    Шифрування (дешифрування) файлу через відображення в пам'ять
+
+    Вхідний файл не зчитується read(): у байтовому режимі vigenere_bytes пише
+    з відображеного входу одразу у відображений файл результату, у текстовому
+    фрагменти декодуються з відображених сторінок і пишуться буферизовано.
+
+    Args:
+        input_path (str): Вхідний файл
+        output_path (str): Файл результату
+        key (str): Ключ шифрування
+        decrypt (bool): True для дешифрування
+        chunk_size (int): Розмір фрагмента в байтах
+        alphabet (Alphabet): Алфавіт текстового режиму
+        binary (bool): True для байтового режиму (mod 256)
+    """
+    if binary:
+        with cipher_io.MappedFile(input_path) as source, cipher_io.map_output(output_path, len(source)) as target:
+            vigenere_bytes(source.buffer, key, target, decrypt, chunk_size=chunk_size)
+        return
+
+    with cipher_io.open_output(output_path, 'utf-8') as target:
+        for chunk in vigenere_stream(cipher_io.iter_text(input_path, chunk_size), key, decrypt, alphabet):
+            target.write(chunk)
+
+@instrumentation.instrument()
 def level1_demo(text, key):
     """Демонстрація роботи першого рівня"""
     print("\n" + "="*50)
@@ -104,9 +403,16 @@ def level1_demo(text, key):
     return encrypted
 
 # ------------------------- РІВЕНЬ 2 -------------------------
-def get_clean_text(text):
+# Частоти літер та очікуваний індекс відповідності беруться з мовної моделі
+ENGLISH = ngram_model.ENGLISH
+
+def model_alphabet(model):
+    """Алфавіт мовної моделі (для англійської - латиниця)"""
+    return alphabets.get_alphabet(model.alphabet)
+
+def get_clean_text(text, alphabet=LATIN):
     """Отримання чистого тексту для аналізу"""
-    return ''.join(char.upper() for char in text if char.isalpha())
+    return ''.join(filter(alphabet.is_letter, text)).upper()
 
 def calculate_ic(text):
     """Обчислення індексу відповідності"""
@@ -125,9 +431,9 @@ def calculate_ic(text):
     ic = total / (N * (N - 1))
     return ic
 
-def find_repeated_sequences(text, seq_length=3):
+def find_repeated_sequences(text, seq_length=3, alphabet=LATIN):
     """Знаходить повторювані послідовності в тексті та їх позиції"""
-    clean_text = get_clean_text(text)
+    clean_text = get_clean_text(text, alphabet)
     sequences = {}
     
     for i in range(len(clean_text) - seq_length + 1):
@@ -157,50 +463,160 @@ def find_factors(number, max_factor):
             factors.append(i)
     return factors
 
-def kasiski_examination(text, seq_length=3, max_key_length=20):
+def encode_text(clean_text, alphabet=LATIN):
+    """
+    Кодує чистий текст як масив байтів: латиницю - якщо він складається з ASCII-літер,
+    інші алфавіти - однобайтовим кодуванням алфавіту (якщо воно є)
+    """
+    if alphabet.legacy:
+        return clean_text.encode('ascii') if clean_text.isascii() else clean_text
+    return clean_text.encode(alphabet.codec) if alphabet.codec else clean_text
+
+@instrumentation.instrument()
+def ngram_pair_counts(data, seq_length, factor):
+    """
+    Рахує пари однакових n-грам, відстань між якими кратна factor
+
+    Відстань між позиціями кратна factor тоді й лише тоді, коли позиції мають
+    однаковий залишок за модулем factor. Тому замість перебору всіх пар
+    (O(k^2) для n-грами з k повтореннями) n-грами рахуються окремо для кожного
+    залишку: n-грами, що починаються в позиціях r, r + factor, ..., утворюються
+    зі зсунутих зрізів data[r + i::factor] і рахуються Counter без циклу Python.
+
+    Returns:
+        tuple: (кількість пар, множина n-грам, що мають хоча б одну таку пару)
+    """
+    instrumentation.count('vigenere.ngrams_scanned', max(0, len(data) - seq_length + 1))
+    pairs = 0
+    repeated = set()
+    for residue in range(factor):
+        counts = Counter(zip(*(data[residue + shift::factor] for shift in range(seq_length))))
+        counts = [(gram, count) for gram, count in counts.items() if count > 1]
+        pairs += sum(count * (count - 1) for _, count in counts) // 2
+        repeated.update(gram for gram, _ in counts)
+    instrumentation.count('vigenere.residue_pairs_counted', pairs)
+    return pairs, repeated
+
+def first_spacing_pair(data, sequence, factor):
+    """
+    Перша пара (i, j) входжень послідовності, відстань між якими кратна factor,
+    у порядку перебору calculate_spacings
+    """
+    residues = {}
+    index = 0
+    position = data.find(sequence)
+    # Переглядаються всі входження: перша пара - найменший i, що має пару з тим самим
+    # залишком, і його найближча така пара, а вона може знайтися лише серед пізніх входжень
+    while position != -1:
+        residues.setdefault(position % factor, []).append(index)
+        index += 1
+        position = data.find(sequence, position + 1)
+    return min(indices[:2] for indices in residues.values() if len(indices) > 1)
+
+def kasiski_tables(text, seq_lengths=(3,), max_key_length=20, alphabet=LATIN):
+    """
+    Метод Касіскі для кількох довжин послідовностей за один прохід
+
+    Текст кодується один раз, а для кожної довжини n-грам і кожного можливого
+    дільника рахується кількість відстаней між повтореннями, кратних цьому дільнику.
+
+    Returns:
+        dict: {довжина послідовності: [(довжина ключа, кількість), ...]}
+    """
+    return kasiski_counts(encode_text(get_clean_text(text, alphabet), alphabet), seq_lengths, max_key_length)
+
+@instrumentation.instrument()
+def kasiski_counts(data, seq_lengths=(3,), max_key_length=20):
+    """Метод Касіскі для вже очищеного та закодованого тексту (див. kasiski_tables)"""
+    join = bytes if isinstance(data, bytes) else ''.join
+    tables = {}
+
+    for seq_length in seq_lengths:
+        factor_counts = {}
+        first_seen = {}
+        first_position = {}
+
+        instrumentation.count('vigenere.kasiski_factors_tested', max(0, max_key_length - 1))
+        for factor in range(2, max_key_length + 1):
+            pairs, repeated = ngram_pair_counts(data, seq_length, factor)
+            if not pairs:
+                continue
+            factor_counts[factor] = pairs
+
+            # Порядок, у якому дільник вперше зустрівся б при переборі всіх пар,
+            # визначає порядок результатів з однаковою кількістю
+            for gram in repeated:
+                if gram not in first_position:
+                    first_position[gram] = data.find(join(gram))
+            first_gram = min(repeated, key=first_position.__getitem__)
+            first_pair = first_spacing_pair(data, join(first_gram), factor)
+            first_seen[factor] = (first_position[first_gram], *first_pair, factor)
+
+        possible_lengths = sorted(factor_counts.items(), key=lambda x: first_seen[x[0]])
+        possible_lengths.sort(key=lambda x: x[1], reverse=True)
+        tables[seq_length] = possible_lengths
+
+    return tables
+
+def kasiski_examination(text, seq_length=3, max_key_length=20, alphabet=LATIN):
     """Повна реалізація методу Касіскі"""
-    clean_text = get_clean_text(text)
-    sequences = find_repeated_sequences(clean_text, seq_length)
-    factor_counts = {}
-    
-    for seq, positions in sequences.items():
-        spacings = calculate_spacings(positions)
-        for spacing in spacings:
-            factors = find_factors(spacing, max_key_length)
-            for factor in factors:
-                if factor > 1:
-                    factor_counts[factor] = factor_counts.get(factor, 0) + 1
-    
-    possible_lengths = [(length, count) for length, count in factor_counts.items()]
-    possible_lengths.sort(key=lambda x: x[1], reverse=True)
-    
-    return possible_lengths
+    return kasiski_tables(text, (seq_length,), max_key_length, alphabet)[seq_length]
+
+@instrumentation.instrument()
+def residue_histograms(data, period, alphabet=LATIN):
+    """
+    Гістограми літер для кожного залишку позиції за модулем period
+
+    Кожна підпослідовність data[r::period] - це зріз закодованого тексту,
+    тому підрахунок виконується без побудови рядків посимвольно: для байтів
+    кожна літера алфавіту рахується bytes.count, для рядків - Counter.
+    """
+    instrumentation.count('vigenere.letters_counted', len(data))
+    if not isinstance(data, bytes):
+        return [Counter(data[residue::period]) for residue in range(period)]
+
+    histograms = []
+    for residue in range(period):
+        subsequence = data[residue::period]
+        histograms.append(Counter(dict(zip(alphabet.letter_bytes, map(subsequence.count, alphabet.letter_bytes)))))
+    return histograms
+
+def histogram_ic(histogram):
+    """Індекс відповідності за готовою гістограмою (як calculate_ic)"""
+    N = sum(histogram.values())
+    if N <= 1:
+        return 0
+    total = sum(count * (count - 1) for count in histogram.values())
+    return total / (N * (N - 1))
 
-def friedman_test(text, max_key_length=20):
+def friedman_test(text, max_key_length=20, model=ENGLISH):
     """Реалізація тесту Фрідмана"""
-    clean_text = get_clean_text(text)
-    ENGLISH_IC = 0.0667
-    
+    alphabet = model_alphabet(model)
+    return friedman_scores(encode_text(get_clean_text(text, alphabet), alphabet), max_key_length, model)
+
+@instrumentation.instrument()
+def friedman_scores(data, max_key_length=20, model=ENGLISH):
+    """Тест Фрідмана для вже очищеного та закодованого тексту (IC мови - з моделі)"""
     ic_scores = []
     
     for key_length in range(1, max_key_length + 1):
-        subsequences = [''] * key_length
-        for i, char in enumerate(clean_text):
-            subsequences[i % key_length] += char
-        
-        avg_ic = sum(calculate_ic(seq) for seq in subsequences) / key_length
+        with instrumentation.span('friedman_scores.period'):
+            histograms = residue_histograms(data, key_length, model_alphabet(model))
+            avg_ic = sum(map(histogram_ic, histograms)) / key_length
         ic_scores.append((key_length, avg_ic))
+    instrumentation.count('vigenere.periods_tested', max_key_length)
     
-    ic_scores.sort(key=lambda x: abs(x[1] - ENGLISH_IC))
+    ic_scores.sort(key=lambda x: abs(x[1] - model.ic))
     
     return ic_scores
 
-def find_key_length_combined(text, max_key_length=20):
-    """Комбінований метод визначення довжини ключа"""
-    clean_text = get_clean_text(text)
-    kasiski_lengths = kasiski_examination(clean_text, max_key_length=max_key_length)
-    friedman_lengths = friedman_test(clean_text, max_key_length=max_key_length)
-    
+def combine_length_scores(kasiski_lengths, friedman_lengths, model=ENGLISH):
+    """
+    Бали кожної можливої довжини ключа за методом Касіскі та тестом Фрідмана
+
+    Returns:
+        dict: {довжина: бал}
+    """
     length_scores = {}
     
     # Додаємо бали від методу Касіскі
@@ -209,106 +625,690 @@ def find_key_length_combined(text, max_key_length=20):
         length_scores[length] = count / max_kasiski_count
     
     # Додаємо бали від тесту Фрідмана
-    english_ic = 0.0667
     for length, ic in friedman_lengths:
-        score = 1 - abs(ic - english_ic) / english_ic
+        score = 1 - abs(ic - model.ic) / model.ic
         length_scores[length] = length_scores.get(length, 0) + score
     
-    best_length = max(length_scores.items(), key=lambda x: x[1])[0]
-    
-    return best_length
+    return length_scores
 
-def get_letter_frequencies():
-    """Повертає частоти букв англійської мови"""
-    return {
-        'A': 0.082, 'B': 0.015, 'C': 0.028, 'D': 0.043, 'E': 0.127, 
-        'F': 0.022, 'G': 0.020, 'H': 0.061, 'I': 0.070, 'J': 0.002, 
-        'K': 0.008, 'L': 0.040, 'M': 0.024, 'N': 0.067, 'O': 0.075, 
-        'P': 0.019, 'Q': 0.001, 'R': 0.060, 'S': 0.063, 'T': 0.091, 
-        'U': 0.028, 'V': 0.010, 'W': 0.023, 'X': 0.001, 'Y': 0.020, 
-        'Z': 0.001
-    }
+def find_key_length_combined(text, max_key_length=20, model=ENGLISH):
+    """Комбінований метод визначення довжини ключа"""
+    return VigenereAnalysis(text, max_key_length, model).key_length
+
+def get_letter_frequencies(model=ENGLISH):
+    """Повертає частоти букв мови моделі (за замовчуванням - англійської)"""
+    return dict(model.frequencies)
+
+def chi_square_weights(frequencies, letters=LATIN.letters):
+    """
+    Циркулянтна матриця для оцінки всіх n зсувів однією кореляцією (n - кількість літер)
+
+    Для зсуву s хі-квадрат дорівнює
+        sum_c (h[c] / T - e[c - s])^2 / e[c - s] = sum_c h[c]^2 * W[s][c] / T^2 - 2 + sum(e),
+    де h - гістограма підтексту, T - її сума, W[s][c] = 1 / e[(c - s) % n].
+    """
+    expected = [frequencies[char] for char in letters]
+    n = len(letters)
+    return [[1 / expected[(c - shift) % n] for c in range(n)] for shift in range(n)], sum(expected)
+
+@lru_cache(maxsize=8)
+def model_chi_square_weights(model):
+    """chi_square_weights для частот моделі; обчислюється один раз для кожної моделі"""
+    return chi_square_weights(model.frequencies, model.alphabet)
+
+def letter_counts(histogram, alphabet=LATIN):
+    """Перетворює гістограму (символ або байт -> кількість) на лічильники літер алфавіту"""
+    counts = [0] * alphabet.size
+    for symbol, count in histogram.items():
+        counts[alphabet.index_of(symbol)] += count
+    return counts
+
+@instrumentation.instrument()
+def key_char_scores(histogram, model=ENGLISH):
+    """
+    Оцінки хі-квадрат для всіх можливих символів ключа
+
+    Гістограма рахується один раз, а всі зсуви оцінюються як рядки
+    циркулянтної кореляції квадратів частот із model_chi_square_weights.
+
+    Returns:
+        list: [(символ ключа, хі-квадрат), ...], відсортований від найкращого
+    """
+    weights_table, expected_sum = model_chi_square_weights(model)
+    counts = letter_counts(histogram, model_alphabet(model))
+    total = sum(counts)
+    if not total:
+        return [(char, expected_sum) for char in model.alphabet]
+
+    instrumentation.count('vigenere.shifts_scored', len(weights_table))
+    squares = [count * count for count in counts]
+    scores = [
+        sum(weight * square for weight, square in zip(weights, squares)) / (total * total) - 2 + expected_sum
+        for weights in weights_table
+    ]
+    return sorted(zip(model.alphabet, scores), key=lambda x: x[1])
 
-def find_key_char(subtext):
+def find_key_char(subtext, model=ENGLISH):
     """Знаходження одного символу ключа за допомогою частотного аналізу"""
-    expected_freqs = get_letter_frequencies()
-    best_shift = 0
-    min_chi_square = float('inf')
-    
-    for shift in range(26):
-        shifted_freqs = {}
-        
-        for char in subtext:
-            shifted = chr(((ord(char) - ord('A') - shift) % 26) + ord('A'))
-            shifted_freqs[shifted] = shifted_freqs.get(shifted, 0) + 1
-        
-        # Обчислення хі-квадрат
-        chi_square = 0
-        total = sum(shifted_freqs.values())
-        
-        for char in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
-            observed_freq = shifted_freqs.get(char, 0) / total if total else 0
-            expected_freq = expected_freqs[char]
-            chi_square += (observed_freq - expected_freq) ** 2 / expected_freq if expected_freq else 0
-        
-        if chi_square < min_chi_square:
-            min_chi_square = chi_square
-            best_shift = shift
-    
-    return chr((best_shift) % 26 + ord('A'))
+    return key_char_scores(Counter(subtext), model)[0][0]
 
-def find_key(encrypted_text, key_length):
+def find_key_scores(encrypted_text, key_length, model=ENGLISH):
+    """
+    Оцінки всіх можливих символів для кожної позиції ключа
+
+    Returns:
+        list: для кожної позиції - список [(символ, хі-квадрат), ...] від найкращого
+    """
+    alphabet = model_alphabet(model)
+    return key_scores(encode_text(get_clean_text(encrypted_text, alphabet), alphabet), key_length, model)
+
+@instrumentation.instrument()
+def key_scores(data, key_length, model=ENGLISH):
+    """Оцінки символів ключа для вже очищеного та закодованого тексту"""
+    return [key_char_scores(histogram, model) for histogram in residue_histograms(data, key_length, model_alphabet(model))]
+
+@instrumentation.instrument()
+def find_key(encrypted_text, key_length, model=ENGLISH):
     """Знаходження повного ключа"""
-    clean_text = get_clean_text(encrypted_text)
-    substrings = [''] * key_length
-    
-    for i, char in enumerate(clean_text):
-        substrings[i % key_length] += char
-    
-    key = ''
-    print(substrings)
-    for substring in substrings:
-        key += find_key_char(substring)
-    
-    return key
+    return ''.join(scores[0][0] for scores in find_key_scores(encrypted_text, key_length, model))
+
+
+class VigenereAnalysis:
+    """
+    Криптоаналіз одного шифротексту Віженера
+
+    Очищений і закодований текст, таблиці Касіскі та Фрідмана, комбіновані бали
+    довжини ключа та оцінки символів ключа обчислюються лише при першому
+    зверненні й кешуються, тому звіт і відновлення ключа читають готові результати.
+    """
+
+    def __init__(self, encrypted_text, max_key_length=20, model=ENGLISH):
+        self.encrypted_text = encrypted_text
+        self.max_key_length = max_key_length
+        self.model = model
+        self.alphabet = model_alphabet(model)
+
+    @cached_property
+    def data(self):
+        """Очищений текст, закодований для аналізу"""
+        return encode_text(get_clean_text(self.encrypted_text, self.alphabet), self.alphabet)
+
+    @cached_property
+    def kasiski(self):
+        """[(довжина ключа, кількість співпадінь), ...] за методом Касіскі"""
+        return kasiski_counts(self.data, (3,), self.max_key_length)[3]
+
+    @cached_property
+    def friedman(self):
+        """[(довжина ключа, середній IC), ...] за тестом Фрідмана"""
+        return friedman_scores(self.data, self.max_key_length, self.model)
+
+    @cached_property
+    def length_scores(self):
+        """{довжина ключа: комбінований бал}"""
+        return combine_length_scores(self.kasiski, self.friedman, self.model)
+
+    @cached_property
+    def key_length(self):
+        """Найімовірніша довжина ключа"""
+        return max(self.length_scores.items(), key=lambda x: x[1])[0]
+
+    @cached_property
+    def key_scores(self):
+        """Ранжовані оцінки символів для кожної позиції ключа"""
+        return key_scores(self.data, self.key_length, self.model)
+
+    @cached_property
+    def key(self):
+        """Знайдений ключ"""
+        return ''.join(scores[0][0] for scores in self.key_scores)
+
+    @cached_property
+    def plaintext(self):
+        """Текст, розшифрований знайденим ключем"""
+        return vigenere_decrypt(self.encrypted_text, self.key, self.alphabet)
+
+    def confidence(self):
+        """Оцінки впевненості у знайденій довжині ключа та самому ключі"""
+        ranked = sorted(self.length_scores.values(), reverse=True)
+        return {
+            # Комбінований бал довжини ключа та його відрив від наступного кандидата
+            'length_score': ranked[0],
+            'length_margin': ranked[0] - ranked[1] if len(ranked) > 1 else ranked[0],
+            'ic': dict(self.friedman)[self.key_length],
+            # Найменший відрив найкращого символу ключа від другого за хі-квадрат
+            'key_margin': min(scores[1][1] - scores[0][1] for scores in self.key_scores),
+        }
+
+
+@instrumentation.instrument()
+def crack_vigenere(encrypted_text, max_key_length=20, model=ENGLISH):
+    """
+    Повний криптоаналіз одного шифротексту без виведення на екран
+
+    Returns:
+        dict: знайдений ключ, довжина ключа, оцінки впевненості та розшифрований текст
+    """
+    analysis = VigenereAnalysis(encrypted_text, max_key_length, model)
+    return {
+        'key': analysis.key,
+        'key_length': analysis.key_length,
+        'confidence': analysis.confidence(),
+        'plaintext': analysis.plaintext,
+    }
+
+def crack_message(message, max_key_length=20, model=ENGLISH):
+    """Обробляє одне повідомлення пакета: (id, шифротекст) -> результат або помилка"""
+    message_id, encrypted_text = message
+    if isinstance(encrypted_text, Exception):
+        return message_error(message_id, encrypted_text)
+    try:
+        return {'id': message_id, **crack_vigenere(encrypted_text, max_key_length, model)}
+    except Exception as e:
+        return message_error(message_id, e)
+
+def message_error(message_id, error):
+    """Результат пакета для повідомлення, яке не вдалося прочитати або зламати"""
+    return {'id': message_id, 'error': f"{type(error).__name__}: {error}"}
+
+def read_messages(path):
+    """
+    Читає шифротексти з каталогу (кожен файл - окреме повідомлення)
+    або з JSONL-файлу з полями "id" та "ciphertext"
+
+    Yields:
+        tuple: (id, шифротекст); для файлу, який не вдалося прочитати, або некоректного
+            рядка JSONL замість шифротексту повертається виняток, і пакет повідомляє
+            про нього як про помилку цього повідомлення
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, name)
+            if os.path.isfile(file_path):
+                try:
+                    yield name, cipher_io.read_text(file_path)
+                except cipher_io.CipherIOError as e:
+                    yield name, e
+        return
+
+    # Рядки декодуються окремо, щоб некоректний UTF-8 зіпсував лише свій рядок
+    with cipher_io.reporting(path, 'read'), open(path, 'rb') as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except ValueError as e:
+                yield line_number, e
+                continue
+            if not isinstance(record, dict):
+                yield line_number, ValueError("Record must be a JSON object")
+            elif 'ciphertext' not in record:
+                yield record.get('id', line_number), ValueError("Missing field 'ciphertext'")
+            else:
+                yield record.get('id', line_number), record['ciphertext']
+
+# Кількість фрагментів пакета в пулі на один процес (crack_batch)
+BATCH_WINDOW = 4
+
+def crack_batch(messages, max_key_length=20, workers=None, chunksize=16, model=ENGLISH):
+    """
+    Паралельний криптоаналіз багатьох шифротекстів у пулі процесів
+
+    Args:
+        messages (iterable): Пари (id, шифротекст)
+        max_key_length (int): Максимальна довжина ключа
+        workers (int): Кількість процесів (за замовчуванням - кількість ядер, 0 - у поточному процесі)
+        chunksize (int): Кількість повідомлень, що передаються процесу за раз
+        model (NgramModel): Мовна модель (процесам передається лише шлях до її файлу)
+
+    Yields:
+        dict: Результати у порядку вхідних повідомлень
+    """
+    crack = partial(crack_message, max_key_length=max_key_length, model=model)
+    if workers == 0:
+        yield from map(crack, messages)
+        return
+    # Повідомлення читаються лише тоді, коли в пулі звільняється місце (на відміну від
+    # executor.map, що одразу вичитує весь вхід), тому великий пакет не тримається в пам'яті
+    window = BATCH_WINDOW * (workers or os.cpu_count() or 1)
+    messages = iter(messages)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while chunk := list(islice(messages, chunksize)):
+            pending.append(executor.submit(crack_messages, chunk, crack))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def crack_messages(messages, crack):
+    """Обробляє фрагмент пакета в процесі пулу"""
+    return [crack(message) for message in messages]
+
+# Слова словника в процесі пулу: довжина -> відсортовані ключі (init_dictionary_worker)
+DICTIONARY_WORDS = {}
+
+# Найменша кількість слів в одному завданні пулу словникової атаки
+DICTIONARY_CHUNK = 20000
+
+# Крок вибірки слів, найкращі з яких дають початковий поріг відсікання
+DICTIONARY_SAMPLE_STEP = 64
+
+class WordCodes(dict):
+    """
+    Таблиця str.translate для словника: літера з номером code стає символом
+    U+0100 + code (у UTF-16-BE це байти 0x01, code), пробільні символи
+    зберігаються, решта видаляється (як у key_shifts). Значення для інших
+    символів обчислюються при першому зверненні і кешуються.
+    """
+
+    def __init__(self, letters):
+        super().__init__({ord(char): chr(0x100 + code) for code, char in enumerate(letters)})
+
+    def __missing__(self, code):
+        char = chr(code) if chr(code).isspace() else None
+        self[code] = char
+        return char
+
+def read_wordlist(path, letters=ngram_model.ENGLISH_ALPHABET, max_length=20):
+    """
+    Читає словник ключів: кожне слово - послідовність номерів літер (bytes),
+    згрупована за довжиною та відсортована, тож слова зі спільним префіксом ідуть поспіль
+
+    Args:
+        path (str): Файл зі словами, розділеними пробілами або рядками
+        letters (str): Літери алфавіту мовної моделі
+        max_length (int): Найбільша довжина ключа
+
+    Returns:
+        dict: {довжина: (відсортований список bytes, shared_prefixes цього списку)}
+    """
+    words = {}
+    for word in cipher_io.read_text(path).upper().translate(WordCodes(letters)).split():
+        if len(word) <= max_length:
+            words.setdefault(len(word), set()).add(word.encode('utf-16-be')[1::2])
+    return {length: (keys, shared_prefixes(keys)) for length, keys in ((length, sorted(group)) for length, group in sorted(words.items()))}
+
+def shared_prefixes(words):
+    """
+    Довжина спільного префікса кожного слова з попереднім (для першого - 0)
+
+    Слова однакової довжини без повторів, тож старший різний байт двох сусідніх
+    слів - це старший біт XOR їхніх чисел, і рядки не порівнюються посимвольно.
+    """
+    if not words:
+        return []
+    length = len(words[0])
+    numbers = [int.from_bytes(word, 'big') for word in words]
+    return [0] + [length - 1 - ((first ^ second).bit_length() - 1) // 8 for first, second in zip(numbers, numbers[1:])]
+
+def dictionary_tables(encrypted_text, key_lengths, model=ENGLISH):
+    """
+    Таблиці поступової оцінки ключів кожної довжини
+
+    Якщо в моделі є біграми, оцінка - сума log10-ймовірностей біграм розшифрованого
+    тексту разом із межами слів, інакше - частот літер. Біграма залежить щонайбільше
+    від двох сусідніх символів ключа, тому оцінка ключа k розкладається на
+    columns[r][k[r]] + pairs[r][k[r-1] * size + k[r]] для кожної позиції r і
+    wrap[k[-1] * size + k[0]] для біграм на межі періоду. Набір біграм не залежить
+    від довжини ключа, тож оцінки ключів різної довжини порівнянні. rest[d][a] -
+    найбільший можливий внесок позицій d.. і межі періоду, якщо k[d-1] = a
+    (динамічне програмування від кінця ключа; використовується для відсікання префіксів).
 
+    Args:
+        encrypted_text (str): Шифротекст
+        key_lengths (iterable): Довжини ключів
+        model (NgramModel): Мовна модель
+
+    Returns:
+        dict: {довжина: (columns, pairs, wrap, rest)}
+    """
+    alphabet = model_alphabet(model)
+    size, base = len(model.alphabet), model.base
+    codes = model.codes(encrypted_text)
+    letter_numbers = []
+    number = 0
+    for char in encrypted_text:
+        letter_numbers.append(number)
+        number += alphabet.is_letter(char)
+
+    if model.max_order >= 2:
+        table = model.table(2)
+        # Біграма з межею слова: (літера, не-літера) або (не-літера, літера)
+        sides = ([table[code * base + size] for code in range(size)], [table[size * base + code] for code in range(size)])
+    else:
+        table = model.table(1) if model.max_order else model.log_frequencies()
+        sides = ([table[code] for code in range(size)],)
+
+    @lru_cache(maxsize=None)
+    def column_vector(cipher_code, side):
+        return [sides[side][(cipher_code - shift) % size] for shift in range(size)]
+
+    @lru_cache(maxsize=None)
+    def pair_vector(first, second):
+        return [table[(first - previous) % size * base + (second - shift) % size]
+                for previous in range(size) for shift in range(size)]
+
+    def weighted_sum(counts, vector, length):
+        total = [0.0] * length
+        for item, count in counts.items():
+            total = [value + count * weight for value, weight in zip(total, vector(*item))]
+        return total
+
+    tables = {}
+    for key_length in key_lengths:
+        residues = [number % key_length for number in letter_numbers]
+        column_counts = [Counter() for _ in range(key_length)]
+        # pair_counts[r] - біграми позицій r-1 і r; останній елемент - біграми на межі періоду
+        pair_counts = [Counter() for _ in range(key_length + 1)]
+        if model.max_order >= 2:
+            for position in range(len(codes) - 1):
+                first, second = codes[position], codes[position + 1]
+                if first < size and second < size:
+                    pair_counts[residues[position + 1] or key_length][first, second] += 1
+                elif first < size:
+                    column_counts[residues[position]][first, 0] += 1
+                elif second < size:
+                    column_counts[residues[position + 1]][second, 1] += 1
+        else:
+            for code, residue in zip(codes, residues):
+                if code < size:
+                    column_counts[residue][code, 0] += 1
+
+        columns = [weighted_sum(counts, column_vector, size) for counts in column_counts]
+        pairs = [weighted_sum(counts, pair_vector, size * size) for counts in pair_counts]
+        wrap = pairs.pop()
+        rest = [[max(wrap[previous * size:(previous + 1) * size]) for previous in range(size)]]
+        for column, pair in zip(columns[:0:-1], pairs[:0:-1]):
+            following = [column[shift] + rest[-1][shift] for shift in range(size)]
+            rest.append([max(map(add, pair[previous * size:(previous + 1) * size], following)) for previous in range(size)])
+        rest.append(None)
+        tables[key_length] = columns, pairs, wrap, rest[::-1]
+    return tables
+
+def search_words(words, shared, tables, candidates=100, threshold=float('-inf')):
+    """
+    Найкращі ключі зі списку слів однієї довжини
+
+    Відсортований список обходиться як префіксне дерево: оцінки спільного
+    з попереднім словом префікса не перераховуються, а префікс, чия оцінка
+    разом із верхньою межею решти не перевищує найгіршого з candidates
+    найкращих ключів, відкидається разом з усіма словами, що з нього починаються
+    (перехід bisect до першого слова з іншим префіксом).
+
+    Args:
+        words (list): Відсортовані ключі (bytes номерів літер) однакової довжини
+        shared (list): shared_prefixes(words)
+        tables (tuple): Таблиці dictionary_tables для цієї довжини
+        candidates (int): Кількість найкращих ключів
+        threshold (float): Оцінка, яку ключ має перевищити (нижня межа оцінки candidates-го ключа)
+
+    Returns:
+        tuple: ([(оцінка, ключ), ...], кількість оцінених префіксів)
+    """
+    columns, pairs, wrap, rest = tables
+    size = len(columns[0])
+    length = len(columns)
+    # steps[r][k[r-1] * size + k[r]] - внесок позиції r; для r = 0 k[-1] - остання літера слова, що не впливає на оцінку
+    steps = [columns[0] * size] + [list(map(add, pair, column * size)) for column, pair in zip(columns[1:], pairs[1:])]
+    scores = [0.0] * (length + 1)
+    best = []
+    # Оцінки scores[1..valid] належать префіксу попереднього слова
+    valid = 0
+    scored = 0
+    index = 0
+    count = len(words)
+    while index < count:
+        word = words[index]
+        depth = shared[index]
+        if depth > valid:
+            depth = valid
+        while depth < length:
+            shift = word[depth]
+            score = scores[depth] + steps[depth][word[depth - 1] * size + shift]
+            depth += 1
+            scores[depth] = score
+            scored += 1
+            if score + rest[depth][shift] <= threshold:
+                break
+        else:
+            score = scores[length] + wrap[word[-1] * size + word[0]]
+            if score > threshold:
+                if len(best) < candidates:
+                    heapq.heappush(best, (score, word))
+                else:
+                    heapq.heapreplace(best, (score, word))
+                if len(best) == candidates:
+                    threshold = best[0][0]
+            valid = length
+            index += 1
+            continue
+        # Префікс відкинуто: наступне слово - перше, що з нього не починається
+        valid = depth
+        index += 1
+        if index < count and shared[index] >= depth:
+            index = bisect_left(words, word[:depth - 1] + bytes((word[depth - 1] + 1,)), index)
+    return best, scored
+
+def init_dictionary_worker(words):
+    """Зберігає словник у процесі пулу, щоб завдання передавали лише межі фрагментів"""
+    DICTIONARY_WORDS.clear()
+    DICTIONARY_WORDS.update(words)
+
+def search_task(task, candidates=100, threshold=float('-inf')):
+    """Обгортка search_words для пулу: (таблиці, довжина, початок, кінець)"""
+    tables, length, start, stop = task
+    words, shared = DICTIONARY_WORDS[length]
+    return search_words(words[start:stop], shared[start:stop], tables, candidates, threshold)
+
+
+class DictionaryAttack:
+    """
+    Криптоаналіз коротких шифротекстів перебором ключів зі словника
+
+    Оцінки довжини ключа за Касіскі та Фрідманом на коротких текстах ненадійні,
+    тому перебираються всі слова словника: search_words відбирає candidates
+    найкращих за біграмами (або частотами літер), а вони переоцінюються повною
+    моделлю. Словник передається процесам пулу один раз, при їх запуску,
+    тож один екземпляр обробляє багато повідомлень.
+    """
+
+    def __init__(self, words, model=ENGLISH, workers=None, candidates=100):
+        self.words = words
+        self.model = model
+        self.candidates = candidates
+        self.executor = None
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        if self.workers:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_dictionary_worker, initargs=(words,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def tasks(self, tables):
+        """Фрагменти словника приблизно однакового розміру, по кілька на процес"""
+        total = sum(len(self.words[length][0]) for length in tables)
+        chunk = max(DICTIONARY_CHUNK, -(-total // (4 * max(1, self.workers))))
+        return [(tables[length], length, start, start + chunk)
+                for length in tables for start in range(0, len(self.words[length][0]), chunk)]
+
+    def score(self, plaintext):
+        """Оцінка розшифрованого тексту повною моделлю"""
+        if self.model.max_order:
+            return self.model.score(plaintext, self.model.max_order)
+        log_frequencies = self.model.log_frequencies()
+        return sum(log_frequencies[code] for code in self.model.codes(plaintext) if code < self.model.other)
+
+    @instrumentation.instrument('DictionaryAttack.crack')
+    def crack(self, encrypted_text, max_key_length=20):
+        """
+        Ключі словника, впорядковані від найімовірнішого
+
+        Returns:
+            list: [{'key', 'key_length', 'score', 'plaintext'}, ...]
+        """
+        lengths = [length for length in self.words if length <= max_key_length]
+        tables = dictionary_tables(encrypted_text, lengths, self.model)
+        # candidates-й найкращий ключ вибірки не кращий за candidates-й найкращий ключ словника,
+        # тож його оцінка - безпечний поріг, з яким відсікання працює з першого слова
+        sample = []
+        for length in lengths:
+            words = self.words[length][0][::DICTIONARY_SAMPLE_STEP]
+            sample += search_words(words, shared_prefixes(words), tables[length], self.candidates)[0]
+        threshold = float('-inf')
+        if len(sample) >= self.candidates:
+            threshold = heapq.nlargest(self.candidates, sample)[-1][0] - 1e-9
+        search = partial(search_task, candidates=self.candidates, threshold=threshold)
+        tasks = self.tasks(tables)
+        if self.executor is None:
+            init_dictionary_worker(self.words)
+            results = map(search, tasks)
+        else:
+            results = self.executor.map(search, tasks)
+        found = []
+        for best, scored in results:
+            found += best
+            instrumentation.count('vigenere.dictionary_prefixes_scored', scored)
+
+        ranked = []
+        alphabet = model_alphabet(self.model)
+        for _, word in heapq.nlargest(self.candidates, found):
+            key = ''.join(self.model.alphabet[code] for code in word)
+            plaintext = vigenere_decrypt(encrypted_text, key, alphabet)
+            ranked.append({'key': key, 'key_length': len(key), 'score': self.score(plaintext), 'plaintext': plaintext})
+        return sorted(ranked, key=lambda result: result['score'], reverse=True)
+
+def crack_dictionary_batch(messages, wordlist, max_key_length=20, workers=None, candidates=100, model=ENGLISH):
+    """
+    Словникова атака на кожне повідомлення пакета; словник читається і передається процесам один раз
+
+    Yields:
+        dict: Найкращий ключ і розшифрований текст (або помилка) у порядку вхідних повідомлень
+    """
+    words = read_wordlist(wordlist, model.alphabet, max_key_length)
+    with DictionaryAttack(words, model, workers, candidates) as attack:
+        for message_id, encrypted_text in messages:
+            if isinstance(encrypted_text, Exception):
+                yield message_error(message_id, encrypted_text)
+                continue
+            try:
+                ranked = attack.crack(encrypted_text, max_key_length)
+            except Exception as e:
+                yield message_error(message_id, e)
+                continue
+            if ranked:
+                yield {'id': message_id, **ranked[0]}
+            else:
+                yield {'id': message_id, 'error': f"No wordlist keys of length 1..{max_key_length}"}
+
+
+@instrumentation.instrument()
 def level2_demo(encrypted_text):
     """Демонстрація роботи другого рівня"""
     print("\n" + "="*50)
     print("РІВЕНЬ 2: Криптоаналіз шифру Віженера")
     print("="*50)
+    analysis = VigenereAnalysis(encrypted_text)
     
     # Метод Касіскі
     print("\nМетод Касіскі:")
-    kasiski_results = kasiski_examination(encrypted_text)
     print("Топ 5 можливих довжин ключа за методом Касіскі:")
-    for length, count in kasiski_results[:5]:
+    for length, count in analysis.kasiski[:5]:
         print(f"Довжина {length}: {count} співпадінь")
     
     # Тест Фрідмана
     print("\nТест Фрідмана:")
-    friedman_results = friedman_test(encrypted_text)
     print("Топ 5 можливих довжин ключа за тестом Фрідмана:")
-    for length, ic in friedman_results[:5]:
+    for length, ic in analysis.friedman[:5]:
         print(f"Довжина {length}: IC = {ic:.4f}")
     
     # Комбінований результат
-    key_length = find_key_length_combined(encrypted_text)
-    print(f"\nФінальна оцінка довжини ключа: {key_length}")
+    print(f"\nФінальна оцінка довжини ключа: {analysis.key_length}")
     
     # Знаходимо сам ключ
-    found_key = find_key(encrypted_text, key_length)
-    print(f"Знайдений ключ: {found_key}")
+    print(f"Знайдений ключ: {analysis.key}")
     
     # Розшифровуємо текст знайденим ключем
-    decrypted = vigenere_decrypt(encrypted_text, found_key)
-    print(f"\nРозшифрований текст:\n{decrypted}")
+    print(f"\nРозшифрований текст:\n{analysis.plaintext}")
+
+def main(argv=None):
+    """
+    Командний рядок
+
+    Приклади:
+        python 1_vigenere.py encrypt --key CRYPTOGRAPHY < log.txt > log.enc
+        python 1_vigenere.py encrypt --key КЛЮЧ --alphabet ukrainian < лист.txt > лист.enc
+        python 1_vigenere.py encrypt --key SECRET --bytes < archive.zip > archive.enc
+        python 1_vigenere.py encrypt --key SECRET --bytes --input disk.img --output disk.enc
+        python 1_vigenere.py crack messages.jsonl --workers 8 > results.jsonl
+        python 1_vigenere.py crack messages.jsonl --wordlist words.txt --model en.ngm > results.jsonl
+    """
+    parser = argparse.ArgumentParser(description="Шифр Віженера")
+    commands = parser.add_subparsers(dest='mode', required=True)
+
+    for mode in ('encrypt', 'decrypt'):
+        command = commands.add_parser(mode, help="Потокова обробка stdin -> stdout")
+        command.add_argument('--key', required=True, help="Ключ шифрування")
+        command.add_argument('--chunk-size', type=int, default=1 << 20, help="Розмір фрагмента в символах (у байтах для --bytes)")
+        command.add_argument('--alphabet', default='latin', help="Алфавіт: latin, ukrainian або рядок літер")
+        command.add_argument('--bytes', action='store_true', help="Байтовий режим (mod 256) без декодування")
+        command.add_argument('--input', help="Вхідний файл (відображається в пам'ять) замість stdin")
+        command.add_argument('--output', help="Файл результату замість stdout (разом з --input)")
+
+    command = commands.add_parser('crack', help="Пакетний криптоаналіз, результати у форматі JSONL")
+    command.add_argument('input', help="Каталог із шифротекстами або JSONL-файл")
+    command.add_argument('--workers', type=int, default=None, help="Кількість процесів (0 - без пулу)")
+    command.add_argument('--max-key-length', type=int, default=20)
+    command.add_argument('--model', default=None, help="Мовна модель ngram_model (за замовчуванням - англійські частоти)")
+    command.add_argument('--wordlist', default=None, help="Словник ключів: перебір слів замість статистичного аналізу")
+    command.add_argument('--candidates', type=int, default=100, help="Кількість ключів словника для повної оцінки")
+    args = parser.parse_args(argv)
+    if args.mode != 'crack' and bool(args.input) != bool(args.output):
+        parser.error("--input and --output must be used together")
+
+    # newline='' зберігає оригінальні символи кінця рядка
+    sys.stdin.reconfigure(encoding='utf-8', newline='')
+    sys.stdout.reconfigure(encoding='utf-8', newline='')
+
+    try:
+        if args.mode == 'crack':
+            model = ngram_model.load_model(args.model) if args.model else ENGLISH
+            if args.wordlist:
+                results = crack_dictionary_batch(read_messages(args.input), args.wordlist, args.max_key_length,
+                                                 args.workers, args.candidates, model)
+            else:
+                results = crack_batch(read_messages(args.input), args.max_key_length, args.workers, model=model)
+            for result in results:
+                print(json.dumps(result, ensure_ascii=False))
+        elif args.input:
+            vigenere_path(args.input, args.output, args.key, args.mode == 'decrypt', args.chunk_size,
+                          alphabets.get_alphabet(args.alphabet), args.bytes)
+        elif args.bytes:
+            vigenere_binary_file(sys.stdin.buffer, sys.stdout.buffer, args.key, args.mode == 'decrypt', args.chunk_size)
+        else:
+            vigenere_file(sys.stdin, sys.stdout, args.key, args.mode == 'decrypt', args.chunk_size,
+                          alphabets.get_alphabet(args.alphabet))
+    except (cipher_io.CipherIOError, ValueError) as error:
+        parser.exit(1, f"Помилка: {error}\n")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+        sys.exit()
 
     # Текст для шифрування
-    with open('plain_text.txt', 'r', encoding='utf-8') as file:
-        original_text = file.read()
+    try:
+        original_text = cipher_io.read_text('plain_text.txt')
+    except cipher_io.CipherIOError as error:
+        sys.exit(f"Помилка: {error}")
     # original_text = """The artist is the creator of beautiful things. To reveal art and conceal the artist is art's aim. The critic is he who can translate into another manner or a new material his impression of beautiful things. The highest, as the lowest, form of criticism is a mode of autobiography. Those who find ugly meanings in beautiful things are corrupt without being charming. This is a fault. Those who find beautiful meanings in beautiful things are the cultivated. For these there is hope. They are the elect to whom beautiful things mean only Beauty. There is no such thing as a moral or an immoral book. Books are well written, or badly written. That is all. The nineteenth-century dislike of realism is the rage of Caliban seeing his own face in a glass. The nineteenth-century dislike of Romanticism is the rage of Caliban not seeing his own face in a glass. The moral life of man forms part of the subject matter of the artist, but the morality of art consists in the perfect use of an imperfect medium. No artist desires to prove anything. Even things that are true can be proved. No artist has ethical sympathies. An ethical sympathy in an artist is an unpardonable mannerism of style. No artist is ever morbid. The artist can express everything. Thought and language are to the artist instruments of an art. Vice and virtue are to the artist materials for an art. From the point of view of form, the type of all the arts is the art of the musician. From the point of view of feeling, the actor's craft is the type. All art is at once surface and symbol. Those who go beneath the surface do so at their peril. Those who read the symbol do so at their peril. It is the spectator, and not life, that art really mirrors. Diversity of opinion about a work of art shows that the work is new, complex, vital. When critics disagree the artist is in accord with himself. We can forgive a man for making a useful thing as long as he does not admire it. The only excuse for making a useless thing is that one admires it intensely. All art is quite useless."""
     key = "KEY"
     
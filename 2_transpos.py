@@ -1,4 +1,28 @@
-from typing import List
+import argparse
+import random
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from operator import add
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import cipher_io
+import instrumentation
+import ngram_model
+
+# Кількість скомпільованих ключів, що зберігаються в кеші
+KEY_CACHE_SIZE = 256
+
+# Доповнення останнього блоку в потоковому режимі: позначка, а потім заповнювач
+PAD_MARK = '\x80'
+PAD_FILL = '\x00'
+
+# Пошук ключа рядків: кількість випадкових поштовхів після сходження і штраф
+# (log10 на межу рядків) за кожен залишок ключа, щоб довгі ключі не вигравали за рахунок шуму
+ROW_KICKS = 10
+ROW_KEY_PENALTY = 0.1
+
 
 def create_matrix(text: str, num_cols: int, fill: str = ' ') -> List[List[str]]:
     """
@@ -13,40 +37,185 @@ def create_matrix(text: str, num_cols: int, fill: str = ' ') -> List[List[str]]:
     padded_text = text.ljust(num_cols * num_rows, fill)
     return [list(padded_text[i * num_cols:(i + 1) * num_cols]) for i in range(num_rows)]
 
-def transpos_cols_encrypt(text: str, key: str, log: bool = False) -> str:
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def column_permutation(key: str) -> Tuple[int, ...]:
+    """
+    Порядок зчитування стовпчиків для ключа (перестановка, відсортована за літерами ключа).
+    Результати зберігаються в обмеженому LRU-кеші (статистика - column_permutation.cache_info()).
+
+    :param key: Ключ перестановки.
+    :return: Індекси стовпчиків у порядку зчитування.
+    """
+    return tuple(sorted(range(len(key)), key=lambda k: key[k]))
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def row_permutation(key_row: str, num_rows: int) -> Tuple[int, ...]:
+    """
+    Порядок рядків для подвійної перестановки (ключ рядків повторюється циклічно).
+    Результати зберігаються в обмеженому LRU-кеші (статистика - row_permutation.cache_info()).
+
+    :param key_row: Ключ для перестановки рядків.
+    :param num_rows: Кількість рядків матриці.
+    :return: Індекси рядків у новому порядку.
+    """
+    return tuple(sorted(range(num_rows), key=lambda i: key_row[i % len(key_row)]))
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def transposition_plan(num_rows: int, key_col: str, key_row: str = None) -> Tuple[Tuple[Tuple[int, ...], int, Tuple[int, ...]], ...]:
+    """
+    Перестановка символів для тексту з num_rows рядків, записана як послідовність зрізів.
+
+    Шифротекст складається з блоків (початки, крок, довжини): стовпчик col для групи
+    рядків із залишками r1 < r2 < ... за модулем довжини ключа рядків
+    (рядки з однаковою літерою ключа) - це зрізи text[r * num_cols + col::крок],
+    елементи яких чергуються. Без ключа рядків кожен блок - один зріз text[col::num_cols].
+    План залежить лише від розміру і ключів, тому кешується і повторно
+    використовується для всіх повідомлень тієї ж довжини.
+
+    :param num_rows: Кількість рядків матриці.
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :return: Блоки шифротексту у порядку зчитування.
+    """
+    if not key_col or key_row == '':
+        raise ValueError("Keys must not be empty.")
+    num_cols = len(key_col)
+    period = 1 if key_row is None else len(key_row)
+
+    # Групи залишків рядків з однаковою літерою ключа у порядку сортування ключа
+    groups = [[0]]
+    if key_row is not None:
+        groups = []
+        for residue in sorted(range(period), key=lambda r: key_row[r]):
+            if groups and key_row[groups[-1][0]] == key_row[residue]:
+                groups[-1].append(residue)
+            else:
+                groups.append([residue])
+
+    return tuple(
+        (
+            tuple(residue * num_cols + col for residue in group),
+            period * num_cols,
+            tuple(len(range(residue, num_rows, period)) for residue in group),
+        )
+        for col in column_permutation(key_col)
+        for group in groups
+    )
+
+@instrumentation.instrument()
+def gather_columns(text: str, plan) -> str:
+    """
+    Застосовує план перестановки: зчитує доповнений текст блоками зрізів.
+
+    :param text: Текст, доповнений до повної матриці.
+    :param plan: План з transposition_plan.
+    :return: Переставлений текст.
+    """
+    pieces = []
+    for starts, step, lengths in plan:
+        if len(starts) == 1:
+            pieces.append(text[starts[0]::step])
+            continue
+        block = [''] * sum(lengths)
+        for offset, start in enumerate(starts):
+            block[offset::len(starts)] = text[start::step]
+        pieces.append(''.join(block))
+    return ''.join(pieces)
+
+@instrumentation.instrument()
+def scatter_columns(encrypted_text: str, plan, size: int) -> str:
+    """
+    Обернена перестановка: розкладає блоки шифротексту на їхні місця в матриці.
+
+    :param encrypted_text: Зашифрований текст.
+    :param plan: План з transposition_plan.
+    :param size: Розмір матриці (кількість рядків * кількість стовпчиків).
+    :return: Текст матриці, зчитаний по рядках.
+    """
+    grid = [''] * size
+    index = 0
+    for starts, step, lengths in plan:
+        block = encrypted_text[index:index + sum(lengths)]
+        index += len(block)
+        for offset, start in enumerate(starts):
+            grid[start::step] = block[offset::len(starts)]
+    return ''.join(grid)
+
+def print_rows(text: str, num_cols: int, row_indices=None):
+    """
+    Виводить текст матриці по рядках (у заданому порядку рядків).
+
+    :param text: Текст матриці, зчитаний по рядках.
+    :param num_cols: Кількість стовпчиків.
+    :param row_indices: Порядок рядків (за замовчуванням - звичайний).
+    """
+    if row_indices is None:
+        row_indices = range(len(text) // num_cols)
+    for i in row_indices:
+        print(list(text[i * num_cols:(i + 1) * num_cols]))
+
+def frame_text(text: str, num_cols: int, framed: bool) -> Tuple[str, int]:
+    """
+    Доповнює текст до повної матриці.
+
+    Без обрамлення текст доповнюється пробілами, які при дешифруванні знімає rstrip()
+    (разом з пробілами в кінці самого тексту). З обрамленням додається однозначне
+    доповнення pad_block, тож дешифрування точно обернене до шифрування.
+
+    :param text: Вхідний текст.
+    :param num_cols: Кількість стовпчиків.
+    :param framed: True для однозначного доповнення.
+    :return: Доповнений текст і кількість рядків.
+    """
+    if framed:
+        num_rows = len(text) // num_cols + 1
+        return pad_block(text, num_rows * num_cols), num_rows
+    num_rows = (len(text) + num_cols - 1) // num_cols
+    return text.ljust(num_cols * num_rows), num_rows
+
+def unframe_text(text: str, framed: bool) -> str:
+    """
+    Знімає доповнення, додане frame_text.
+
+    :param text: Розшифрований текст матриці.
+    :param framed: True, якщо використовувалось однозначне доповнення.
+    :return: Текст без доповнення.
+    """
+    return unpad_block(text) if framed else text.rstrip()
+
+@instrumentation.instrument()
+def transpos_cols_encrypt(text: str, key: str, log: bool = False, framed: bool = False) -> str:
     """
     Шифрує текст за методом перестановки стовпчиків.
 
     :param text: Вхідний текст для шифрування.
     :param key: Ключ для шифрування.
     :param log: Якщо True, виводить матрицю.
+    :param framed: Якщо True, використовує однозначне доповнення (див. frame_text).
     :return: Зашифрований текст.
     """
-    if not text or not key:
+    if not key or not (text or framed):
         raise ValueError("Text and key must not be empty.")
 
     num_cols = len(key)
-    matrix = create_matrix(text, num_cols)
+    padded_text, num_rows = frame_text(text, num_cols, framed)
 
     if log:
         print("Матриця для шифрування (ключ: {}):".format(key))
-        for row in matrix:
-            print(row)
-
-    # Визначаємо порядок стовпчиків на основі ключа
-    sorted_key_indices = sorted(range(num_cols), key=lambda k: key[k])
+        print_rows(padded_text, num_cols)
 
     # Шифруємо, зчитуючи матрицю по колонках у порядку ключа
-    encrypted_text = ''.join(''.join(row[col_index] for row in matrix) for col_index in sorted_key_indices)
-    return encrypted_text
+    return gather_columns(padded_text, transposition_plan(num_rows, key))
 
-def transpos_cols_decrypt(encrypted_text: str, key: str, log: bool = False) -> str:
+@instrumentation.instrument()
+def transpos_cols_decrypt(encrypted_text: str, key: str, log: bool = False, framed: bool = False) -> str:
     """
     Розшифровує текст за методом перестановки стовпчиків.
 
     :param encrypted_text: Зашифрований текст.
     :param key: Ключ для розшифрування.
     :param log: Якщо True, виводить матрицю.
+    :param framed: Якщо True, знімає однозначне доповнення замість rstrip().
     :return: Розшифрований текст.
     """
     if not encrypted_text or not key:
@@ -55,28 +224,18 @@ def transpos_cols_decrypt(encrypted_text: str, key: str, log: bool = False) -> s
     num_cols = len(key)
     num_rows = len(encrypted_text) // num_cols
 
-    # Визначаємо порядок стовпчиків на основі ключа
-    sorted_key_indices = sorted(range(num_cols), key=lambda k: key[k])
-
-    # Відновлюємо матрицю, зчитуючи по колонках
-    matrix = [[''] * num_cols for _ in range(num_rows)]
-    index = 0
-    for col_index in sorted_key_indices:
-        for row in range(num_rows):
-            matrix[row][col_index] = encrypted_text[index]
-            index += 1
+    # Відновлюємо матрицю, розкладаючи колонки на їхні місця
+    decrypted_text = scatter_columns(encrypted_text, transposition_plan(num_rows, key), num_rows * num_cols)
 
     if log:
         print("Матриця для дешифрування (ключ: {}):".format(key))
-        for row in matrix:
-            print(row)
+        print_rows(decrypted_text, num_cols)
 
-    # Зчитуємо текст по рядках
-    decrypted_text = ''.join(''.join(row) for row in matrix)
-    return decrypted_text.rstrip()
+    return unframe_text(decrypted_text, framed)
 
 
-def double_transpos_encrypt(text: str, key_row: str, key_col: str, log: bool = False) -> str:
+@instrumentation.instrument()
+def double_transpos_encrypt(text: str, key_row: str, key_col: str, log: bool = False, framed: bool = False) -> str:
     """
     Шифрує текст за методом подвійної перестановки.
 
@@ -84,30 +243,24 @@ def double_transpos_encrypt(text: str, key_row: str, key_col: str, log: bool = F
     :param key_row: Ключ для перестановки рядків.
     :param key_col: Ключ для перестановки стовпчиків.
     :param log: Якщо True, виводить проміжні матриці.
+    :param framed: Якщо True, використовує однозначне доповнення (див. frame_text).
     :return: Зашифрований текст.
     """
+    if not key_col or not key_row:
+        raise ValueError("Keys must not be empty.")
     num_cols = len(key_col)
-    matrix = create_matrix(text, num_cols)
-
-    # Перестановка рядків
-    row_indices = sorted(range(len(matrix)), key=lambda i: key_row[i % len(key_row)])
-    reordered_matrix = [matrix[i] for i in row_indices]
+    padded_text, num_rows = frame_text(text, num_cols, framed)
 
     if log:
         print("Матриця після перестановки рядків (ключ: {}):".format(key_row))
-        for row in reordered_matrix:
-            print(row)
+        print_rows(padded_text, num_cols, row_permutation(key_row, num_rows))
 
-    # Перестановка стовпчиків
-    col_indices = sorted(range(num_cols), key=lambda k: key_col[k])
-    encrypted_text = ''.join(
-        ''.join(row[col_index] for row in reordered_matrix) for col_index in col_indices
-    )
+    # Перестановка рядків і стовпчиків одним планом
+    return gather_columns(padded_text, transposition_plan(num_rows, key_col, key_row))
 
-    return encrypted_text
 
-
-def double_transpos_decrypt(encrypted_text: str, key_row: str, key_col: str, log: bool = False) -> str:
+@instrumentation.instrument()
+def double_transpos_decrypt(encrypted_text: str, key_row: str, key_col: str, log: bool = False, framed: bool = False) -> str:
     """
     Розшифровує текст за методом подвійної перестановки.
 
@@ -115,56 +268,675 @@ def double_transpos_decrypt(encrypted_text: str, key_row: str, key_col: str, log
     :param key_row: Ключ для перестановки рядків.
     :param key_col: Ключ для перестановки стовпчиків.
     :param log: Якщо True, виводить проміжні матриці.
+    :param framed: Якщо True, знімає однозначне доповнення замість rstrip().
     :return: Розшифрований текст.
     """
+    if not key_col or not key_row:
+        raise ValueError("Keys must not be empty.")
     num_cols = len(key_col)
     num_rows = len(encrypted_text) // num_cols
 
-    # Відновлення матриці з перестановкою стовпчиків
-    col_indices = sorted(range(num_cols), key=lambda k: key_col[k])
-    matrix = [[''] * num_cols for _ in range(num_rows)]
-    index = 0
-    for col_index in col_indices:
-        for row in range(num_rows):
-            matrix[row][col_index] = encrypted_text[index]
-            index += 1
+    # Відновлення перестановки стовпчиків і рядків одним планом
+    plan = transposition_plan(num_rows, key_col, key_row)
+    decrypted_text = scatter_columns(encrypted_text, plan, num_rows * num_cols)
 
     if log:
         print("Матриця після перестановки стовпчиків (ключ: {}):".format(key_col))
-        for row in matrix:
-            print(row)
-
-    # Відновлення перестановки рядків
-    row_indices = sorted(range(num_rows), key=lambda i: key_row[i % len(key_row)])
-    row_order = sorted(range(len(row_indices)), key=lambda i: row_indices[i])
-    reordered_matrix = [matrix[i] for i in row_order]
+        print_rows(decrypted_text, num_cols, row_permutation(key_row, num_rows))
 
     # Читання тексту по рядках
-    decrypted_text = ''.join(''.join(row) for row in reordered_matrix)
-    return decrypted_text.rstrip()
+    return unframe_text(decrypted_text, framed)
+
+
+def gather_buffer(source: memoryview, target: memoryview, plan):
+    """
+    gather_columns для байтових буферів: кожен зріз плану копіюється безпосередньо в target.
+
+    :param source: Байти повної матриці, зчитаної по рядках.
+    :param target: Буфер для шифротексту того ж розміру.
+    :param plan: План з transposition_plan.
+    """
+    index = 0
+    for starts, step, lengths in plan:
+        total = sum(lengths)
+        for offset, start in enumerate(starts):
+            target[index + offset:index + total:len(starts)] = source[start::step]
+        index += total
+
+
+def scatter_buffer(source: memoryview, target: memoryview, plan):
+    """
+    scatter_columns для байтових буферів: блоки шифротексту копіюються на свої місця в target.
+
+    :param source: Байти шифротексту.
+    :param target: Буфер для матриці того ж розміру.
+    :param plan: План з transposition_plan.
+    """
+    index = 0
+    for starts, step, lengths in plan:
+        total = sum(lengths)
+        for offset, start in enumerate(starts):
+            target[start::step] = source[index + offset:index + total:len(starts)]
+        index += total
+
+
+@instrumentation.instrument()
+def transpos_bytes(data, key_col: str, out=None, key_row: str = None, decrypt: bool = False):
+    """
+    Перестановка стовпчиків (з key_row - подвійна) над байтовим буфером без декодування.
+
+    Вхід - bytes, bytearray, memoryview або mmap; кожен стовпчик копіюється одним
+    зрізом буфера в буфер out без проміжних рядків. Доповнення не додається: довжина
+    даних має бути кратною довжині ключа (див. pad_block для тексту). Перестановку
+    не можна виконати на місці, тому out не може бути тим самим буфером, що й data.
+
+    :param data: Вхідний буфер.
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param out: Буфер для запису (за замовчуванням - новий bytearray).
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :param decrypt: True для дешифрування.
+    :return: Буфер out.
+    """
+    if not key_col or key_row == '':
+        raise ValueError("Keys must not be empty.")
+    source = memoryview(data).cast('B')
+    num_cols = len(key_col)
+    if len(source) % num_cols:
+        raise ValueError("Data length must be a multiple of the key length.")
+    if out is None:
+        out = bytearray(len(source))
+    target = memoryview(out).cast('B')
+    if len(target) < len(source):
+        raise ValueError("Output buffer is too small.")
+    if target.obj is source.obj:
+        raise ValueError("Output buffer must not be the input buffer.")
+
+    plan = transposition_plan(len(source) // num_cols, key_col, key_row)
+    (scatter_buffer if decrypt else gather_buffer)(source, target[:len(source)], plan)
+    return out
+
+
+def pad_block(text: str, block_size: int) -> str:
+    """
+    Доповнює останній блок однозначною позначкою: PAD_MARK, а потім PAD_FILL до кінця блоку.
+    Позначка додається завжди, тому її можна зняти без знання довжини тексту.
+
+    :param text: Залишок тексту (коротший за блок).
+    :param block_size: Розмір блоку.
+    :return: Повний блок.
+    """
+    return (text + PAD_MARK).ljust(block_size, PAD_FILL)
+
+def unpad_block(block: str) -> str:
+    """
+    Знімає доповнення, додане pad_block.
+
+    :param block: Останній розшифрований блок.
+    :return: Текст без доповнення.
+    """
+    text = block.rstrip(PAD_FILL)
+    if not text.endswith(PAD_MARK):
+        raise ValueError("Invalid padding in the last block.")
+    return text[:-1]
+
+def iter_blocks(chunks: Iterable[str], block_size: int) -> Iterator[str]:
+    """
+    Переформовує потік фрагментів тексту у блоки фіксованого розміру.
+    Останній елемент - залишок, коротший за блок (можливо порожній).
+
+    :param chunks: Фрагменти тексту.
+    :param block_size: Розмір блоку.
+    :return: Генератор блоків.
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while len(buffer) - start >= block_size:
+            yield buffer[start:start + block_size]
+            start += block_size
+        buffer = buffer[start:]
+    yield buffer
+
+def encrypt_block(block: str, key_col: str, key_row: str = None) -> str:
+    """
+    Шифрує один повний блок (без доповнення пробілами і без rstrip).
+
+    :param block: Блок розміром rows * len(key_col).
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :return: Зашифрований блок.
+    """
+    return gather_columns(block, transposition_plan(len(block) // len(key_col), key_col, key_row))
+
+def decrypt_block(block: str, key_col: str, key_row: str = None) -> str:
+    """
+    Розшифровує один повний блок.
+
+    :param block: Зашифрований блок розміром rows * len(key_col).
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :return: Розшифрований блок.
+    """
+    return scatter_columns(block, transposition_plan(len(block) // len(key_col), key_col, key_row), len(block))
+
+def map_blocks(function, blocks: Iterable[str], workers: int = 0) -> Iterator[str]:
+    """
+    Обробляє блоки по порядку, за потреби - паралельно в пулі процесів.
+    У роботі одночасно не більше 2 * workers блоків, тому пам'ять обмежена.
+
+    :param function: Функція обробки одного блоку.
+    :param blocks: Блоки.
+    :param workers: Кількість процесів (0 - обробка в поточному процесі).
+    :return: Генератор оброблених блоків.
+    """
+    if not workers:
+        yield from map(function, blocks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for block in blocks:
+            pending.append(executor.submit(function, block))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def transpos_stream_encrypt(chunks: Iterable[str], key_col: str, key_row: str = None,
+                            rows_per_block: int = 1024, workers: int = 0) -> Iterator[str]:
+    """
+    Потокове шифрування блоками по rows_per_block * len(key_col) символів.
+
+    Кожен блок переставляється незалежно, останній доповнюється pad_block,
+    тому пам'ять не залежить від довжини потоку, а блоки можна обробляти паралельно.
+
+    :param chunks: Фрагменти відкритого тексту.
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :param rows_per_block: Кількість рядків матриці в одному блоці.
+    :param workers: Кількість процесів (0 - обробка в поточному процесі).
+    :return: Генератор зашифрованих блоків.
+    """
+    if not key_col or key_row == '':
+        raise ValueError("Keys must not be empty.")
+    block_size = rows_per_block * len(key_col)
+
+    def padded_blocks():
+        for block in iter_blocks(chunks, block_size):
+            yield block if len(block) == block_size else pad_block(block, block_size)
 
+    yield from map_blocks(partial(encrypt_block, key_col=key_col, key_row=key_row), padded_blocks(), workers)
 
-def read_file(file_path: str) -> str:
+def transpos_stream_decrypt(chunks: Iterable[str], key_col: str, key_row: str = None,
+                            rows_per_block: int = 1024, workers: int = 0) -> Iterator[str]:
     """
-    Зчитує текст із файлу.
-    
-    :param file_path: Шлях до файлу.
-    :return: Вміст файлу.
+    Потокове дешифрування шифротексту, отриманого transpos_stream_encrypt.
+
+    :param chunks: Фрагменти шифротексту.
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :param rows_per_block: Кількість рядків матриці в одному блоці.
+    :param workers: Кількість процесів (0 - обробка в поточному процесі).
+    :return: Генератор розшифрованих фрагментів.
+    """
+    if not key_col or key_row == '':
+        raise ValueError("Keys must not be empty.")
+    block_size = rows_per_block * len(key_col)
+
+    def full_blocks():
+        for block in iter_blocks(chunks, block_size):
+            if block:
+                if len(block) != block_size:
+                    raise ValueError("Encrypted stream is not a whole number of blocks.")
+                yield block
+
+    # Останній блок містить доповнення, тому результат видається з затримкою на один блок
+    previous = None
+    for block in map_blocks(partial(decrypt_block, key_col=key_col, key_row=key_row), full_blocks(), workers):
+        if previous is not None:
+            yield previous
+        previous = block
+    if previous is None:
+        raise ValueError("Encrypted stream is empty.")
+    yield unpad_block(previous)
+
+def read_chunks(file, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Читає текстовий файл фрагментами по chunk_size символів.
+
+    :param file: Текстовий файл.
+    :param chunk_size: Розмір фрагмента.
+    :return: Генератор фрагментів.
     """
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def transpos_file(source, target, key_col: str, key_row: str = None, decrypt: bool = False,
+                  rows_per_block: int = 1024, workers: int = 0):
+    """
+    Блокове шифрування (дешифрування) файлового об'єкта з обмеженим використанням пам'яті.
+
+    :param source: Текстовий файл для читання.
+    :param target: Текстовий файл для запису результату.
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :param decrypt: True для дешифрування.
+    :param rows_per_block: Кількість рядків матриці в одному блоці.
+    :param workers: Кількість процесів (0 - обробка в поточному процесі).
+    """
+    stream = transpos_stream_decrypt if decrypt else transpos_stream_encrypt
+    for block in stream(read_chunks(source), key_col, key_row, rows_per_block, workers):
+        target.write(block)
+
+
+def transpos_path(input_path: str, output_path: str, key_col: str, key_row: str = None, decrypt: bool = False,
+                  rows_per_block: int = 1024, workers: int = 0):
+    """
+    Блокове шифрування (дешифрування) файлу: вхід відображається в пам'ять і декодується
+    фрагментами (cipher_io.iter_text), результат пишеться у буферизований файл.
+
+    :param input_path: Вхідний файл.
+    :param output_path: Файл результату.
+    :param key_col: Ключ для перестановки стовпчиків.
+    :param key_row: Ключ для перестановки рядків (None для простої перестановки).
+    :param decrypt: True для дешифрування.
+    :param rows_per_block: Кількість рядків матриці в одному блоці.
+    :param workers: Кількість процесів (0 - обробка в поточному процесі).
+    """
+    stream = transpos_stream_decrypt if decrypt else transpos_stream_encrypt
+    with cipher_io.open_output(output_path, 'utf-8') as target:
+        for block in stream(cipher_io.iter_text(input_path), key_col, key_row, rows_per_block, workers):
+            target.write(block)
+
+
+def split_columns(encrypted_text: str, num_cols: int) -> Tuple[str, ...]:
+    """
+    Розбиває шифротекст на стовпчики у порядку зчитування.
+
+    :param encrypted_text: Зашифрований текст (довжина кратна num_cols).
+    :param num_cols: Кількість стовпчиків.
+    :return: Стовпчики шифротексту.
+    """
+    num_rows = len(encrypted_text) // num_cols
+    return tuple(encrypted_text[i * num_rows:(i + 1) * num_rows] for i in range(num_cols))
+
+def column_count_candidates(length: int, max_cols: int, min_cols: int = 2) -> List[int]:
+    """
+    Можливі довжини ключа: шифротекст - повна матриця, тому кількість стовпчиків ділить його довжину.
+
+    :param length: Довжина шифротексту.
+    :param max_cols: Максимальна кількість стовпчиків.
+    :param min_cols: Мінімальна кількість стовпчиків.
+    :return: Дільники довжини в діапазоні [min_cols, max_cols].
+    """
+    return [num_cols for num_cols in range(min_cols, max_cols + 1) if length % num_cols == 0]
+
+def key_from_ranks(ranks: Sequence[int]) -> str:
+    """
+    Будує ключ, що дає заданий порядок: позиція з рангом k отримує k-ту літеру.
+
+    :param ranks: Ранг кожної позиції ключа (однакові ранги - однакові літери).
+    :return: Ключ.
+    """
+    dense = {rank: i for i, rank in enumerate(sorted(set(ranks)))}
+    return ''.join(chr(ord('A') + dense[rank]) for rank in ranks)
+
+@instrumentation.instrument()
+def climb_columns(columns: Tuple[str, ...], seed: int, model: ngram_model.NgramModel, wrap: bool = True) -> Tuple[float, Tuple[int, ...]]:
+    """
+    Пошук порядку стовпчиків сходженням на вершину з випадкового старту.
+
+    Оцінка - сума квадграм відкритого тексту, згрупована за вікнами: вікно p - це
+    квадграми, що починаються в стовпчику p в усіх рядках. Оцінка вікна залежить лише
+    від чотирьох стовпчиків і місця переходу на наступний рядок, тому запам'ятовується:
+    після обміну стовпчиків чи переносу блоку перераховуються лише нові вікна
+    (O(рядків) кожне), а решта береться з кешу.
+
+    :param columns: Стовпчики шифротексту у порядку зчитування.
+    :param seed: Зерно випадкового стартового порядку.
+    :param model: Мовна модель для квадграмної оцінки.
+    :param wrap: True - враховувати квадграми на межі рядків (проста перестановка);
+                 False - лише всередині рядків (порядок рядків невідомий).
+    :return: Оцінка і перестановка: perm[p] - номер стовпчика шифротексту в позиції p.
+    """
+    table = model.table(4)
+    num_cols = len(columns)
+    codes = [model.codes(column) for column in columns]
+    # weights[t][c] - коди стовпчика c, помножені на вагу t-ї літери квадграми
+    weights = [[[code * model.base ** (3 - t) for code in column] for column in codes] for t in range(4)]
+    windows = range(num_cols if wrap else num_cols - 3)
+    cache = {}
+
+    def window_score(perm, p):
+        # Квадграми з позицій p..p+3; позиції за краєм рядка беруться з наступного рядка
+        key = tuple(perm[(p + t) % num_cols] for t in range(4)) + (num_cols - p,)
+        score = cache.get(key)
+        if score is None:
+            parts = [weights[t][perm[(p + t) % num_cols]][(p + t) // num_cols:] for t in range(4)]
+            score = cache[key] = sum(map(table.__getitem__, map(sum, zip(*parts))))
+        return score
+
+    def total_score(perm):
+        return sum(window_score(perm, p) for p in windows)
+
+    def apply_move(perm, a, b, shift):
+        # shift == 0 - обмін двох стовпчиків, інакше циклічний зсув відрізка (перенос блоку)
+        if not shift:
+            perm = list(perm)
+            perm[a], perm[b] = perm[b], perm[a]
+            return perm
+        return perm[:a] + perm[a + shift:b + 1] + perm[a:a + shift] + perm[b + 1:]
+
+    moves = [(a, b, shift) for a in range(num_cols - 1) for b in range(a + 1, num_cols) for shift in range(b - a)]
+
+    perm = list(range(num_cols))
+    random.Random(seed).shuffle(perm)
+    best = total_score(perm)
+
+    improved = True
+    passes = 0
+    while improved:
+        improved = False
+        passes += 1
+        for move in moves:
+            candidate = apply_move(perm, *move)
+            score = total_score(candidate)
+            if score > best + 1e-9:
+                perm, best, improved = candidate, score, True
+
+    instrumentation.count('transpos.moves_tried', passes * len(moves))
+    instrumentation.count('transpos.windows_scored', len(cache))
+    return best, tuple(perm)
+
+@instrumentation.instrument()
+def climb_rows(rows: Tuple[str, ...], period: int, seed: int, model: ngram_model.NgramModel) -> Tuple[float, Tuple[int, ...]]:
+    """
+    Пошук ключа рядків для подвійної перестановки сходженням на вершину.
+
+    Стан - ранги залишків 0..period-1 (однакові ранги - однакові літери ключа), порядок
+    рядків матриці будується так само, як у row_permutation. Оцінка - квадграми на межах
+    сусідніх рядків відкритого тексту. Після сходження виконуються ROW_KICKS випадкових
+    поштовхів з новим сходженням (ітерований локальний пошук).
+
+    :param rows: Рядки матриці після відновлення порядку стовпчиків (у переставленому порядку).
+    :param period: Довжина ключа рядків.
+    :param seed: Зерно випадкового старту.
+    :param model: Мовна модель для квадграмної оцінки.
+    :return: Оцінка і ранги залишків.
+    """
+    table = model.table(4)
+    num_rows = len(rows)
+    base = model.base
+    residues = [i % period for i in range(num_rows)]
+
+    # Індекс квадграми на межі рядків x -> y розкладається на внесок кінця x і початку y:
+    # три квадграми t0 t1 t2 h0, t1 t2 h0 h1, t2 h0 h1 h2
+    parts = []
+    for k in range(3):
+        tails = [sum(code * base ** (3 - t) for t, code in enumerate(model.codes(row[-3:])[k:])) for row in rows]
+        heads = [sum(code * base ** (k - t) for t, code in enumerate(model.codes(row[:k + 1]))) for row in rows]
+        parts.append((tails, heads))
+
+    def order_of(ranks):
+        # Те саме впорядкування, що й row_permutation, але з ключем на рівні C
+        return sorted(range(num_rows), key=list(map(ranks.__getitem__, residues)).__getitem__)
+
+    def total_score(ranks):
+        position = sorted(range(num_rows), key=order_of(ranks).__getitem__)
+        previous, following = position[:-1], position[1:]
+        return sum(
+            sum(map(table.__getitem__, map(add, map(tails.__getitem__, previous), map(heads.__getitem__, following))))
+            for tails, heads in parts
+        )
+
+    def apply_move(ranks, kind, a, b):
+        ranks = list(ranks)
+        if kind == 'set':
+            ranks[a] = b
+        elif kind == 'swap':
+            ranks[a], ranks[b] = ranks[b], ranks[a]
+        elif a < b:
+            # Циклічний зсув рангів відрізка a..b вліво (b < a - вправо)
+            ranks[a:b + 1] = ranks[a + 1:b + 1] + ranks[a:a + 1]
+        else:
+            ranks[b:a + 1] = ranks[a:a + 1] + ranks[b:a]
+        return ranks
+
+    # Зміна рангу одного залишку (з'являються однакові літери), обмін і циклічний зсув рангів
+    moves = [('set', r, value) for r in range(period) for value in range(period)]
+    moves += [(kind, a, b) for kind in ('swap', 'rotate') for a in range(period - 1) for b in range(a + 1, period)]
+    moves += [('rotate', a, b) for a in range(1, period) for b in range(a)]
+
+    def climb(ranks, score):
+        improved = True
+        while improved:
+            improved = False
+            for move in moves:
+                candidate = apply_move(ranks, *move)
+                if candidate == ranks:
+                    continue
+                candidate_score = total_score(candidate)
+                if candidate_score > score + 1e-9:
+                    ranks, score, improved = candidate, candidate_score, True
+        return ranks, score
+
+    rng = random.Random(seed)
+    ranks = list(range(period))
+    rng.shuffle(ranks)
+    ranks, best = climb(ranks, total_score(ranks))
+
+    # Ітерований локальний пошук: кілька випадкових ходів від найкращого стану і нове сходження
+    for _ in range(ROW_KICKS):
+        candidate = ranks
+        for move in rng.sample(moves, min(3, len(moves))):
+            candidate = apply_move(candidate, *move)
+        candidate, score = climb(candidate, total_score(candidate))
+        if score > best + 1e-9:
+            ranks, best = candidate, score
+
+    # Циклічний зсув рангів зсуває відкритий текст на групу рядків і змінює лише одну межу,
+    # тому серед майже рівних зсувів обирається той, де доповнення пробілами стоїть у кінці
+    margin = 3 * abs(min(table))
+    candidates = []
+    for shift in range(period):
+        shifted = ranks[shift:] + ranks[:shift]
+        score = total_score(shifted)
+        if score >= best - margin:
+            last_row = rows[order_of(shifted).index(num_rows - 1)]
+            candidates.append((len(last_row.rstrip()) - len(last_row), -score, shifted))
+    _, score, ranks = min(candidates)
+    return -score, tuple(ranks)
+
+def climb_task(task: Tuple[Tuple[str, ...], int], model: ngram_model.NgramModel, wrap: bool = True) -> Tuple[float, Tuple[int, ...]]:
+    """
+    Обгортка climb_columns для map_blocks (один аргумент - завдання).
+
+    :param task: Стовпчики і зерно.
+    :param model: Мовна модель для квадграмної оцінки.
+    :param wrap: Див. climb_columns.
+    :return: Результат climb_columns.
+    """
+    columns, seed = task
+    return climb_columns(columns, seed, model, wrap)
+
+def climb_rows_task(task: Tuple[Tuple[str, ...], int, int], model: ngram_model.NgramModel) -> Tuple[float, Tuple[int, ...]]:
+    """
+    Обгортка climb_rows для map_blocks (один аргумент - завдання).
+
+    :param task: Рядки, довжина ключа рядків і зерно.
+    :param model: Мовна модель для квадграмної оцінки.
+    :return: Результат climb_rows.
+    """
+    rows, period, seed = task
+    return climb_rows(rows, period, seed, model)
+
+@instrumentation.instrument()
+def search_columns(encrypted_text: str, model: ngram_model.NgramModel, candidates: Iterable[int], wrap: bool = True,
+                   restarts: int = 8, workers: int = 0) -> Tuple[float, Tuple[int, ...]]:
+    """
+    Перебирає кількості стовпчиків і запускає restarts сходжень для кожної.
+    Сходження незалежні, тому розподіляються по пулу процесів через map_blocks.
+
+    :param encrypted_text: Зашифрований текст.
+    :param model: Мовна модель для квадграмної оцінки.
+    :param candidates: Кількості стовпчиків.
+    :param wrap: Див. climb_columns.
+    :param restarts: Кількість випадкових стартів для кожної кількості стовпчиків.
+    :param workers: Кількість процесів (0 - у поточному процесі).
+    :return: Середня оцінка на квадграму і найкраща перестановка.
+    """
+    tasks = [(split_columns(encrypted_text, num_cols), seed) for num_cols in candidates for seed in range(restarts)]
+    if not tasks:
+        raise ValueError("No column count divides the ciphertext length.")
+
+    best = None
+    for (columns, _), (score, perm) in zip(tasks, map_blocks(partial(climb_task, model=model, wrap=wrap), tasks, workers)):
+        num_rows, num_cols = len(columns[0]), len(columns)
+        quadgrams = num_rows * num_cols - 3 if wrap else num_rows * (num_cols - 3)
+        if best is None or score / quadgrams > best[0]:
+            best = (score / quadgrams, perm)
+    return best
+
+@instrumentation.instrument()
+def crack_columns(encrypted_text: str, model: ngram_model.NgramModel, max_cols: int = 20,
+                  restarts: int = 8, workers: int = 0) -> Tuple[str, float]:
+    """
+    Відновлює ключ простої перестановки стовпчиків без знання ключа.
+
+    :param encrypted_text: Зашифрований текст.
+    :param model: Мовна модель відкритого тексту для квадграмної оцінки.
+    :param max_cols: Максимальна довжина ключа.
+    :param restarts: Кількість випадкових стартів для кожної довжини ключа.
+    :param workers: Кількість процесів (0 - у поточному процесі).
+    :return: Ключ і середня log10-оцінка на квадграму.
+    """
+    candidates = column_count_candidates(len(encrypted_text), max_cols)
+    score, perm = search_columns(encrypted_text, model, candidates, True, restarts, workers)
+    return key_from_ranks(perm), score
+
+@instrumentation.instrument()
+def crack_double(encrypted_text: str, model: ngram_model.NgramModel, max_cols: int = 20, max_row_key: int = 20,
+                 restarts: int = 8, workers: int = 0) -> Tuple[str, str, float]:
+    """
+    Відновлює обидва ключі подвійної перестановки.
+
+    Перестановка рядків не змінює вміст рядків, тому спочатку ключ стовпчиків
+    шукається за квадграмами всередині рядків, а потім для кожної довжини ключа
+    рядків - порядок рядків за квадграмами на їхніх межах.
+
+    :param encrypted_text: Зашифрований текст.
+    :param model: Мовна модель відкритого тексту для квадграмної оцінки.
+    :param max_cols: Максимальна довжина ключа стовпчиків.
+    :param max_row_key: Максимальна довжина ключа рядків.
+    :param restarts: Кількість випадкових стартів для кожної довжини ключа.
+    :param workers: Кількість процесів (0 - у поточному процесі).
+    :return: Ключ рядків, ключ стовпчиків і середня log10-оцінка на квадграму меж рядків.
+    """
+    # Квадграми всередині рядка потребують щонайменше 4 стовпчиків
+    candidates = column_count_candidates(len(encrypted_text), max_cols, 4)
+    _, perm = search_columns(encrypted_text, model, candidates, False, restarts, workers)
+    key_col = key_from_ranks(perm)
+
+    num_cols = len(key_col)
+    matrix = decrypt_block(encrypted_text, key_col)
+    rows = tuple(matrix[i:i + num_cols] for i in range(0, len(matrix), num_cols))
+    if len(rows) < 2:
+        return 'A', key_col, 0.0
+
+    tasks = [(rows, period, seed) for period in range(1, min(max_row_key, len(rows)) + 1) for seed in range(restarts)]
+    best = None
+    for (_, period, _), (score, ranks) in zip(tasks, map_blocks(partial(climb_rows_task, model=model), tasks, workers)):
+        # Ключ, кратний справжньому, дає ту саму оцінку, тому довші ключі штрафуються
+        score /= len(rows) - 1
+        if best is None or score - ROW_KEY_PENALTY * period > best[0]:
+            best = (score - ROW_KEY_PENALTY * period, score, ranks)
+
+    _, score, ranks = best
+    return key_from_ranks(ranks), key_col, score / 3
+
+
+def main(argv=None):
+    """
+    Командний рядок: блокова обробка stdin -> stdout і криптоаналіз.
+
+    Приклади:
+        python 2_transpos.py encrypt --key CRYPTO --row-key SECRET < log.txt > log.enc
+        python 2_transpos.py encrypt --key CRYPTO --input log.txt --output log.enc
+        python 2_transpos.py crack message.enc --model english.ngm --double --workers 8
+    """
+    parser = argparse.ArgumentParser(description="Шифри перестановки")
+    commands = parser.add_subparsers(dest='mode', required=True)
+
+    for mode in ('encrypt', 'decrypt'):
+        command = commands.add_parser(mode, help="Блокова обробка stdin -> stdout")
+        command.add_argument('--key', required=True, help="Ключ для перестановки стовпчиків")
+        command.add_argument('--row-key', default=None, help="Ключ для перестановки рядків (подвійна перестановка)")
+        command.add_argument('--rows', type=int, default=1024, help="Кількість рядків у блоці")
+        command.add_argument('--workers', type=int, default=0, help="Кількість процесів")
+        command.add_argument('--input', help="Вхідний файл (відображається в пам'ять) замість stdin")
+        command.add_argument('--output', help="Файл результату замість stdout (разом з --input)")
+
+    command = commands.add_parser('crack', help="Пошук ключа для шифротексту transpos_cols_encrypt / double_transpos_encrypt")
+    command.add_argument('input', help="Файл із шифротекстом")
+    command.add_argument('--model', default='plain_text.txt',
+                         help="Мовна модель ngram_model або корпус мовою відкритого тексту для квадграм")
+    command.add_argument('--double', action='store_true', help="Подвійна перестановка")
+    command.add_argument('--max-cols', type=int, default=20)
+    command.add_argument('--max-row-key', type=int, default=20)
+    command.add_argument('--restarts', type=int, default=8, help="Кількість випадкових стартів")
+    command.add_argument('--workers', type=int, default=0, help="Кількість процесів")
+    args = parser.parse_args(argv)
+    if args.mode != 'crack' and bool(args.input) != bool(args.output):
+        parser.error("--input and --output must be used together")
+
+    # newline='' зберігає оригінальні символи кінця рядка
+    sys.stdin.reconfigure(encoding='utf-8', newline='')
+    sys.stdout.reconfigure(encoding='utf-8', newline='')
+
+    if args.mode != 'crack':
+        try:
+            if args.input:
+                transpos_path(args.input, args.output, args.key, args.row_key, args.mode == 'decrypt',
+                              args.rows, args.workers)
+            else:
+                transpos_file(sys.stdin, sys.stdout, args.key, args.row_key, args.mode == 'decrypt',
+                              args.rows, args.workers)
+        except (cipher_io.CipherIOError, ValueError) as error:
+            parser.exit(1, f"Помилка: {error}\n")
+        return
+
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
-    except FileNotFoundError:
-        print(f"Файл {file_path} не знайдено.")
-        return ""
-    except Exception as e:
-        print(f"Помилка читання файлу {file_path}: {e}")
-        return ""
+        encrypted_text = cipher_io.read_text(args.input, newline='')
+        model = ngram_model.load_model(args.model)
+        if args.double:
+            key_row, key_col, score = crack_double(encrypted_text, model, args.max_cols, args.max_row_key,
+                                                   args.restarts, args.workers)
+        else:
+            key_col, score = crack_columns(encrypted_text, model, args.max_cols, args.restarts, args.workers)
+    except (cipher_io.CipherIOError, ValueError) as error:
+        parser.exit(1, f"Помилка: {error}\n")
+    if args.double:
+        print(f"Ключ рядків: {key_row}\nКлюч стовпчиків: {key_col}\nОцінка: {score:.3f}")
+        print(double_transpos_decrypt(encrypted_text, key_row, key_col))
+    else:
+        print(f"Ключ: {key_col}\nОцінка: {score:.3f}")
+        print(transpos_cols_decrypt(encrypted_text, key_col))
 
 
 # Тестування
 if __name__ == "__main__":
-    original_text = read_file("plain_text.txt")
+    if len(sys.argv) > 1:
+        main()
+        sys.exit()
+
+    try:
+        original_text = cipher_io.read_text("plain_text.txt")
+    except cipher_io.CipherIOError as error:
+        sys.exit(f"Помилка: {error}")
     key = "SECRET"
 
     # Шифрування тексту
@@ -176,7 +948,6 @@ if __name__ == "__main__":
     decrypted = transpos_cols_decrypt(encrypted, key)
     print(f"Дешифрований текст методом перестановки стовпчиків:\n{decrypted}\n")
 
-    original_text = read_file("plain_text.txt")
     key_row = "SECRET"
     key_col = "CRYPTO"
 
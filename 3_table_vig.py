@@ -1,25 +1,41 @@
+import argparse
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from operator import add, sub
+import alphabets
+import cipher_io
+import instrumentation
+import ngram_model
 vigenere = __import__('1_vigenere')
 
-# Константа алфавіту
-ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# Алфавіт за замовчуванням: латиниця, квадрат 5x5 (I/J в одній клітинці)
+LATIN = alphabets.LATIN
+# Кількість скомпільованих ключів, що зберігаються в кеші
+KEY_CACHE_SIZE = 256
+# Байтовий режим: усі 256 значень байта в квадраті 16x16
+BYTE_SQUARE_SIDE = 16
 
-def create_matrix(key: str) -> list[list[str]]:
+def create_matrix(key: str, alphabet: alphabets.Alphabet = LATIN) -> list[list[str]]:
     """
     Створює матрицю для Полібіанського квадрата на основі ключа.
-    Літера 'I' і 'J' об'єднуються в одну позицію.
+    Для латиниці літера 'I' і 'J' об'єднуються в одну позицію (5x5), для української
+    абетки 33 літери займають квадрат 6x6 з неповним останнім рядком.
     Аргументи:
         key (str): Ключ для створення матриці.
+        alphabet (Alphabet): Алфавіт квадрата.
     Повертає:
-        list[list[str]]: Матриця розміром 5x5.
+        list[list[str]]: Матриця розміром alphabet.square_side x alphabet.square_side.
     """
     unique_key = ''.join(sorted(set(key.upper()), key=key.upper().index))
-    unique_key = unique_key.replace('J', 'I')
-    modified_alphabet = ALPHABET.replace('J', '')
-    remaining_chars = ''.join([c for c in modified_alphabet if c not in unique_key])
+    for char, target in alphabet.square_merges.items():
+        unique_key = unique_key.replace(char, target)
+    remaining_chars = ''.join([c for c in alphabet.square_letters if c not in unique_key])
     matrix_chars = unique_key + remaining_chars
-    
-    return [matrix_chars[i:i + 5] for i in range(0, len(matrix_chars), 5)]
+    side = alphabet.square_side
+
+    return [matrix_chars[i:i + side] for i in range(0, len(matrix_chars), side)]
 
 
 def print_matrix(matrix: list[list[str]]):
@@ -33,7 +49,62 @@ def print_matrix(matrix: list[list[str]]):
         print(" ".join(row))
     print()
 
-def table_transform(text: str, key: str, encrypt: bool) -> str:
+class PolybiusTable(dict):
+    """
+    Таблиця перекладу для str.translate, скомпільована з квадрата Полібія.
+
+    Значення для кожного символу обчислюється один раз тим самим пошуком у стовпчиках
+    матриці, що й раніше, і кешується, тому наступні символи перекладаються
+    без жодного пошуку. Враховується регістр, а символи, яких немає
+    в матриці, залишаються без змін. Якщо останній рядок матриці неповний,
+    зсув виконується по колу в межах свого стовпчика. Літери алфавіту
+    і символи з кодами нижче alphabets.CACHED_CODES кешуються, решта - ні,
+    тож розмір таблиці обмежений.
+    """
+
+    def __init__(self, matrix: list[list[str]], direction: int, alphabet: alphabets.Alphabet = LATIN):
+        super().__init__()
+        self.columns = [[row[col] for row in matrix if col < len(row)] for col in range(len(matrix[0]))]
+        self.matrix = matrix
+        self.direction = direction
+        self.alphabet = alphabet
+        for char in alphabet.letters + alphabet.letters.lower():
+            self[ord(char)]
+
+    def __missing__(self, code: int) -> int:
+        char = chr(code)
+        transformed_char = char
+        if self.alphabet.is_letter(char):  # Обробляємо лише літери
+            for column_letters in self.columns:
+                if char.upper() in column_letters:
+                    row_index = column_letters.index(char.upper())
+                    transformed_char = column_letters[(row_index + self.direction) % len(column_letters)]
+                    transformed_char = transformed_char.lower() if char.islower() else transformed_char
+                    break
+        result = ord(transformed_char) if len(transformed_char) == 1 else transformed_char
+        if code < alphabets.CACHED_CODES:
+            self[code] = result
+        return result
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def compile_tables(key: str, alphabet: alphabets.Alphabet = LATIN) -> tuple[PolybiusTable, PolybiusTable]:
+    """
+    Компілює квадрат Полібія у таблиці перекладу для шифрування та дешифрування.
+    Таблиці зберігаються в обмеженому LRU-кеші (статистика - compile_tables.cache_info()).
+    Аргументи:
+        key (str): Ключ для створення матриці.
+        alphabet (Alphabet): Алфавіт квадрата.
+    Повертає:
+        tuple[PolybiusTable, PolybiusTable]: Таблиці для шифрування та дешифрування.
+    """
+    matrix = create_matrix(key, alphabet)
+    return PolybiusTable(matrix, 1, alphabet), PolybiusTable(matrix, -1, alphabet)
+
+
+@instrumentation.instrument()
+def table_transform(text: str, key: str, encrypt: bool, log: bool = False,
+                    alphabet: alphabets.Alphabet = LATIN) -> str:
     """
     Універсальна функція для шифрування або дешифрування тексту 
     за допомогою Полібіанського квадрата.
@@ -42,63 +113,511 @@ def table_transform(text: str, key: str, encrypt: bool) -> str:
         text (str): Текст для обробки.
         key (str): Ключ для створення матриці.
         encrypt (bool): True для шифрування, False для дешифрування.
+        log (bool): Якщо True, виводить матрицю.
+        alphabet (Alphabet): Алфавіт квадрата (за замовчуванням - латиниця 5x5).
 
     Returns:
         str: Оброблений текст.
     """
-    matrix = create_matrix(key)  # Створення матриці
-    print_matrix(matrix)  # Виведення матриці для наочності
-    direction = 1 if encrypt else -1  # Визначення напрямку зміщення
-    transformed_text = []
+    if log:
+        print_matrix(create_matrix(key, alphabet))  # Виведення матриці для наочності
+    encrypt_table, decrypt_table = compile_tables(key, alphabet)
+    return text.translate(encrypt_table if encrypt else decrypt_table)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def compile_byte_tables(key: str | bytes) -> tuple[bytes, bytes]:
+    """
+    Компілює байтовий квадрат 16x16 у таблиці bytes.translate.
+    Квадрат заповнюється байтами ключа (без повторів), а потім рештою значень 0-255
+    за зростанням; шифрування замінює байт наступним у стовпчику, як і для літер.
+    Аргументи:
+        key (str | bytes): Ключ (рядок кодується в UTF-8).
+    Повертає:
+        tuple[bytes, bytes]: Таблиці для шифрування та дешифрування.
+    """
+    key = key.encode('utf-8') if isinstance(key, str) else bytes(key)
+    square = list(dict.fromkeys(key + bytes(range(256))))
+    encrypt_table, decrypt_table = bytearray(256), bytearray(256)
+    for position, code in enumerate(square):
+        encrypt_table[code] = square[(position + BYTE_SQUARE_SIDE) % 256]
+        decrypt_table[code] = square[(position - BYTE_SQUARE_SIDE) % 256]
+    return bytes(encrypt_table), bytes(decrypt_table)
+
+
+@instrumentation.instrument()
+def table_transform_bytes(data, key: str | bytes, encrypt: bool, out=None, chunk_size: int = 1 << 20):
+    """
+    Квадрат Полібія над байтами без декодування тексту.
+    Вхід - будь-який буфер (bytes, bytearray, memoryview, mmap); результат записується
+    в out, який може збігатися з data (обробка на місці). Дані перекладаються
+    фрагментами по chunk_size байтів, тому тимчасова пам'ять не залежить від їхнього розміру.
+    Аргументи:
+        data: Вхідний буфер.
+        key (str | bytes): Ключ квадрата.
+        encrypt (bool): True для шифрування, False для дешифрування.
+        out: Буфер для запису (за замовчуванням - новий bytearray).
+        chunk_size (int): Розмір фрагмента в байтах.
+    Повертає:
+        Буфер out.
+    """
+    encrypt_table, decrypt_table = compile_byte_tables(key if isinstance(key, str) else bytes(key))
+    table = encrypt_table if encrypt else decrypt_table
+    source = memoryview(data).cast('B')
+    if out is None:
+        out = bytearray(len(source))
+    target = memoryview(out).cast('B')
+    if len(target) < len(source):
+        raise ValueError("Output buffer is too small.")
+    for start in range(0, len(source), chunk_size):
+        stop = min(start + chunk_size, len(source))
+        target[start:stop] = bytes(source[start:stop]).translate(table)
+    return out
 
-    for char in text:
-        if char.isalpha():  # Обробляємо лише літери
-            found = False
-            for col in range(len(matrix[0])):
-                column_letters = [matrix[row][col] for row in range(len(matrix))]
-                if char.upper() in column_letters:
-                    row_index = column_letters.index(char.upper())
-                    new_row = (row_index + direction) % len(matrix)
-                    transformed_char = matrix[new_row][col]
-                    transformed_text.append(transformed_char.lower() if char.islower() else transformed_char)
-                    found = True
-                    break
-            if not found:
-                transformed_text.append(char)  # Якщо буква не знайдена, додаємо її як є
-        else:
-            transformed_text.append(char)  # Нешифровані символи залишаються незмінними
-    return ''.join(transformed_text)
 
+@instrumentation.instrument()
+def best_assignment(weights: list[list[float]]) -> list[int]:
+    """
+    Задача про призначення (угорський алгоритм, O(n^3)): перестановка з найбільшою сумою ваг.
+    Аргументи:
+        weights (list[list[float]]): Квадратна матриця ваг weights[i][j].
+    Повертає:
+        list[int]: Для кожного рядка i - призначений стовпчик.
+    """
+    n = len(weights)
+    inf = float('inf')
+    u, v = [0.0] * (n + 1), [0.0] * (n + 1)
+    owner, way = [0] * (n + 1), [0] * (n + 1)
+    # Мінімізуємо від'ємні ваги; нульовий стовпчик - фіктивний, як у класичному записі
+    costs = [None] + [[0.0] + [-weight for weight in row] for row in weights]
+    for row in range(1, n + 1):
+        owner[0], col0 = row, 0
+        slack = [inf] * (n + 1)
+        free, used = list(range(1, n + 1)), [0]
+        while True:
+            row0 = owner[col0]
+            row_costs, u0 = costs[row0], u[row0]
+            delta, col1 = inf, 0
+            for col in free:
+                current = row_costs[col] - u0 - v[col]
+                if current < slack[col]:
+                    slack[col], way[col] = current, col0
+                    if current < delta:
+                        delta, col1 = current, col
+                elif slack[col] < delta:
+                    delta, col1 = slack[col], col
+            for col in used:
+                u[owner[col]] += delta
+                v[col] -= delta
+            for col in free:
+                slack[col] -= delta
+            free.remove(col1)
+            used.append(col1)
+            col0 = col1
+            if not owner[col0]:
+                break
+        while col0:
+            col1 = way[col0]
+            owner[col0] = owner[col1]
+            col0 = col1
+
+    assignment = [0] * n
+    for col in range(1, n + 1):
+        assignment[owner[col] - 1] = col - 1
+    return assignment
+
+
+def shift_weights(counts: list[int], shift: int, log_frequencies: list[float]) -> list[list[float]]:
+    """
+    Внесок одного залишку в логарифм правдоподібності: літера шифротексту c, що стоїть
+    на позиції y змішаного алфавіту, відповідає літері відкритого тексту y - shift.
+    Аргументи:
+        counts (list[int]): Лічильники літер шифротексту для залишку.
+        shift (int): Зсув ключа Віженера для залишку.
+        log_frequencies (list[float]): log10-частоти літер мови (NgramModel.log_frequencies).
+    Повертає:
+        list[list[float]]: Ваги weights[c][y].
+    """
+    logs = log_frequencies[-shift:] + log_frequencies[:-shift] if shift else log_frequencies
+    return [[count * log for log in logs] for count in counts]
+
+
+def add_weights(first: list[list[float]], second: list[list[float]], sign: int = 1) -> list[list[float]]:
+    """
+    Поелементна сума (sign=1) або різниця (sign=-1) матриць ваг.
+    Аргументи:
+        first (list[list[float]]): Перша матриця.
+        second (list[list[float]]): Друга матриця.
+        sign (int): Знак другої матриці.
+    Повертає:
+        list[list[float]]: Нова матриця.
+    """
+    if sign < 0:
+        return [list(map(sub, row_a, row_b)) for row_a, row_b in zip(first, second)]
+    return [list(map(add, row_a, row_b)) for row_a, row_b in zip(first, second)]
+
+
+def alphabet_fit(weights: list[list[float]]) -> tuple[float, list[int]]:
+    """
+    Найкраща обернена підстановка для фіксованих зсувів ключа: точний розв'язок задачі
+    про призначення літер шифротексту позиціям змішаного алфавіту.
+    Аргументи:
+        weights (list[list[float]]): Сумарні ваги всіх залишків.
+    Повертає:
+        tuple[float, list[int]]: Логарифм правдоподібності і обернена підстановка.
+    """
+    inverse = best_assignment(weights)
+    return sum(row[code] for row, code in zip(weights, inverse)), inverse
 
 
-def read_file(file_path: str) -> str:
+def pair_scores(counts: list[list[int]], log_frequencies: list[float], pair: tuple[int, int]) -> list[float]:
     """
-    Зчитує текст із файлу.
+    Оцінки відносного зсуву двох залишків: для кожного d - найкраща правдоподібність
+    двох стовпчиків, якщо зсув ключа другого більший на d.
     Аргументи:
-        file_path (str): Шлях до файлу.
+        counts (list[list[int]]): Лічильники літер для кожного залишку.
+        log_frequencies (list[float]): log10-частоти літер мови.
+        pair (tuple[int, int]): Номери двох залишків.
     Повертає:
-        str: Текст із файлу.
+        list[float]: Оцінки для кожного відносного зсуву.
     """
+    first, second = pair
+    instrumentation.count('table_vig.shifts_scored', len(log_frequencies))
+    base = shift_weights(counts[first], 0, log_frequencies)
+    return [alphabet_fit(add_weights(base, shift_weights(counts[second], d, log_frequencies)))[0] for d in range(len(log_frequencies))]
+
+
+@instrumentation.instrument()
+def solve_shifts(counts: list[list[int]], log_frequencies: list[float], workers: int = 0) -> tuple[float, list[int], list[int]]:
+    """
+    Зсуви ключа Віженера і змішаний алфавіт для періодичного шифру c = P(p + k).
+
+    1. Для кожної пари залишків оцінюються всі відносні зсуви (незалежні задачі,
+       за потреби - у пулі процесів).
+    2. З кожного залишку як опорного жадібно будується узгоджений набір зсувів і
+       покращується покоординатно за сумою парних оцінок.
+    3. Найкращий кандидат уточнюється покоординатно за повною правдоподібністю;
+       при зміні одного зсуву перераховується лише його внесок у ваги.
+    Аргументи:
+        counts (list[list[int]]): Лічильники літер для кожного залишку.
+        log_frequencies (list[float]): log10-частоти літер мови.
+        workers (int): Кількість процесів (0 - у поточному процесі).
+    Повертає:
+        tuple[float, list[int], list[int]]: Правдоподібність, зсуви ключа і обернена підстановка.
+    """
+    period, size = len(counts), len(log_frequencies)
+    pairs = [(a, b) for a in range(period) for b in range(a + 1, period)]
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = dict(zip(pairs, executor.map(partial(pair_scores, counts, log_frequencies), pairs)))
+    else:
+        tables = dict(zip(pairs, map(partial(pair_scores, counts, log_frequencies), pairs)))
+
+    def agreement(shifts, residue, shift):
+        total = 0.0
+        for other, other_shift in enumerate(shifts):
+            if other == residue or other_shift is None:
+                continue
+            if other < residue:
+                total += tables[other, residue][(shift - other_shift) % size]
+            else:
+                total += tables[residue, other][(other_shift - shift) % size]
+        return total
+
+    candidates = set()
+    for anchor in range(period):
+        shifts = [None] * period
+        shifts[anchor] = 0
+        for residue in sorted(range(period), key=lambda r: (r - anchor) % period)[1:]:
+            shifts[residue] = max(range(size), key=partial(agreement, shifts, residue))
+        improved = True
+        while improved:
+            improved = False
+            for residue in range(period):
+                shift = max(range(size), key=partial(agreement, shifts, residue))
+                if agreement(shifts, residue, shift) > agreement(shifts, residue, shifts[residue]) + 1e-9:
+                    shifts[residue], improved = shift, True
+        candidates.add(tuple((shift - shifts[0]) % size for shift in shifts))
+
+    contributions = {}
+
+    def contribution(residue, shift):
+        if (residue, shift) not in contributions:
+            contributions[residue, shift] = shift_weights(counts[residue], shift, log_frequencies)
+        return contributions[residue, shift]
+
+    def total_weights(shifts):
+        weights = contribution(0, shifts[0])
+        for residue in range(1, period):
+            weights = add_weights(weights, contribution(residue, shifts[residue]))
+        return weights
+
+    best = None
+    for candidate in candidates:
+        score, inverse = alphabet_fit(total_weights(candidate))
+        if best is None or score > best[0]:
+            best = (score, list(candidate), inverse)
+
+    score, shifts, inverse = best
+    weights = total_weights(shifts)
+    improved = True
+    while improved:
+        improved = False
+        for residue in range(1, period):
+            partial_weights = add_weights(weights, contribution(residue, shifts[residue]), -1)
+            for shift in range(size):
+                if shift == shifts[residue]:
+                    continue
+                candidate_weights = add_weights(partial_weights, contribution(residue, shift))
+                candidate_score, candidate_inverse = alphabet_fit(candidate_weights)
+                if candidate_score > score + 1e-9:
+                    score, inverse, weights, improved = candidate_score, candidate_inverse, candidate_weights, True
+                    shifts[residue] = shift
+                    partial_weights = add_weights(weights, contribution(residue, shift), -1)
+
+    return score, shifts, inverse
+
+
+def fixed_codes(alphabet: alphabets.Alphabet) -> list[int]:
+    """
+    Літери, яких немає в квадраті (J для латиниці): шифр їх не змінює.
+    Аргументи:
+        alphabet (Alphabet): Алфавіт.
+    Повертає:
+        list[int]: Номери таких літер.
+    """
+    return [code for code, char in enumerate(alphabet.letters) if char not in alphabet.square_letters]
+
+
+@instrumentation.instrument()
+def square_from_inverse(inverse: list[int], alphabet: alphabets.Alphabet = LATIN) -> str | None:
+    """
+    Відновлює квадрат Полібія з оберненої підстановки.
+    Шифрування переводить літеру в наступну в стовпчику, тому кожен стовпчик квадрата -
+    цикл підстановки P довжиною в стовпчик (рядки квадрата визначені з точністю до
+    циклічного зсуву, стовпчики - до перестановки, що не змінює шифр). У неповному
+    останньому рядку стоять довші стовпчики, тому вони йдуть першими.
+    Аргументи:
+        inverse (list[int]): Обернена підстановка (літери поза квадратом - нерухомі).
+        alphabet (Alphabet): Алфавіт квадрата.
+    Повертає:
+        str | None: Літери квадрата по рядках (ключ для table_transform) або None,
+        якщо підстановка не має структури квадрата.
+    """
+    size, side = alphabet.size, alphabet.square_side
+    forward = [0] * size
+    for cipher_code, code in enumerate(inverse):
+        forward[code] = cipher_code
+    fixed = fixed_codes(alphabet)
+    if any(forward[code] != code for code in fixed):
+        return None
+
+    columns, seen = [], set(fixed)
+    for start in range(size):
+        if start in seen:
+            continue
+        column, code = [], start
+        while code not in seen:
+            seen.add(code)
+            column.append(alphabet.letters[code])
+            code = forward[code]
+        if code != start:
+            return None
+        columns.append(column)
+
+    rows = -(-len(alphabet.square_letters) // side)
+    long_columns = len(alphabet.square_letters) - (rows - 1) * side
+    columns.sort(key=len, reverse=True)
+    if [len(column) for column in columns] != [rows] * long_columns + [rows - 1] * (side - long_columns):
+        return None
+    return ''.join(column[row] for row in range(rows) for column in columns if row < len(column))
+
+
+class CompositeText:
+    """
+    Шифротекст Віженер -> квадрат Полібія, підготовлений для швидкої квадграмної оцінки.
+
+    Коди літер шифротексту розкладаються за залишками позиції в ключі, а коди решти
+    символів запам'ятовуються один раз, тому розшифрування кандидата - це лише
+    переклад кодів через таблиці розміром з алфавіт для кожного залишку.
+    """
+
+    def __init__(self, encrypted_text: str, period: int, model: ngram_model.NgramModel):
+        self.period = period
+        self.model = model
+        self.codes = model.codes(encrypted_text)
+        self.letter_positions = [i for i, code in enumerate(self.codes) if code != model.other]
+        letters = [self.codes[i] for i in self.letter_positions]
+        self.residues = [letters[residue::period] for residue in range(period)]
+        self.size = len(model.alphabet)
+        self.counts = [[residue_letters.count(code) for code in range(self.size)] for residue_letters in self.residues]
+
+    def plaintext_codes(self, inverse: list[int], shifts: list[int]) -> list[int]:
+        """
+        Коди відкритого тексту для оберненої підстановки і зсувів ключа.
+        Аргументи:
+            inverse (list[int]): Обернена підстановка квадрата.
+            shifts (list[int]): Зсуви ключа Віженера.
+        Повертає:
+            list[int]: Коди символів відкритого тексту.
+        """
+        letters = [0] * len(self.letter_positions)
+        for residue, shift in enumerate(shifts):
+            table = [(code - shift) % self.size for code in inverse]
+            letters[residue::self.period] = map(table.__getitem__, self.residues[residue])
+        codes = list(self.codes)
+        for position, code in zip(self.letter_positions, letters):
+            codes[position] = code
+        return codes
+
+    def quadgram_score(self, inverse: list[int], shifts: list[int]) -> float:
+        """
+        Квадграмна оцінка відкритого тексту (log10).
+        Аргументи:
+            inverse (list[int]): Обернена підстановка квадрата.
+            shifts (list[int]): Зсуви ключа Віженера.
+        Повертає:
+            float: Сума log10-ймовірностей квадграм.
+        """
+        return self.model.score_codes(self.plaintext_codes(inverse, shifts), 4)
+
+    @instrumentation.instrument()
+    def polish(self, inverse: list[int], shifts: list[int]) -> tuple[float, list[int], list[int]]:
+        """
+        Уточнення сходженням за квадграмами: обміни літер підстановки і зміни
+        окремих зсувів ключа. Виправляє рідкісні літери, для яких
+        частот одиничних літер недостатньо.
+        Аргументи:
+            inverse (list[int]): Обернена підстановка.
+            shifts (list[int]): Зсуви ключа.
+        Повертає:
+            tuple[float, list[int], list[int]]: Оцінка, підстановка і зсуви.
+        """
+        inverse, shifts = list(inverse), list(shifts)
+        best = self.quadgram_score(inverse, shifts)
+        improved = True
+        while improved:
+            improved = False
+            for a in range(self.size - 1):
+                for b in range(a + 1, self.size):
+                    inverse[a], inverse[b] = inverse[b], inverse[a]
+                    score = self.quadgram_score(inverse, shifts)
+                    if score > best + 1e-9:
+                        best, improved = score, True
+                    else:
+                        inverse[a], inverse[b] = inverse[b], inverse[a]
+            for residue in range(self.period):
+                for shift in range(self.size):
+                    candidate = shifts[:residue] + [shift] + shifts[residue + 1:]
+                    score = self.quadgram_score(inverse, candidate)
+                    if score > best + 1e-9:
+                        best, shifts, improved = score, candidate, True
+        return best, inverse, shifts
+
+
+@instrumentation.instrument()
+def crack_table_vigenere(encrypted_text: str, model: ngram_model.NgramModel, max_key_length: int = 20,
+                         workers: int = 0) -> dict:
+    """
+    Криптоаналіз шифротексту, зашифрованого vigenere_encrypt, а потім table_transform.
+
+    Квадрат Полібія - фіксована підстановка P, тому композиція c = P(p + k) лишається
+    періодичним многоалфавітним шифром: період визначається методами Касіскі і Фрідмана
+    з 1_vigenere (обидва не залежать від P), зсуви і підстановка - solve_shifts за
+    частотами літер, а квадграми уточнюють результат.
+    Аргументи:
+        encrypted_text (str): Шифротекст.
+        model (ngram_model.NgramModel): Мовна модель відкритого тексту (частоти літер,
+            індекс відповідності і квадграми).
+        max_key_length (int): Максимальна довжина ключа Віженера.
+        workers (int): Кількість процесів (0 - у поточному процесі).
+    Повертає:
+        dict: Ключ Віженера, ключ квадрата (літери для table_transform або None),
+        середня квадграмна оцінка і відкритий текст.
+    """
+    alphabet = alphabets.get_alphabet(model.alphabet)
+    period = vigenere.VigenereAnalysis(encrypted_text, max_key_length, model).key_length
+    text = CompositeText(encrypted_text, period, model)
+    _, shifts, inverse = solve_shifts(text.counts, model.log_frequencies(), workers)
+    score, inverse, shifts = text.polish(inverse, shifts)
+
+    # Спільний зсув підстановки і ключа не змінює відкритий текст; його фіксує літера поза
+    # квадратом (J), а якщо такої немає - обирається перший зсув зі структурою квадрата
+    size, fixed = alphabet.size, fixed_codes(alphabet)
+    offsets = [inverse[fixed[0]] - fixed[0]] if fixed else range(size)
+    for offset in offsets:
+        square = square_from_inverse([(code - offset) % size for code in inverse], alphabet)
+        if square is not None:
+            break
+    else:
+        offset = offsets[0]
+    inverse = [(code - offset) % size for code in inverse]
+    shifts = [(shift - offset) % size for shift in shifts]
+
+    key = ''.join(alphabet.letters[shift] for shift in shifts)
+    if square is not None:
+        decrypted = table_transform(encrypted_text, square, encrypt=False, alphabet=alphabet)
+        plaintext = vigenere.vigenere_decrypt(decrypted, key, alphabet)
+    else:
+        # Підстановка без структури квадрата: розшифровуємо нею напряму (регістр не зберігається)
+        codes = text.plaintext_codes(inverse, shifts)
+        plaintext = ''.join(alphabet.letters[code] if code < size else char for code, char in zip(codes, encrypted_text))
+    return {
+        'key': key,
+        'square': square,
+        'score': score / max(len(text.codes) - 3, 1),
+        'plaintext': plaintext,
+    }
+
+
+def main(argv=None):
+    """
+    Командний рядок
+
+    Приклад:
+        python 3_table_vig.py crack encrypted.txt --model english.ngm --workers 4
+    """
+    parser = argparse.ArgumentParser(description="Шифр Віженера + квадрат Полібія")
+    commands = parser.add_subparsers(dest='mode', required=True)
+
+    command = commands.add_parser('crack', help="Відновлення ключа Віженера і квадрата Полібія")
+    command.add_argument('input', help="Файл із шифротекстом")
+    command.add_argument('--model', default='plain_text.txt',
+                         help="Мовна модель ngram_model або корпус мовою відкритого тексту")
+    command.add_argument('--max-key-length', type=int, default=20)
+    command.add_argument('--workers', type=int, default=0, help="Кількість процесів (0 - без пулу)")
+    args = parser.parse_args(argv)
+
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
-    except FileNotFoundError:
-        print(f"Помилка: файл '{file_path}' не знайдено.")
-        return ""
+        encrypted_text = cipher_io.read_text(args.input)
+        model = ngram_model.load_model(args.model)
+        result = crack_table_vigenere(encrypted_text, model, args.max_key_length, args.workers)
+    except (cipher_io.CipherIOError, ValueError) as error:
+        parser.exit(1, f"Помилка: {error}\n")
+    print(f"Ключ Віженера: {result['key']}")
+    print(f"Квадрат: {result['square']}")
+    print(f"Оцінка: {result['score']:.3f}")
+    print(result['plaintext'])
+
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+        sys.exit()
+
     # Завантаження тексту
-    text = read_file('plain_text.txt')
-    if not text:
-        exit()  # Завершення програми, якщо файл не знайдено
+    try:
+        text = cipher_io.read_text('plain_text.txt')
+    except cipher_io.CipherIOError as error:
+        sys.exit(f"Помилка: {error}")
     
     key= "MATRIX"
     key2= "CRYPTO"
 
-    encrypted_text = table_transform(text, key, encrypt=True)
+    encrypted_text = table_transform(text, key, encrypt=True, log=True)
     print(f"Зашифрований текст:\n{encrypted_text}\n")
     
-    decrypted_text = table_transform(encrypted_text, key, encrypt=False)
+    decrypted_text = table_transform(encrypted_text, key, encrypt=False, log=True)
     print(f"Розшифрований текст:\n{decrypted_text}\n")
 
 
@@ -106,11 +625,11 @@ if __name__ == "__main__":
     encrypted_text = vigenere.vigenere_encrypt(text, key)
     print(f"=== Зашифрований текст Віженером: ===\n{encrypted_text}\n")
      
-    encrypted_text_table = table_transform(encrypted_text, key2, encrypt=True)
+    encrypted_text_table = table_transform(encrypted_text, key2, encrypt=True, log=True)
     print(f"=== Подвійно зашифрований текст Полібіанським квадратом: ===\n{encrypted_text_table}\n")
     
     # Розшифрування двічи зашифрованого тексту 
-    decrypted_text_table = table_transform(encrypted_text_table, key2, encrypt=False)
+    decrypted_text_table = table_transform(encrypted_text_table, key2, encrypt=False, log=True)
     print(f"=== Розшифрований текст перший рівень ===:\n{decrypted_text_table}\n")
     
     decrypted_text = vigenere.vigenere_decrypt(decrypted_text_table, key)
@@ -0,0 +1,173 @@
+import math
+import string
+from functools import lru_cache
+
+# Однобайтові кодування, в яких шукається представлення алфавіту для байтових таблиць
+SINGLE_BYTE_CODECS = ('latin-1', 'cp1251', 'cp1250', 'cp1253')
+# Вільні байти 0x80-0xFE можуть тимчасово позначати символи поза кодуванням
+PLACEHOLDER_BYTES = range(0x80, 0xFF)
+# Таблиці перекладу кешують лише символи з кодами нижче цієї межі (латиниця, кирилиця,
+# грецька, ...); решта обчислюється при кожному зверненні, щоб таблиці довготривалого
+# процесу не росли без меж від довільних символів Unicode
+CACHED_CODES = 0x800
+
+
+class ShiftTable(dict):
+    """
+    Таблиця зсуву латиниці для str.translate.
+
+    Значення обчислюються за тією ж формулою, що й у посимвольному шифрі,
+    і кешуються при першому зверненні (лише для кодів нижче CACHED_CODES), тому
+    будь-яка літера (не лише A-Z) отримує такий самий результат, як раніше.
+    Не-літери видаляються.
+    """
+
+    def __init__(self, shift: int):
+        super().__init__()
+        self.shift = shift
+        for char in string.ascii_uppercase:
+            self[ord(char)]
+
+    def __missing__(self, code: int) -> str:
+        char = chr((code - ord('A') + self.shift) % 26 + ord('A')) if chr(code).isalpha() else ''
+        if code < CACHED_CODES:
+            self[code] = char
+        return char
+
+
+def find_codec(chars: str) -> str | None:
+    """
+    Перше однобайтове кодування, в якому представлені всі символи.
+    Аргументи:
+        chars (str): Символи алфавіту (обидва регістри).
+    Повертає:
+        str | None: Назва кодування або None.
+    """
+    for codec in SINGLE_BYTE_CODECS:
+        try:
+            chars.encode(codec)
+        except UnicodeEncodeError:
+            continue
+        return codec
+    return None
+
+
+def byte_chars(codec: str) -> list[str]:
+    """
+    Символ кожного байта в кодуванні ('' для байтів, яких кодування не визначає).
+    Аргументи:
+        codec (str): Однобайтове кодування.
+    Повертає:
+        list[str]: 256 символів.
+    """
+    return [bytes([code]).decode(codec, errors='ignore') for code in range(256)]
+
+
+class Alphabet:
+    """
+    Алфавіт шифру: літери, їхні номери та скомпільовані таблиці.
+
+    Усі таблиці будуються один раз при створенні алфавіту: номери символів (і байтів),
+    таблиці зсуву для str.translate, а якщо літери вміщуються в однобайтове кодування
+    (latin-1, cp1251, ...) - ще й байтові таблиці верхнього регістру та зсуву. Тоді текст
+    будь-яким алфавітом обробляється так само, як ASCII: bytes.translate замість
+    перекладу кожного символу.
+
+    Квадрат Полібія будується з літер без злитих (J -> I для латиниці); сторона -
+    найменша, в яку вони вміщуються (незаповнений останній рядок допускається).
+    """
+
+    # True лише для латиниці зі старою поведінкою (див. LatinAlphabet)
+    legacy = False
+
+    def __init__(self, letters: str, square_merges: dict[str, str] | None = None, codec: str | None = None):
+        letters = letters.upper()
+        if len(set(letters)) != len(letters) or len(letters) < 2:
+            raise ValueError("Alphabet must contain at least two distinct letters.")
+        lower = letters.lower()
+        self.letters = letters
+        self.size = len(letters)
+        self.letter_set = frozenset(letters + lower)
+        self.is_letter = self.letter_set.__contains__
+        self.index = {char: code for code, char in enumerate(lower)}
+        self.index.update({char: code for code, char in enumerate(letters)})
+        self.shift_tables = [
+            {ord(char): letters[(code + shift) % self.size] for code, char in enumerate(letters)}
+            for shift in range(self.size)
+        ]
+
+        self.square_merges = square_merges or {}
+        self.square_letters = ''.join(char for char in letters if char not in self.square_merges)
+        self.square_side = math.isqrt(len(self.square_letters) - 1) + 1
+
+        self.codec = codec or find_codec(letters + lower)
+        self.letter_bytes = self.upper_bytes = self.byte_shift_tables = None
+        self.byte_chars, self.placeholders = [], []
+        if self.codec:
+            self.letter_bytes = letters.encode(self.codec)
+            self.upper_bytes = bytes.maketrans(lower.encode(self.codec), self.letter_bytes)
+            self.byte_shift_tables = [
+                bytes.maketrans(self.letter_bytes, (letters[shift:] + letters[:shift]).encode(self.codec))
+                for shift in range(self.size)
+            ]
+            self.index.update({byte: code for code, byte in enumerate(self.letter_bytes)})
+            self.byte_chars = byte_chars(self.codec)
+            self.placeholders = [
+                self.byte_chars[code] for code in PLACEHOLDER_BYTES
+                if self.byte_chars[code] and self.byte_chars[code] not in self.letter_set
+            ]
+        self.encodable = frozenset(filter(None, self.byte_chars))
+
+    def __repr__(self):
+        return f"Alphabet({self.letters!r})"
+
+    def index_of(self, symbol: str | int) -> int:
+        """
+        Номер літери (символ у будь-якому регістрі або байт великої літери в кодуванні).
+        Аргументи:
+            symbol (str | int): Літера.
+        Повертає:
+            int: Номер 0..size-1.
+        """
+        return self.index[symbol]
+
+
+class LatinAlphabet(Alphabet):
+    """
+    Латиниця A-Z з поведінкою, що була в 1_vigenere до появи алфавітів: літерою вважається
+    все, що str.isalpha, а літери поза A-Z зсуваються за формулою A-Z (ShiftTable).
+    """
+
+    legacy = True
+
+    def __init__(self):
+        super().__init__(string.ascii_uppercase, {'J': 'I'}, 'latin-1')
+        self.is_letter = str.isalpha
+        self.shift_tables = [ShiftTable(shift) for shift in range(26)]
+
+    def index_of(self, symbol: str | int) -> int:
+        code = symbol if isinstance(symbol, int) else ord(symbol)
+        return (code - ord('A')) % 26
+
+
+LATIN = LatinAlphabet()
+UKRAINIAN = Alphabet("АБВГҐДЕЄЖЗИІЇЙКЛМНОПРСТУФХЦЧШЩЬЮЯ")
+ALPHABETS = {'latin': LATIN, 'ukrainian': UKRAINIAN}
+
+
+@lru_cache(maxsize=16)
+def get_alphabet(name: str) -> Alphabet:
+    """
+    Алфавіт за назвою ('latin', 'ukrainian') або за рядком літер.
+    Для літер вбудованого алфавіту повертається він сам (зі своїми таблицями).
+    Аргументи:
+        name (str): Назва або літери.
+    Повертає:
+        Alphabet: Алфавіт.
+    """
+    if name.lower() in ALPHABETS:
+        return ALPHABETS[name.lower()]
+    for alphabet in ALPHABETS.values():
+        if alphabet.letters == name.upper():
+            return alphabet
+    return Alphabet(name)
@@ -0,0 +1,273 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import cached_property, partial
+
+import cipher_io
+import sample_text
+import pipeline
+vigenere = __import__('1_vigenere')
+transpos = __import__('2_transpos')
+table_vig = __import__('3_table_vig')
+
+DEFAULT_SIZES = '1K,10K,100K,1M'
+DEFAULT_KEY_LENGTHS = '3,10,100'
+# Відносне погіршення часу або пам'яті, яке compare вважає регресією
+DEFAULT_THRESHOLD = 0.10
+# Швидкі виклики повторюються в циклі, доки один замір не триватиме принаймні стільки секунд
+MIN_SAMPLE_SECONDS = 0.05
+
+
+class Workload:
+    """
+    Вхідні дані одного рядка таблиці: текст, ключі заданої довжини і шифротексти,
+    які обчислюються лише тоді, коли вони потрібні якомусь випадку.
+    """
+
+    def __init__(self, text: str, key_length: int, seed: int = 0):
+        rng = random.Random(seed * 1000 + key_length)
+        self.text = text
+        self.key_length = key_length
+        self.key = ''.join(rng.choices(string.ascii_uppercase, k=key_length))
+        self.row_key = ''.join(rng.choices(string.ascii_uppercase, k=key_length))
+        # Аналіз перебирає довжини ключа принаймні до фактичної
+        self.max_key_length = max(20, key_length)
+
+    @cached_property
+    def vigenere_text(self) -> str:
+        return vigenere.vigenere_encrypt(self.text, self.key)
+
+    @cached_property
+    def transpos_text(self) -> str:
+        return transpos.transpos_cols_encrypt(self.text, self.key)
+
+    @cached_property
+    def double_text(self) -> str:
+        return transpos.double_transpos_encrypt(self.text, self.row_key, self.key)
+
+    @cached_property
+    def table_text(self) -> str:
+        return table_vig.table_transform(self.text, self.key, encrypt=True)
+
+    @cached_property
+    def pipeline(self) -> pipeline.Pipeline:
+        return pipeline.Pipeline([pipeline.Vigenere(self.key), pipeline.Polybius(self.row_key),
+                                  pipeline.Transposition(self.key)])
+
+    @cached_property
+    def pipeline_text(self) -> str:
+        return self.pipeline.encrypt(self.text)
+
+
+# Випадки: назва -> функція, що повертає виклик без аргументів для даного навантаження
+CASES = {
+    'vigenere_encrypt': lambda w: partial(vigenere.vigenere_encrypt, w.text, w.key),
+    'vigenere_decrypt': lambda w: partial(vigenere.vigenere_decrypt, w.vigenere_text, w.key),
+    'kasiski_examination': lambda w: partial(vigenere.kasiski_examination, w.vigenere_text, 3, w.max_key_length),
+    'friedman_test': lambda w: partial(vigenere.friedman_test, w.vigenere_text, w.max_key_length),
+    'find_key': lambda w: partial(vigenere.find_key, w.vigenere_text, w.key_length),
+    'transpos_cols_encrypt': lambda w: partial(transpos.transpos_cols_encrypt, w.text, w.key),
+    'transpos_cols_decrypt': lambda w: partial(transpos.transpos_cols_decrypt, w.transpos_text, w.key),
+    'double_transpos_encrypt': lambda w: partial(transpos.double_transpos_encrypt, w.text, w.row_key, w.key),
+    'double_transpos_decrypt': lambda w: partial(transpos.double_transpos_decrypt, w.double_text, w.row_key, w.key),
+    'table_transform_encrypt': lambda w: partial(table_vig.table_transform, w.text, w.key, True),
+    'table_transform_decrypt': lambda w: partial(table_vig.table_transform, w.table_text, w.key, False),
+    'pipeline_encrypt': lambda w: partial(w.pipeline.encrypt, w.text),
+    'pipeline_decrypt': lambda w: partial(w.pipeline.decrypt, w.pipeline_text),
+}
+
+
+def measure(call, repeat: int) -> dict:
+    """
+    Час одного виклику (найкращий і медіана з repeat замірів) і пікова пам'ять.
+
+    Перший запуск прогріває кеші ключів і визначає, скільки викликів потрібно
+    на один замір (як timeit), щоб короткі виклики не тонули в шумі таймера;
+    повільний перший запуск зараховується як замір. Пам'ять вимірюється окремим
+    запуском під tracemalloc, щоб не спотворювати час.
+    Аргументи:
+        call: Виклик без аргументів.
+        repeat (int): Кількість замірів часу.
+    Повертає:
+        dict: seconds, median_seconds, peak_bytes, number (викликів на замір).
+    """
+    start = time.perf_counter()
+    call()
+    first = time.perf_counter() - start
+    number = math.ceil(MIN_SAMPLE_SECONDS / first) if first < MIN_SAMPLE_SECONDS else 1
+    times = [first] if number == 1 else []
+    while len(times) < repeat:
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        times.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'median_seconds': statistics.median(times), 'peak_bytes': peak, 'number': number}
+
+
+def git_revision() -> str | None:
+    """
+    Поточний коміт репозиторію (None, якщо git недоступний).
+    Повертає:
+        str | None: Хеш коміту з позначкою '+dirty' для незафіксованих змін.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=directory, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=directory,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ('+dirty' if dirty else '')
+
+
+def run_benchmarks(sizes: list[int], key_lengths: list[int], cases: list[str], repeat: int = 3,
+                   seed: int = 0, corpus: str = sample_text.CORPUS_PATH, log=None) -> dict:
+    """
+    Вимірює всі випадки на всіх комбінаціях розміру тексту і довжини ключа.
+    Аргументи:
+        sizes (list[int]): Розміри текстів у символах.
+        key_lengths (list[int]): Довжини ключів.
+        cases (list[str]): Назви випадків із CASES.
+        repeat (int): Кількість запусків для вимірювання часу.
+        seed (int): Початкове значення генератора корпусу і ключів.
+        corpus (str): Корпус, з якого генеруються тексти.
+        log: Файл для поступового виведення результатів (None - без виведення).
+    Повертає:
+        dict: meta (умови запуску) і results (по одному запису на вимірювання).
+    """
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {', '.join(unknown)}.")
+
+    text = sample_text.generate_corpus(max(sizes), seed, corpus)
+    results = []
+    for size in sizes:
+        for key_length in key_lengths:
+            workload = Workload(text[:size], key_length, seed)
+            for name in cases:
+                result = {'name': name, 'size': size, 'key_length': key_length}
+                result.update(measure(CASES[name](workload), repeat))
+                result['throughput_mb_s'] = size / result['seconds'] / sample_text.SIZE_UNITS['M'] if result['seconds'] else None
+                results.append(result)
+                if log is not None:
+                    print(f"{name:<24} {size:>11} {key_length:>4} {result['seconds']:>10.4f} s "
+                          f"{result['peak_bytes'] / sample_text.SIZE_UNITS['M']:>9.2f} MiB", file=log, flush=True)
+
+    meta = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'seed': seed,
+        'corpus': os.path.basename(corpus),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare_results(old: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Порівнює два запуски за спільними вимірюваннями (назва, розмір, довжина ключа).
+    Аргументи:
+        old (dict): Базовий запуск.
+        new (dict): Новий запуск.
+        threshold (float): Відносне погіршення, з якого фіксується регресія.
+    Повертає:
+        list[dict]: Відношення часу і пам'яті (нове / старе) та ознака регресії.
+    """
+    def key(result):
+        return result['name'], result['size'], result['key_length']
+
+    baseline = {key(result): result for result in old['results']}
+    rows = []
+    for result in new['results']:
+        before = baseline.get(key(result))
+        if before is None:
+            continue
+        time_ratio = result['seconds'] / before['seconds'] if before['seconds'] else 1.0
+        memory_ratio = result['peak_bytes'] / before['peak_bytes'] if before['peak_bytes'] else 1.0
+        rows.append({
+            'name': result['name'], 'size': result['size'], 'key_length': result['key_length'],
+            'time_ratio': time_ratio, 'memory_ratio': memory_ratio,
+            'regression': time_ratio > 1 + threshold or memory_ratio > 1 + threshold,
+        })
+    return rows
+
+
+def parse_list(value: str, convert=int) -> list:
+    return [convert(item) for item in value.split(',') if item.strip()]
+
+
+def main(argv=None):
+    """
+    Командний рядок
+
+    Приклади:
+        python bench.py run --output before.json
+        python bench.py run --sizes 1K,1M,100M --key-lengths 3,100 --cases vigenere_encrypt,find_key
+        python bench.py compare before.json after.json --threshold 0.1
+    """
+    parser = argparse.ArgumentParser(description="Вимірювання швидкодії шифрів і криптоаналізу")
+    commands = parser.add_subparsers(dest='mode', required=True)
+
+    command = commands.add_parser('run', help="Запуск вимірювань, результати у форматі JSON")
+    command.add_argument('--sizes', default=DEFAULT_SIZES, help="Розміри текстів (1K ... 100M)")
+    command.add_argument('--key-lengths', default=DEFAULT_KEY_LENGTHS, help="Довжини ключів")
+    command.add_argument('--cases', default=','.join(CASES), help="Функції для вимірювання")
+    command.add_argument('--repeat', type=int, default=3, help="Кількість запусків для вимірювання часу")
+    command.add_argument('--seed', type=int, default=0)
+    command.add_argument('--corpus', default=sample_text.CORPUS_PATH, help="Текст, з якого генеруються корпуси")
+    command.add_argument('--output', help="Файл результатів (за замовчуванням - stdout)")
+
+    command = commands.add_parser('compare', help="Порівняння двох запусків")
+    command.add_argument('old', help="Базові результати")
+    command.add_argument('new', help="Нові результати")
+    command.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help="Відносне погіршення, яке вважається регресією")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.mode == 'run':
+            report = run_benchmarks(parse_list(args.sizes, sample_text.parse_size), parse_list(args.key_lengths),
+                                    parse_list(args.cases, str.strip), args.repeat, args.seed, args.corpus, sys.stderr)
+            if args.output:
+                with cipher_io.open_output(args.output, 'utf-8') as file:
+                    json.dump(report, file, indent=2)
+            else:
+                print(json.dumps(report, indent=2))
+            return
+
+        old, new = (json.loads(cipher_io.read_text(path)) for path in (args.old, args.new))
+    except (cipher_io.CipherIOError, ValueError) as error:
+        parser.exit(1, f"Помилка: {error}\n")
+
+    rows = compare_results(old, new, args.threshold)
+    for row in rows:
+        mark = '  РЕГРЕСІЯ' if row['regression'] else ''
+        print(f"{row['name']:<24} {row['size']:>11} {row['key_length']:>4} "
+              f"час x{row['time_ratio']:.2f}  пам'ять x{row['memory_ratio']:.2f}{mark}")
+    regressions = sum(row['regression'] for row in rows)
+    print(f"Порівняно: {len(rows)}, регресій: {regressions}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import codecs
+import mmap
+import os
+import shutil
+from contextlib import contextmanager, suppress
+
+# Розмір фрагмента для потокового декодування та буфера запису
+CHUNK_SIZE = 1 << 20
+
+
+class CipherIOError(OSError):
+    """
+    Помилка читання або запису файлу: повідомлення містить шлях і причину.
+    Успадковує OSError, тому її перехоплюють звичні обробники помилок файлів.
+    """
+
+
+@contextmanager
+def reporting(path: str, action: str):
+    """
+    Перетворює помилки файлової системи та декодування на CipherIOError.
+    Аргументи:
+        path (str): Шлях до файлу.
+        action (str): Дія для повідомлення ('read', 'write', 'decode').
+    """
+    try:
+        yield
+    except CipherIOError:
+        raise
+    except (OSError, UnicodeError) as error:
+        reason = error.strerror if isinstance(error, OSError) and error.strerror else str(error)
+        raise CipherIOError(f"Cannot {action} '{path}': {reason}") from error
+
+
+class MappedFile:
+    """
+    Вхідний файл, відображений у пам'ять лише для читання.
+
+    buffer - mmap, який байтові функції шифрів (vigenere_bytes, transpos_bytes,
+    table_transform_bytes) приймають напряму, а текстові отримують через read_text
+    чи iter_text без read() і проміжних копій. Порожній файл відображається як b''
+    (mmap не приймає файли нульової довжини).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with reporting(path, 'read'), open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size:
+                self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    self.buffer.madvise(mmap.MADV_SEQUENTIAL)
+            else:
+                self.buffer = b''
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+def read_text(path: str, encoding: str = 'utf-8', newline: str | None = None) -> str:
+    """
+    Зчитує текстовий файл через відображення в пам'ять: текст декодується одним
+    кроком безпосередньо з відображених сторінок.
+    Аргументи:
+        path (str): Шлях до файлу.
+        encoding (str): Кодування.
+        newline (str | None): None - '\\r\\n' і '\\r' перетворюються на '\\n', як у open();
+            '' - символи кінця рядка зберігаються.
+    Повертає:
+        str: Текст файлу.
+    """
+    with MappedFile(path) as mapped, reporting(path, 'decode'):
+        text = str(mapped.buffer, encoding)
+    if newline is None and '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def iter_text(path: str, chunk_size: int = CHUNK_SIZE, encoding: str = 'utf-8'):
+    """
+    Декодує відображений файл фрагментами для потокових шифрів (vigenere_stream,
+    transpos_stream_encrypt): у пам'яті одночасно лише один фрагмент, символи
+    на межах фрагментів не розриваються, кінці рядків зберігаються.
+    Аргументи:
+        path (str): Шлях до файлу.
+        chunk_size (int): Розмір фрагмента в байтах.
+        encoding (str): Кодування.
+    Повертає:
+        Генератор фрагментів тексту.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with MappedFile(path) as mapped, memoryview(mapped.buffer) as view, reporting(path, 'decode'):
+        for start in range(0, len(view), chunk_size):
+            chunk = decoder.decode(view[start:start + chunk_size])
+            if chunk:
+                yield chunk
+        tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+@contextmanager
+def replacing(path: str):
+    """
+    Результат пишеться в тимчасовий файл поруч із path, який замінює path лише після
+    успішного запису. Тому вихідний файл може збігатися з вхідним, що ще відображений
+    у пам'ять або читається (шифрування на місці), а після помилки path не змінюється.
+    Аргументи:
+        path (str): Шлях до файлу результату.
+    Повертає:
+        Контекстний менеджер із шляхом тимчасового файлу.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    temporary = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        yield temporary
+        if os.path.exists(path):
+            shutil.copymode(path, temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(temporary)
+        raise
+
+
+@contextmanager
+def map_output(path: str, size: int):
+    """
+    Файл результату відомого розміру, відображений у пам'ять для запису:
+    байтові функції шифрів пишуть у нього напряму (аргумент out).
+    Аргументи:
+        path (str): Шлях до файлу (створюється або замінюється, див. replacing).
+        size (int): Розмір у байтах.
+    Повертає:
+        Контекстний менеджер із буфером для запису.
+    """
+    with reporting(path, 'write'), replacing(path) as temporary, open(temporary, 'w+b') as file:
+        if not size:
+            yield bytearray()
+            return
+        file.truncate(size)
+        with mmap.mmap(file.fileno(), size, access=mmap.ACCESS_WRITE) as buffer:
+            yield buffer
+            buffer.flush()
+
+
+@contextmanager
+def open_output(path: str, encoding: str | None = None):
+    """
+    Буферизований файл результату для потокового запису.
+    Аргументи:
+        path (str): Шлях до файлу.
+        encoding (str | None): Кодування тексту (None - двійковий файл).
+    Повертає:
+        Контекстний менеджер із файловим об'єктом.
+    """
+    with reporting(path, 'write'), replacing(path) as temporary:
+        if encoding is None:
+            file = open(temporary, 'wb', buffering=CHUNK_SIZE)
+        else:
+            file = open(temporary, 'w', encoding=encoding, newline='', buffering=CHUNK_SIZE)
+        with file:
+            yield file
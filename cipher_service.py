@@ -0,0 +1,577 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import string
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+
+import alphabets
+import ngram_model
+import sample_text
+vigenere = __import__('1_vigenere')
+transpos = __import__('2_transpos')
+table_vig = __import__('3_table_vig')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Найдовший рядок запиту (StreamReader за замовчуванням обмежує його 64 KB)
+MAX_LINE = 16 << 20
+# Пакет - запити, що накопичилися в черзі, поки пул був зайнятий: не більше BATCH_SIZE
+# запитів і BATCH_CHARS символів тексту, щоб великий текст не затримував дрібні запити
+BATCH_SIZE = 64
+BATCH_CHARS = 1 << 20
+# Запити в загальній черзі, після яких сервер перестає читати з'єднання
+QUEUE_SIZE = 1024
+# Запити одного з'єднання без надісланої відповіді, після яких з'єднання не читається
+MAX_PENDING = 256
+# Кількість останніх затримок кожної операції для перцентилів
+LATENCY_WINDOW = 10000
+# Найбільша довжина ключа для crack_vigenere, щоб один запит не займав процес пулу надовго
+MAX_KEY_LENGTH = 100
+
+
+def request_alphabet(request: dict) -> alphabets.Alphabet:
+    return alphabets.get_alphabet(request.get('alphabet', 'latin'))
+
+
+# Операції, що виконуються в процесах пулу: назва -> функція від запиту і мовної моделі
+OPERATIONS = {
+    'vigenere_encrypt': lambda request, model: vigenere.vigenere_encrypt(
+        request['text'], request['key'], request_alphabet(request)),
+    'vigenere_decrypt': lambda request, model: vigenere.vigenere_decrypt(
+        request['text'], request['key'], request_alphabet(request)),
+    'transpos_cols_encrypt': lambda request, model: transpos.transpos_cols_encrypt(
+        request['text'], request['key'], framed=request.get('framed', False)),
+    'transpos_cols_decrypt': lambda request, model: transpos.transpos_cols_decrypt(
+        request['text'], request['key'], framed=request.get('framed', False)),
+    'double_transpos_encrypt': lambda request, model: transpos.double_transpos_encrypt(
+        request['text'], request['key_row'], request['key'], framed=request.get('framed', False)),
+    'double_transpos_decrypt': lambda request, model: transpos.double_transpos_decrypt(
+        request['text'], request['key_row'], request['key'], framed=request.get('framed', False)),
+    'table_transform': lambda request, model: table_vig.table_transform(
+        request['text'], request['key'], request.get('encrypt', True), alphabet=request_alphabet(request)),
+    'crack_vigenere': lambda request, model: vigenere.crack_vigenere(
+        request['text'], request.get('max_key_length', 20), model),
+}
+
+# Обов'язкові рядкові поля кожної операції (перевіряються до передачі запиту пулу)
+REQUIRED_FIELDS = {
+    'vigenere_encrypt': ('text', 'key'),
+    'vigenere_decrypt': ('text', 'key'),
+    'transpos_cols_encrypt': ('text', 'key'),
+    'transpos_cols_decrypt': ('text', 'key'),
+    'double_transpos_encrypt': ('text', 'key', 'key_row'),
+    'double_transpos_decrypt': ('text', 'key', 'key_row'),
+    'table_transform': ('text', 'key'),
+    'crack_vigenere': ('text',),
+}
+
+# Типи необов'язкових полів (JSON дає саме ці типи, тому True не вважається числом)
+OPTIONAL_FIELDS = {
+    'alphabet': str,
+    'encrypt': bool,
+    'framed': bool,
+    'max_key_length': int,
+}
+TYPE_NAMES = {str: 'a string', bool: 'a boolean', int: 'an integer'}
+
+
+def validate_request(request: dict) -> str | None:
+    """
+    Перевіряє поля запиту відомої операції: наявність і тип обов'язкових,
+    тип необов'язкових і межі max_key_length.
+    Аргументи:
+        request (dict): Запит.
+    Повертає:
+        str | None: Повідомлення про помилку або None, якщо запит коректний.
+    """
+    fields = {field: str for field in REQUIRED_FIELDS[request['op']]}
+    for field in fields:
+        if field not in request:
+            return f"Missing field '{field}'"
+    fields.update(OPTIONAL_FIELDS)
+    for field, kind in fields.items():
+        if field in request and type(request[field]) is not kind:
+            return f"Field '{field}' must be {TYPE_NAMES[kind]}"
+    if not 1 <= request.get('max_key_length', 1) <= MAX_KEY_LENGTH:
+        return f"Field 'max_key_length' must be between 1 and {MAX_KEY_LENGTH}"
+    return None
+
+
+def run_batch(requests: list[dict], model_path: str | None = None) -> list[dict]:
+    """
+    Виконує пакет запитів у процесі пулу. Помилка одного запиту не зупиняє пакет,
+    а повертається як його відповідь, як у crack_message.
+    Аргументи:
+        requests (list[dict]): Запити з полями op, text, key, ...
+        model_path (str | None): Мовна модель для криптоаналізу (None - англійські частоти).
+    Повертає:
+        list[dict]: Відповіді {'result': ...} або {'error': ...} у порядку запитів.
+    """
+    model = ngram_model.load_model(model_path) if model_path else ngram_model.ENGLISH
+    responses = []
+    for request in requests:
+        try:
+            responses.append({'result': OPERATIONS[request['op']](request, model)})
+        except Exception as error:
+            responses.append({'error': f"{type(error).__name__}: {error}"})
+    return responses
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Перцентиль за найближчим рангом.
+    Аргументи:
+        values (list[float]): Відсортовані значення.
+        fraction (float): Частка (0.99 - p99).
+    Повертає:
+        float: Значення (0.0 для порожнього списку).
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def latency_summary(latencies) -> dict:
+    ordered = sorted(latencies)
+    return {
+        'p50_ms': percentile(ordered, 0.5) * 1e3,
+        'p90_ms': percentile(ordered, 0.9) * 1e3,
+        'p99_ms': percentile(ordered, 0.99) * 1e3,
+        'max_ms': (ordered[-1] if ordered else 0.0) * 1e3,
+    }
+
+
+class Metrics:
+    """
+    Лічильники сервера: запити і помилки кожної операції, затримки останніх
+    LATENCY_WINDOW запитів (від отримання рядка до готової відповіді) і розміри пакетів.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.operations = {}
+        self.batches = 0
+        self.batched = 0
+
+    def record(self, operation: str, latency: float, error: bool):
+        entry = self.operations.get(operation)
+        if entry is None:
+            entry = self.operations[operation] = {'requests': 0, 'errors': 0, 'latencies': deque(maxlen=LATENCY_WINDOW)}
+        entry['requests'] += 1
+        entry['errors'] += error
+        entry['latencies'].append(latency)
+
+    def snapshot(self, queued: int) -> dict:
+        return {
+            'uptime_seconds': time.perf_counter() - self.started,
+            'queued': queued,
+            'batches': self.batches,
+            'mean_batch_size': self.batched / self.batches if self.batches else 0.0,
+            'operations': {
+                operation: {'requests': entry['requests'], 'errors': entry['errors'], **latency_summary(entry['latencies'])}
+                for operation, entry in sorted(self.operations.items())
+            },
+        }
+
+
+class Connection:
+    """
+    Відповіді одного клієнта. Їх записує окрема задача у порядку готовності
+    (клієнт зіставляє їх за полем id), а семафор pending обмежує кількість запитів
+    без відповіді: коли він вичерпаний, сервер не читає з'єднання, і TCP гальмує клієнта.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, max_pending: int):
+        self.writer = writer
+        self.pending = asyncio.Semaphore(max_pending)
+        self.outbox = asyncio.Queue()
+        self.unanswered = 0
+        self.closing = False
+        self.broken = False
+
+    async def accept(self):
+        await self.pending.acquire()
+        self.unanswered += 1
+
+    def reply(self, response: dict):
+        self.outbox.put_nowait(response)
+
+    def answer(self, request: dict, response: dict, received: float, finished: float | None = None):
+        """
+        Відповідь у спільному форматі: id запиту (якщо є), result або error і latency_ms.
+        Аргументи:
+            request (dict): Запит ({} - якщо рядок не розібрано).
+            response (dict): {'result': ...} або {'error': ...}.
+            received (float): Час отримання запиту (time.perf_counter).
+            finished (float | None): Час завершення (None - зараз).
+        """
+        if finished is None:
+            finished = time.perf_counter()
+        if 'id' in request:
+            response = {'id': request['id'], **response}
+        response['latency_ms'] = (finished - received) * 1e3
+        self.reply(response)
+
+    def close(self):
+        self.closing = True
+        self.outbox.put_nowait(None)
+
+    async def write_loop(self):
+        while self.unanswered or not self.closing:
+            response = await self.outbox.get()
+            if response is None:
+                continue
+            # Після розриву відповіді відкидаються, щоб читання і пакети в пулі завершилися
+            if not self.broken:
+                try:
+                    self.writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                    await self.writer.drain()
+                except ConnectionError:
+                    self.broken = True
+            self.unanswered -= 1
+            self.pending.release()
+
+
+class CipherService:
+    """
+    Сервер рядків JSON: кожен рядок - запит {"id": ..., "op": ..., "text": ..., "key": ...},
+    кожна відповідь - {"id": ..., "result": ...} або {"id": ..., "error": ...} з latency_ms.
+
+    Запити з усіх з'єднань потрапляють в обмежену чергу, з якої диспетчер формує
+    пакети для пулу процесів: у пулі одночасно не більше max_batches пакетів, тож
+    поки він зайнятий, нові запити накопичуються і наступний пакет більший. Операція
+    stats виконується одразу і повертає метрики сервера.
+    """
+
+    def __init__(self, executor: ProcessPoolExecutor, max_batches: int, model_path: str | None = None,
+                 queue_size: int = QUEUE_SIZE, max_pending: int = MAX_PENDING):
+        self.executor = executor
+        self.model_path = model_path
+        self.max_pending = max_pending
+        self.queue = asyncio.Queue(queue_size)
+        self.max_batches = max_batches
+        self.slots = asyncio.Semaphore(max_batches)
+        self.metrics = Metrics()
+        self.tasks = set()
+        self.connections = set()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(writer, self.max_pending)
+        writer_task = asyncio.create_task(connection.write_loop())
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            await self.read_requests(reader, connection)
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Сервер зупиняється (close_connections): відповіді, що ще не готові, не надсилаються
+            writer_task.cancel()
+        finally:
+            connection.close()
+            with suppress(asyncio.CancelledError, ConnectionError):
+                await writer_task
+            writer.close()
+            with suppress(asyncio.CancelledError, ConnectionError):
+                await writer.wait_closed()
+            self.connections.discard(task)
+
+    async def read_requests(self, reader: asyncio.StreamReader, connection: Connection):
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                await connection.accept()
+                connection.reply({'error': f"Request line exceeds {MAX_LINE} bytes"})
+                return
+            if not line:
+                return
+            if not line.strip():
+                continue
+            received = time.perf_counter()
+            await connection.accept()
+            await self.submit(connection, line, received)
+
+    async def close_connections(self):
+        """Закриває з'єднання клієнтів, що залишилися, і чекає завершення їхніх задач."""
+        for task in list(self.connections):
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    async def submit(self, connection: Connection, line: bytes, received: float):
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            connection.answer({}, {'error': f"Invalid JSON: {error}"}, received)
+            return
+        if not isinstance(request, dict):
+            connection.answer({}, {'error': "Request must be a JSON object"}, received)
+            return
+        operation = request.get('op')
+        if operation == 'stats':
+            connection.answer(request, {'result': self.metrics.snapshot(self.queue.qsize())}, received)
+        elif operation not in OPERATIONS:
+            connection.answer(request, {'error': f"Unknown operation {operation!r}"}, received)
+        elif error := validate_request(request):
+            self.metrics.record(operation, time.perf_counter() - received, True)
+            connection.answer(request, {'error': error}, received)
+        else:
+            await self.queue.put((request, connection, received))
+
+    async def dispatch(self):
+        """Формує пакети з черги і передає їх пулу."""
+        while True:
+            await self.slots.acquire()
+            batch = [await self.queue.get()]
+            chars = len(str(batch[0][0].get('text', '')))
+            # Черга ділиться між усіма пакетами, щоб важкі запити не чекали в одному процесі
+            limit = min(BATCH_SIZE, max(1, -(-(self.queue.qsize() + 1) // self.max_batches)))
+            while len(batch) < limit and chars < BATCH_CHARS and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                chars += len(str(batch[-1][0].get('text', '')))
+            task = asyncio.create_task(self.run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, batch: list):
+        loop = asyncio.get_running_loop()
+        try:
+            responses = await loop.run_in_executor(self.executor, run_batch, [request for request, _, _ in batch], self.model_path)
+        except Exception as error:
+            # Пул недоступний (процес завершився аварійно) або запит не серіалізується
+            responses = [{'error': f"{type(error).__name__}: {error}"} for _ in batch]
+        finally:
+            self.slots.release()
+        self.metrics.batches += 1
+        self.metrics.batched += len(batch)
+        finished = time.perf_counter()
+        for (request, connection, received), response in zip(batch, responses):
+            self.metrics.record(request['op'], finished - received, 'error' in response)
+            connection.answer(request, response, received, finished)
+
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: str | None = None,
+                workers: int | None = None, model_path: str | None = None,
+                queue_size: int = QUEUE_SIZE, max_pending: int = MAX_PENDING):
+    """
+    Запускає сервер на TCP-порту або Unix-сокеті до SIGINT / SIGTERM.
+    Аргументи:
+        host (str): Адреса TCP.
+        port (int): Порт TCP.
+        unix_path (str | None): Шлях Unix-сокета замість TCP.
+        workers (int | None): Кількість процесів пулу (за замовчуванням - кількість ядер).
+        model_path (str | None): Мовна модель ngram_model для crack_vigenere.
+        queue_size (int): Розмір загальної черги запитів.
+        max_pending (int): Запити одного з'єднання без відповіді.
+    """
+    if model_path:
+        ngram_model.load_model(model_path)  # Помилка файлу моделі - до запуску сервера
+    workers = workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+
+    # Ctrl+C надсилається всій групі процесів, а зупиняє пул головний процес
+    with ProcessPoolExecutor(max_workers=workers, initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN)) as executor:
+        service = CipherService(executor, 2 * workers, model_path, queue_size, max_pending)
+        if unix_path:
+            server = await asyncio.start_unix_server(service.handle_connection, unix_path, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port, limit=MAX_LINE)
+        dispatcher = asyncio.create_task(service.dispatch())
+        async with server:
+            address = unix_path or ':'.join(map(str, server.sockets[0].getsockname()[:2]))
+            print(f"Сервер слухає {address}, процесів: {workers}", file=sys.stderr)
+            await stop.wait()
+            server.close()
+            await service.close_connections()
+        dispatcher.cancel()
+        if service.tasks:
+            await asyncio.wait(service.tasks)
+    if unix_path and os.path.exists(unix_path):
+        os.unlink(unix_path)
+
+
+async def open_connection(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: str | None = None):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path, limit=MAX_LINE)
+    return await asyncio.open_connection(host, port, limit=MAX_LINE)
+
+
+def random_key(length: int, rng: random.Random) -> str:
+    return ''.join(rng.choices(string.ascii_uppercase, k=length))
+
+
+def make_requests(operation: str, count: int, size: int, key_length: int, seed: int = 0) -> list[dict]:
+    """
+    Запити навантаження: текст sample_text.generate_corpus і випадкові ключі. Для дешифрування
+    і криптоаналізу текст спершу шифрується, щоб сервер отримував справжній шифротекст.
+    Аргументи:
+        operation (str): Операція (ключ OPERATIONS).
+        count (int): Кількість запитів.
+        size (int): Розмір тексту.
+        key_length (int): Довжина ключів.
+        seed (int): Початкове значення генератора.
+    Повертає:
+        list[dict]: Запити з полями id, op, text, key.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation '{operation}'.")
+    rng = random.Random(seed)
+    text = sample_text.generate_corpus(size, seed)
+    keys = [(random_key(key_length, rng), random_key(key_length, rng)) for _ in range(min(count, 16))]
+    templates = []
+    for key, key_row in keys:
+        request = {'op': operation, 'text': text, 'key': key, 'key_row': key_row}
+        if operation in ('vigenere_decrypt', 'crack_vigenere'):
+            request['text'] = vigenere.vigenere_encrypt(text, key)
+        elif operation == 'transpos_cols_decrypt':
+            request['text'] = transpos.transpos_cols_encrypt(text, key)
+        elif operation == 'double_transpos_decrypt':
+            request['text'] = transpos.double_transpos_encrypt(text, key_row, key)
+        templates.append(request)
+    return [{'id': number, **templates[number % len(templates)]} for number in range(count)]
+
+
+async def load_connection(requests: list[dict], window: int, latencies: list, address: dict) -> int:
+    """
+    Надсилає запити одним з'єднанням, тримаючи в дорозі не більше window.
+    Повертає:
+        int: Кількість відповідей з помилкою.
+    """
+    reader, writer = await open_connection(**address)
+    sent = {}
+    slots = asyncio.Semaphore(window)
+    errors = 0
+
+    async def receive():
+        nonlocal errors
+        try:
+            for _ in requests:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("Server closed the connection")
+                response = json.loads(line)
+                latencies.append(time.perf_counter() - sent.pop(response['id']))
+                errors += 'error' in response
+                slots.release()
+        finally:
+            # Після помилки відправник не повинен чекати на вікно
+            for _ in range(window):
+                slots.release()
+
+    receiver = asyncio.create_task(receive())
+    for request in requests:
+        await slots.acquire()
+        if receiver.done():
+            break
+        sent[request['id']] = time.perf_counter()
+        writer.write(json.dumps(request, ensure_ascii=False).encode() + b'\n')
+        await writer.drain()
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def run_load(operation: str, count: int = 1000, connections: int = 8, window: int = 16,
+                   size: int = 1024, key_length: int = 8, seed: int = 0, **address) -> dict:
+    """
+    Генератор навантаження: count запитів, рівномірно розподілених між connections
+    з'єднаннями, кожне з window запитами в дорозі.
+    Аргументи:
+        operation (str): Операція.
+        count (int): Кількість запитів.
+        connections (int): Кількість з'єднань.
+        window (int): Запити в дорозі на з'єднання.
+        size (int): Розмір тексту запиту.
+        key_length (int): Довжина ключа.
+        seed (int): Початкове значення генератора.
+        address: host, port або unix_path сервера.
+    Повертає:
+        dict: Пропускна здатність (запитів і символів за секунду) і перцентилі затримки клієнта.
+    """
+    requests = make_requests(operation, count, size, key_length, seed)
+    latencies = []
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(load_connection(requests[number::connections], window, latencies, address)
+                                    for number in range(connections)))
+    seconds = time.perf_counter() - started
+    return {
+        'operation': operation, 'requests': len(latencies), 'errors': sum(errors),
+        'connections': connections, 'window': window, 'size': size, 'key_length': key_length,
+        'seconds': seconds,
+        'requests_per_second': len(latencies) / seconds,
+        'chars_per_second': len(latencies) * size / seconds,
+        **latency_summary(latencies),
+    }
+
+
+async def fetch_stats(**address) -> dict:
+    reader, writer = await open_connection(**address)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return response['result']
+
+
+def main(argv=None):
+    """
+    Командний рядок
+
+    Приклади:
+        python cipher_service.py serve --port 8765 --workers 4 --model en.ngm
+        python cipher_service.py load --op vigenere_encrypt --requests 10000 --connections 16 --size 4K
+        python cipher_service.py stats
+        echo '{"id": 1, "op": "vigenere_encrypt", "text": "Hello", "key": "KEY"}' | nc localhost 8765
+    """
+    parser = argparse.ArgumentParser(description="Сервіс шифрування рядками JSON і генератор навантаження")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_command = commands.add_parser('serve', help="Запустити сервер")
+    load_command = commands.add_parser('load', help="Виміряти пропускну здатність і затримку сервера")
+    stats_command = commands.add_parser('stats', help="Вивести метрики сервера")
+    for command in (serve_command, load_command, stats_command):
+        command.add_argument('--host', default=DEFAULT_HOST)
+        command.add_argument('--port', type=int, default=DEFAULT_PORT)
+        command.add_argument('--unix', help="Unix-сокет замість TCP")
+    serve_command.add_argument('--workers', type=int, default=None, help="Кількість процесів пулу")
+    serve_command.add_argument('--model', default=None, help="Мовна модель ngram_model для crack_vigenere")
+    serve_command.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help="Розмір черги запитів")
+    serve_command.add_argument('--max-pending', type=int, default=MAX_PENDING, help="Запити з'єднання без відповіді")
+    load_command.add_argument('--op', default='vigenere_encrypt', choices=sorted(OPERATIONS))
+    load_command.add_argument('--requests', type=int, default=1000)
+    load_command.add_argument('--connections', type=int, default=8)
+    load_command.add_argument('--window', type=int, default=16, help="Запити в дорозі на з'єднання")
+    load_command.add_argument('--size', default='1K', help="Розмір тексту запиту (1K, 1M, ...)")
+    load_command.add_argument('--key-length', type=int, default=8)
+    load_command.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    address = {'host': args.host, 'port': args.port, 'unix_path': args.unix}
+    try:
+        if args.command == 'serve':
+            asyncio.run(serve(**address, workers=args.workers, model_path=args.model,
+                              queue_size=args.queue_size, max_pending=args.max_pending))
+        elif args.command == 'load':
+            result = asyncio.run(run_load(args.op, args.requests, args.connections, args.window,
+                                          sample_text.parse_size(args.size), args.key_length, args.seed, **address))
+            print(json.dumps(result, indent=2))
+        else:
+            print(json.dumps(asyncio.run(fetch_stats(**address)), indent=2, ensure_ascii=False))
+    except (OSError, ValueError) as error:
+        parser.exit(1, f"Помилка: {error}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import atexit
+import json
+import multiprocessing
+import os
+import threading
+import time
+from functools import wraps
+
+# Якщо змінна задана, профілювання вмикається при імпорті, а профіль записується у файл при завершенні
+PROFILE_ENVIRONMENT = 'CIPHER_PROFILE'
+
+
+class Recorder:
+    """
+    Інтервали (spans) і лічильники поточного процесу.
+
+    Інтервал зберігається як (стек імен, початок, тривалість, потік) у наносекундах
+    від perf_counter_ns, тому з нього будуються і зведення за етапами, і траса
+    Chrome / Perfetto, і згорнуті стеки для flamegraph.pl. Процеси пулу мають
+    власні записувачі, тож їхні інтервали до профілю головного процесу не потрапляють.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def stack(self) -> list[str]:
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+
+RECORDER = Recorder()
+
+
+class Span:
+    """Інтервал виконання етапу (контекстний менеджер)."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        RECORDER.stack().append(self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter_ns() - self.start
+        stack = RECORDER.stack()
+        RECORDER.events.append((tuple(stack), self.start, duration, threading.get_ident()))
+        stack.pop()
+
+
+class NullSpan:
+    """Порожній інтервал, що повертається, коли профілювання вимкнене."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+NULL_SPAN = NullSpan()
+
+
+def enable():
+    RECORDER.enabled = True
+
+
+def disable():
+    RECORDER.enabled = False
+
+
+def reset():
+    """Видаляє зібрані інтервали і лічильники"""
+    with RECORDER.lock:
+        RECORDER.events = []
+        RECORDER.counters = {}
+
+
+def span(name: str):
+    """
+    Інтервал для частини функції: with instrumentation.span('stage'): ...
+    Коли профілювання вимкнене, повертається спільний порожній інтервал.
+    Аргументи:
+        name (str): Назва етапу.
+    Повертає:
+        Контекстний менеджер.
+    """
+    return Span(name) if RECORDER.enabled else NULL_SPAN
+
+
+def instrument(name: str | None = None):
+    """
+    Декоратор: кожен виклик функції записується як інтервал. Коли профілювання
+    вимкнене, обгортка лише перевіряє прапорець і викликає функцію.
+    Аргументи:
+        name (str | None): Назва етапу (за замовчуванням - module.qualname функції).
+    Повертає:
+        Декоратор.
+    """
+    def decorate(function):
+        label = name or f"{function.__module__}.{function.__qualname__}"
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                return function(*args, **kwargs)
+            with Span(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, value: int = 1):
+    """
+    Додає value до лічильника (n-грам переглянуто, зсувів оцінено, ...).
+    Аргументи:
+        name (str): Назва лічильника.
+        value (int): Приріст.
+    """
+    if RECORDER.enabled:
+        with RECORDER.lock:
+            RECORDER.counters[name] = RECORDER.counters.get(name, 0) + value
+
+
+def stack_times() -> dict[tuple[str, ...], list[int]]:
+    """
+    Кількість викликів, загальний і власний час (нс) для кожного стеку етапів.
+    Власний час - загальний мінус час безпосередньо вкладених етапів.
+    Повертає:
+        dict[tuple[str, ...], list[int]]: стек -> [виклики, загальний час, власний час].
+    """
+    times = {}
+    for stack, _, duration, _ in list(RECORDER.events):
+        entry = times.setdefault(stack, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] += duration
+    for stack, (_, total, _) in list(times.items()):
+        # Батьківський інтервал відсутній, лише якщо він ще не завершився
+        if len(stack) > 1 and stack[:-1] in times:
+            times[stack[:-1]][2] -= total
+    return times
+
+
+def summary() -> dict:
+    """
+    Зведення за етапами і лічильники.
+    Повертає:
+        dict: spans (назва -> calls, total_seconds, self_seconds) і counters.
+    """
+    spans = {}
+    for stack, (calls, total, own) in stack_times().items():
+        entry = spans.setdefault(stack[-1], {'calls': 0, 'total_seconds': 0.0, 'self_seconds': 0.0})
+        entry['calls'] += calls
+        # Рекурсивні виклики вкладені в себе; загальний час рахується лише для зовнішнього
+        if stack[-1] not in stack[:-1]:
+            entry['total_seconds'] += total / 1e9
+        entry['self_seconds'] += own / 1e9
+    ordered = dict(sorted(spans.items(), key=lambda item: item[1]['total_seconds'], reverse=True))
+    return {'spans': ordered, 'counters': dict(sorted(RECORDER.counters.items()))}
+
+
+def chrome_trace() -> dict:
+    """
+    Траса у форматі Chrome Trace Event (chrome://tracing, Perfetto, speedscope):
+    повні події 'X' для інтервалів, події 'C' з підсумками лічильників і зведення.
+    Повертає:
+        dict: JSON-об'єкт траси.
+    """
+    pid = os.getpid()
+    events = [
+        {'name': stack[-1], 'cat': 'cipher', 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3,
+         'pid': pid, 'tid': thread}
+        for stack, start, duration, thread in list(RECORDER.events)
+    ]
+    end = max((event['ts'] + event['dur'] for event in events), default=time.perf_counter_ns() / 1e3)
+    events += [{'name': name, 'ph': 'C', 'ts': end, 'pid': pid, 'args': {name: value}}
+               for name, value in sorted(RECORDER.counters.items())]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms', 'summary': summary()}
+
+
+def folded_stacks() -> str:
+    """
+    Згорнуті стеки для flamegraph.pl / speedscope: 'етап;вкладений етап мікросекунди'.
+    Повертає:
+        str: Рядки стеків із власним часом.
+    """
+    return ''.join(f"{';'.join(stack)} {own // 1000}\n"
+                   for stack, (_, _, own) in sorted(stack_times().items()) if own >= 1000)
+
+
+def write_profile(path: str):
+    """
+    Записує профіль: '*.folded' - згорнуті стеки, інакше - JSON траси Chrome зі зведенням.
+    Аргументи:
+        path (str): Шлях до файлу.
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        if path.endswith('.folded'):
+            file.write(folded_stacks())
+        else:
+            json.dump(chrome_trace(), file)
+
+
+def write_at_exit(path: str, pid: int):
+    # Процеси пулу успадковують змінну середовища, але профіль пише лише головний процес
+    if os.getpid() == pid and multiprocessing.parent_process() is None:
+        write_profile(path)
+
+
+if os.environ.get(PROFILE_ENVIRONMENT):
+    enable()
+    atexit.register(write_at_exit, os.environ[PROFILE_ENVIRONMENT], os.getpid())
@@ -0,0 +1,295 @@
+import argparse
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+import alphabets
+import cipher_io
+
+# Бінарний формат: заголовок, літери алфавіту (UTF-8), потім таблиці порядків 1..max_order
+# як суцільні масиви float32 (little-endian), вирівняні на 4 байти
+MAGIC = b'NGRM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHxxd')
+MAX_ORDER = 4
+
+# Вбудована англійська модель: лише частоти літер та індекс відповідності
+ENGLISH_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ENGLISH_IC = 0.0667
+ENGLISH_FREQUENCIES = {
+    'A': 0.082, 'B': 0.015, 'C': 0.028, 'D': 0.043, 'E': 0.127,
+    'F': 0.022, 'G': 0.020, 'H': 0.061, 'I': 0.070, 'J': 0.002,
+    'K': 0.008, 'L': 0.040, 'M': 0.024, 'N': 0.067, 'O': 0.075,
+    'P': 0.019, 'Q': 0.001, 'R': 0.060, 'S': 0.063, 'T': 0.091,
+    'U': 0.028, 'V': 0.010, 'W': 0.023, 'X': 0.001, 'Y': 0.020,
+    'Z': 0.001
+}
+
+
+class NgramModel:
+    """
+    Мовна модель: log10-ймовірності n-грам порядків 1..max_order.
+
+    Літери алфавіту мають коди 0..len(alphabet)-1, усі інші символи - спільний код
+    other = len(alphabet), тому межі слів теж входять до n-грам. Таблиця порядку n -
+    плаский масив розміром base ** n, де base = len(alphabet) + 1, а індекс n-грами
+    c1..cn дорівнює ((c1 * base + c2) * base + ...) + cn.
+
+    Модель, завантажена з файлу, читає таблиці безпосередньо з відображеної пам'яті:
+    запуск не залежить від розміру таблиць, а процеси пулу ділять одні сторінки.
+    """
+
+    def __init__(self, alphabet: str, frequencies: dict[str, float], ic: float,
+                 tables: dict | None = None, path: str | None = None):
+        self.alphabet = alphabet
+        self.other = len(alphabet)
+        self.base = len(alphabet) + 1
+        self.frequencies = frequencies
+        self.ic = ic
+        self.tables = tables or {}
+        self.path = path
+        self.letter_codes = {char: code for code, char in enumerate(alphabet)}
+        self.letter_codes.update({char.lower(): code for code, char in enumerate(alphabet)})
+
+    def __reduce__(self):
+        # У процес пулу передається лише шлях: таблиці відображаються там повторно, а не копіюються
+        if self.path is not None:
+            return load_model, (self.path,)
+        return NgramModel, (self.alphabet, self.frequencies, self.ic, self.tables)
+
+    @property
+    def max_order(self) -> int:
+        return max(self.tables, default=0)
+
+    def table(self, order: int):
+        """
+        Таблиця log10-ймовірностей n-грам заданого порядку.
+        Аргументи:
+            order (int): Порядок n-грам.
+        Повертає:
+            Послідовність float розміром base ** order.
+        """
+        if order not in self.tables:
+            raise ValueError(f"Model has no {order}-gram table; build one with 'ngram_model.py build'.")
+        return self.tables[order]
+
+    def codes(self, text: str) -> list[int]:
+        """
+        Коди символів тексту: номер літери в алфавіті (без урахування регістру) або other.
+        Аргументи:
+            text (str): Текст.
+        Повертає:
+            list[int]: Коди.
+        """
+        return [self.letter_codes.get(char, self.other) for char in text]
+
+    def log_frequencies(self) -> list[float]:
+        """
+        log10-частоти літер у порядку алфавіту.
+        Повертає:
+            list[float]: Логарифми частот.
+        """
+        return [math.log10(self.frequencies[char]) for char in self.alphabet]
+
+    def score_codes(self, codes: list[int], order: int = MAX_ORDER) -> float:
+        """
+        Сума log10-ймовірностей усіх n-грам послідовності кодів.
+        Аргументи:
+            codes (list[int]): Коди символів.
+            order (int): Порядок n-грам.
+        Повертає:
+            float: Оцінка (більше - ближче до мови моделі).
+        """
+        return sum(map(self.table(order).__getitem__, ngram_indices(codes, order, self.base)))
+
+    def score(self, text: str, order: int = MAX_ORDER) -> float:
+        """
+        Сума log10-ймовірностей усіх n-грам тексту.
+        Аргументи:
+            text (str): Текст.
+            order (int): Порядок n-грам.
+        Повертає:
+            float: Оцінка.
+        """
+        return self.score_codes(self.codes(text), order)
+
+
+ENGLISH = NgramModel(ENGLISH_ALPHABET, ENGLISH_FREQUENCIES, ENGLISH_IC)
+
+
+def ngram_indices(codes: list[int], order: int, base: int):
+    """
+    Індекси всіх n-грам послідовності кодів (без циклу Python по n-грамах).
+    Аргументи:
+        codes (list[int]): Коди символів.
+        order (int): Порядок n-грам.
+        base (int): Основа індексу.
+    Повертає:
+        Ітератор індексів.
+    """
+    parts = [[code * base ** (order - 1 - t) for code in codes[t:]] for t in range(order)]
+    return map(sum, zip(*parts))
+
+
+def build_model(text: str, alphabet: str = ENGLISH_ALPHABET, max_order: int = MAX_ORDER,
+                path: str | None = None) -> NgramModel:
+    """
+    Навчає модель на корпусі тексту.
+
+    n-грами, яких немає в корпусі, отримують штрафну ймовірність 0.01 / N.
+    Частоти літер і індекс відповідності рахуються лише за літерами алфавіту.
+    Аргументи:
+        text (str): Корпус мовою моделі.
+        alphabet (str): Літери мови (великі).
+        max_order (int): Найбільший порядок n-грам.
+        path (str | None): Шлях до корпусу, якщо модель будується з файлу.
+    Повертає:
+        NgramModel: Модель із таблицями в пам'яті (float32, як у файлі).
+    """
+    model = NgramModel(alphabet, {}, 0.0, path=path)
+    codes = model.codes(text)
+    if len(codes) < max_order:
+        raise ValueError("Corpus is too short.")
+
+    for order in range(1, max_order + 1):
+        counts = Counter(ngram_indices(codes, order, model.base))
+        total = sum(counts.values())
+        table = array('f', [math.log10(0.01 / total)]) * model.base ** order
+        for index, count in counts.items():
+            table[index] = math.log10(count / total)
+        model.tables[order] = table
+
+    model.frequencies, model.ic = letter_statistics(model.tables[1], alphabet)
+    return model
+
+
+def letter_statistics(unigrams, alphabet: str) -> tuple[dict[str, float], float]:
+    """
+    Частоти літер (нормовані без урахування other) та очікуваний індекс відповідності.
+    Аргументи:
+        unigrams: Таблиця log10-ймовірностей порядку 1.
+        alphabet (str): Літери мови.
+    Повертає:
+        tuple[dict[str, float], float]: Частоти літер та сума їхніх квадратів.
+    """
+    weights = [10 ** unigrams[code] for code in range(len(alphabet))]
+    total = sum(weights)
+    frequencies = {char: weight / total for char, weight in zip(alphabet, weights)}
+    return frequencies, sum(frequency * frequency for frequency in frequencies.values())
+
+
+def save_model(model: NgramModel, path: str):
+    """
+    Записує модель у бінарний файл для load_model.
+    Аргументи:
+        model (NgramModel): Модель із таблицями порядків 1..max_order.
+        path (str): Шлях до файлу.
+    """
+    letters = model.alphabet.encode('utf-8')
+    header = HEADER.pack(MAGIC, VERSION, model.max_order, len(letters), model.ic) + letters
+    header += b'\0' * (-len(header) % 4)
+    with open(path, 'wb') as file:
+        file.write(header)
+        for order in range(1, model.max_order + 1):
+            table = array('f', model.table(order))
+            if sys.byteorder != 'little':
+                table.byteswap()
+            file.write(table.tobytes())
+
+
+@lru_cache(maxsize=8)
+def load_model(path: str) -> NgramModel:
+    """
+    Завантажує модель: бінарний файл відображається в пам'ять, а звичайний текст
+    вважається англійським корпусом і навчається build_model.
+
+    Результат кешується, тому кожен процес відкриває файл лише один раз.
+    Пошкоджений файл моделі або закороткий корпус - CipherIOError зі шляхом і причиною.
+    Аргументи:
+        path (str): Файл моделі (save_model) або корпус.
+    Повертає:
+        NgramModel: Модель.
+    """
+    with cipher_io.reporting(path, 'read'), open(path, 'rb') as file:
+        is_model = file.read(len(MAGIC)) == MAGIC
+        if is_model:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if not is_model:
+        try:
+            return build_model(cipher_io.read_text(path), path=path)
+        except ValueError as error:
+            raise cipher_io.CipherIOError(f"Cannot load model '{path}': {error}") from error
+
+    if len(data) < HEADER.size:
+        raise cipher_io.CipherIOError(f"Cannot load model '{path}': the header is truncated.")
+    magic, version, max_order, letters_size, ic = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise cipher_io.CipherIOError(f"Cannot load model '{path}': unsupported version {version}.")
+    offset = HEADER.size
+    if not max_order or not letters_size or offset + letters_size > len(data):
+        raise cipher_io.CipherIOError(f"Cannot load model '{path}': the header is invalid.")
+    with cipher_io.reporting(path, 'decode'):
+        alphabet = data[offset:offset + letters_size].decode('utf-8')
+    offset += letters_size + (-(HEADER.size + letters_size) % 4)
+
+    model = NgramModel(alphabet, {}, ic, path=path)
+    view = memoryview(data)
+    for order in range(1, max_order + 1):
+        size = 4 * model.base ** order
+        if offset + size > len(data):
+            raise cipher_io.CipherIOError(f"Cannot load model '{path}': the file is truncated.")
+        table = view[offset:offset + size].cast('f')
+        if sys.byteorder != 'little':
+            table = array('f', table)
+            table.byteswap()
+        model.tables[order] = table
+        offset += size
+
+    model.frequencies, _ = letter_statistics(model.tables[1], alphabet)
+    return model
+
+
+def main(argv=None):
+    """
+    Командний рядок
+
+    Приклади:
+        python ngram_model.py build english.txt english.ngm
+        python ngram_model.py build ukrainian.txt ukrainian.ngm --alphabet ukrainian
+        python ngram_model.py info english.ngm
+    """
+    parser = argparse.ArgumentParser(description="Мовна модель n-грам")
+    commands = parser.add_subparsers(dest='mode', required=True)
+
+    command = commands.add_parser('build', help="Навчання моделі на корпусі")
+    command.add_argument('corpus', help="Корпус мовою моделі (UTF-8)")
+    command.add_argument('output', help="Файл моделі")
+    command.add_argument('--alphabet', default='latin', help="Алфавіт: latin, ukrainian або літери мови")
+    command.add_argument('--max-order', type=int, default=MAX_ORDER)
+
+    command = commands.add_parser('info', help="Відомості про модель")
+    command.add_argument('model', help="Файл моделі")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.mode == 'build':
+            corpus = cipher_io.read_text(args.corpus)
+            model = build_model(corpus, alphabets.get_alphabet(args.alphabet).letters, args.max_order)
+            with cipher_io.reporting(args.output, 'write'):
+                save_model(model, args.output)
+        else:
+            model = load_model(args.model)
+    except (cipher_io.CipherIOError, ValueError) as error:
+        parser.exit(1, f"Помилка: {error}\n")
+
+    print(f"Алфавіт: {model.alphabet}")
+    print(f"Порядки n-грам: 1..{model.max_order}")
+    print(f"Індекс відповідності: {model.ic:.4f}")
+
+
+if __name__ == "__main__":
+    main()
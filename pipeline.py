@@ -0,0 +1,344 @@
+import argparse
+import math
+import sys
+
+import alphabets
+import cipher_io
+vigenere = __import__('1_vigenere')
+transpos = __import__('2_transpos')
+table_vig = __import__('3_table_vig')
+
+LATIN = alphabets.LATIN
+# Найбільший період злитих таблиць (НСК довжин ключів Віженера в одній групі)
+MAX_FUSED_PERIOD = 4096
+IDENTITY_BYTES = bytes(range(256))
+
+
+class ComposedTable(dict):
+    """
+    Таблиця для str.translate, що застосовує кілька таблиць поспіль.
+    Як і ShiftTable та PolybiusTable, значення обчислюється при першому зверненні
+    і кешується (лише для кодів нижче alphabets.CACHED_CODES).
+    """
+
+    def __init__(self, tables: list):
+        super().__init__()
+        self.tables = tables
+
+    def __missing__(self, code: int) -> str:
+        text = chr(code)
+        for table in self.tables:
+            text = text.translate(table)
+        if code < alphabets.CACHED_CODES:
+            self[code] = text
+        return text
+
+
+class Vigenere:
+    """
+    Етап шифру Віженера (vigenere_encrypt / vigenere_decrypt): зсув літер з періодом ключа.
+    Результат - літери у верхньому регістрі, інші символи без змін.
+    """
+
+    def __init__(self, key: str, alphabet: alphabets.Alphabet = LATIN):
+        vigenere.compile_key(key, alphabet)  # Перевірка ключа під час побудови ланцюжка
+        self.key = key
+        self.alphabet = alphabet
+
+    def __repr__(self):
+        return f"Vigenere({self.key!r})"
+
+    def apply(self, text: str, decrypt: bool) -> str:
+        function = vigenere.vigenere_decrypt if decrypt else vigenere.vigenere_encrypt
+        return function(text, self.key, self.alphabet)
+
+    def letter_tables(self, decrypt: bool) -> tuple[list, list]:
+        """
+        Таблиці для кожної позиції ключа: для рядка літер і (якщо є кодування) для байтів.
+        Аргументи:
+            decrypt (bool): True для дешифрування.
+        Повертає:
+            tuple[list, list]: Таблиці str.translate і bytes.translate.
+        """
+        shifts = vigenere.compile_key(self.key, self.alphabet)[1 if decrypt else 0]
+        byte_tables = self.alphabet.byte_shift_tables or [None] * self.alphabet.size
+        return [self.alphabet.shift_tables[shift] for shift in shifts], [byte_tables[shift] for shift in shifts]
+
+
+class Polybius:
+    """
+    Етап квадрата Полібія (table_transform): заміна, що не залежить від позиції
+    і зберігає регістр, тому переставляється з будь-якою перестановкою символів.
+    """
+
+    def __init__(self, key: str, alphabet: alphabets.Alphabet = LATIN):
+        self.key = key
+        self.alphabet = alphabet
+
+    def __repr__(self):
+        return f"Polybius({self.key!r})"
+
+    def table(self, decrypt: bool) -> table_vig.PolybiusTable:
+        return table_vig.compile_tables(self.key, self.alphabet)[1 if decrypt else 0]
+
+    def apply(self, text: str, decrypt: bool) -> str:
+        return text.translate(self.table(decrypt))
+
+    def letter_tables(self, decrypt: bool) -> tuple[list, list]:
+        table = self.table(decrypt)
+        byte_table = None
+        if self.alphabet.codec:
+            shifted = self.alphabet.letters.translate(table).encode(self.alphabet.codec)
+            byte_table = bytes.maketrans(self.alphabet.letter_bytes, shifted)
+        return [table], [byte_table]
+
+
+class Transposition:
+    """
+    Етап перестановки стовпчиків (з key_row - подвійної) з 2_transpos.py.
+    Перестановки виконуються зрізами плану transposition_plan зі швидкістю копіювання
+    пам'яті; явна зведена перестановка індексів у Python була б у десятки разів повільнішою,
+    тому кожна перестановка лишається окремим проходом.
+    """
+
+    def __init__(self, key_col: str, key_row: str = None, framed: bool = False):
+        self.key_col = key_col
+        self.key_row = key_row
+        self.framed = framed
+
+    def __repr__(self):
+        return f"Transposition({self.key_col!r}, {self.key_row!r})"
+
+    def apply(self, text: str, decrypt: bool) -> str:
+        if self.key_row is None:
+            function = transpos.transpos_cols_decrypt if decrypt else transpos.transpos_cols_encrypt
+            return function(text, self.key_col, framed=self.framed)
+        function = transpos.double_transpos_decrypt if decrypt else transpos.double_transpos_encrypt
+        return function(text, self.key_row, self.key_col, framed=self.framed)
+
+
+def apply_phase_tables(clean_text: str | bytes, str_tables: list, byte_tables: list) -> str | bytes:
+    """
+    Застосовує періодичні таблиці до літер тексту (як apply_shifts у 1_vigenere):
+    смуга clean_text[i::період] перекладається одним викликом translate.
+    Аргументи:
+        clean_text (str | bytes): Літери з split_layout.
+        str_tables (list): Таблиці str.translate для кожної позиції періоду.
+        byte_tables (list): Таблиці bytes.translate для кожної позиції періоду.
+    Повертає:
+        str | bytes: Перекладені літери.
+    """
+    period = len(str_tables)
+    if isinstance(clean_text, bytes):
+        result = bytearray(len(clean_text))
+        for phase, table in enumerate(byte_tables[:len(clean_text)]):
+            result[phase::period] = clean_text[phase::period].translate(table)
+        return bytes(result)
+
+    if not clean_text.isalpha():
+        # Рідкісний випадок: після upper() з'явились не-літери
+        return ''.join(str_tables[i % period][ord(char)] for i, char in enumerate(clean_text))
+
+    result = [''] * len(clean_text)
+    for phase, table in enumerate(str_tables[:len(clean_text)]):
+        result[phase::period] = clean_text[phase::period].translate(table)
+    return ''.join(result)
+
+
+class SubstitutionGroup:
+    """
+    Сусідні етапи заміни одного алфавіту, злиті в один прохід.
+
+    Для кожної позиції спільного періоду (НСК довжин ключів Віженера) таблиці всіх етапів
+    складаються в одну, тому ланцюжок Віженер -> квадрат -> Віженер виконує одне
+    відокремлення літер, один translate на смугу і одне відновлення форматування.
+    Група лише з квадратів перекладає весь текст однією таблицею зі збереженням регістру.
+    """
+
+    def __init__(self, stages: list):
+        self.stages = stages
+        self.alphabet = stages[0].alphabet
+        self.period = math.lcm(*(self.stage_period(stage) for stage in stages))
+        self.compiled = {}
+
+    def __repr__(self):
+        return f"SubstitutionGroup({self.stages!r})"
+
+    @staticmethod
+    def stage_period(stage) -> int:
+        return len(vigenere.compile_key(stage.key, stage.alphabet)[0]) if isinstance(stage, Vigenere) else 1
+
+    def accepts(self, stage) -> bool:
+        """Чи можна злити етап із групою: той самий алфавіт і обмежений спільний період"""
+        return (stage.alphabet is self.alphabet
+                and math.lcm(self.period, self.stage_period(stage)) <= MAX_FUSED_PERIOD)
+
+    def add(self, stage):
+        self.stages.append(stage)
+        self.period = math.lcm(self.period, self.stage_period(stage))
+        self.compiled.clear()
+
+    def tables(self, decrypt: bool) -> tuple[list, list]:
+        """
+        Злиті таблиці для кожної позиції періоду (кешуються для кожного напрямку).
+        Аргументи:
+            decrypt (bool): True для дешифрування (етапи в зворотному порядку).
+        Повертає:
+            tuple[list, list]: Таблиці str.translate і bytes.translate.
+        """
+        if decrypt not in self.compiled:
+            stages = self.stages[::-1] if decrypt else self.stages
+            stage_tables = [stage.letter_tables(decrypt) for stage in stages]
+            str_tables, byte_tables = [], []
+            for phase in range(self.period):
+                str_tables.append(ComposedTable([tables[phase % len(tables)] for tables, _ in stage_tables]))
+                composed = IDENTITY_BYTES
+                for _, tables in stage_tables:
+                    table = tables[phase % len(tables)]
+                    composed = composed.translate(table) if composed is not None and table is not None else None
+                byte_tables.append(composed)
+            self.compiled[decrypt] = str_tables, byte_tables
+        return self.compiled[decrypt]
+
+    def apply(self, text: str, decrypt: bool) -> str:
+        str_tables, byte_tables = self.tables(decrypt)
+        if self.period == 1 and all(isinstance(stage, Polybius) for stage in self.stages):
+            return text.translate(str_tables[0])
+
+        clean_text, layout = vigenere.split_layout(text, self.alphabet)
+        stages = self.stages[::-1] if decrypt else self.stages
+        if len(clean_text) > layout.letter_count and isinstance(stages[0], Polybius):
+            # upper() подовжив текст ('ß' -> 'SS'): квадрат перед Віженером при послідовних
+            # викликах бачить вихідний символ, а не літери після upper(), тому етапи виконуються по черзі
+            for stage in stages:
+                text = stage.apply(text, decrypt)
+            return text
+        return layout.merge(apply_phase_tables(clean_text, str_tables, byte_tables))
+
+
+def fuse_stages(stages: list) -> list:
+    """
+    Будує план виконання ланцюжка: квадрати Полібія переносяться через перестановки
+    до найближчого етапу заміни (заміна, що не залежить від позиції і не змінює пробілів
+    та доповнення, переставляється з перестановкою), а сусідні заміни зливаються в групи.
+    Аргументи:
+        stages (list): Етапи Vigenere, Polybius і Transposition у порядку шифрування.
+    Повертає:
+        list: Групи SubstitutionGroup і етапи Transposition у порядку шифрування.
+    """
+    ordered = []
+    for stage in stages:
+        position = len(ordered)
+        if isinstance(stage, Polybius):
+            while position and isinstance(ordered[position - 1], Transposition):
+                position -= 1
+            if not position:
+                position = len(ordered)
+        ordered.insert(position, stage)
+
+    plan = []
+    for stage in ordered:
+        if isinstance(stage, Transposition):
+            plan.append(stage)
+        elif plan and isinstance(plan[-1], SubstitutionGroup) and plan[-1].accepts(stage):
+            plan[-1].add(stage)
+        else:
+            plan.append(SubstitutionGroup([stage]))
+    return plan
+
+
+class Pipeline:
+    """
+    Декларативний ланцюжок шифрів, наприклад Віженер -> квадрат Полібія -> перестановка.
+
+    Результат збігається з послідовним викликом vigenere_encrypt, table_transform
+    і transpos_cols_encrypt / double_transpos_encrypt, але всі заміни виконуються одним
+    проходом по тексту (див. SubstitutionGroup), а перестановки - зрізами без проміжних
+    списків. Дешифрування проходить план у зворотному порядку.
+    """
+
+    def __init__(self, stages: list):
+        if not stages:
+            raise ValueError("Pipeline must contain at least one stage.")
+        self.stages = list(stages)
+        self.plan = fuse_stages(self.stages)
+
+    def __repr__(self):
+        return f"Pipeline({self.stages!r})"
+
+    def encrypt(self, text: str) -> str:
+        for step in self.plan:
+            text = step.apply(text, False)
+        return text
+
+    def decrypt(self, encrypted_text: str) -> str:
+        for step in reversed(self.plan):
+            encrypted_text = step.apply(encrypted_text, True)
+        return encrypted_text
+
+
+def parse_pipeline(spec: str, alphabet: alphabets.Alphabet = LATIN, framed: bool = False) -> Pipeline:
+    """
+    Ланцюжок з опису 'vigenere:KEY polybius:KEY transpos:COLS[:ROWS]' (етапи розділені
+    пробілами або '|', у порядку шифрування).
+    Аргументи:
+        spec (str): Опис ланцюжка.
+        alphabet (Alphabet): Алфавіт етапів заміни.
+        framed (bool): Однозначне доповнення в перестановках (див. frame_text).
+    Повертає:
+        Pipeline: Ланцюжок.
+    """
+    stages = []
+    for item in spec.replace('|', ' ').split():
+        name, _, keys = item.partition(':')
+        keys = keys.split(':')
+        if name == 'vigenere' and len(keys) == 1:
+            stages.append(Vigenere(keys[0], alphabet))
+        elif name == 'polybius' and len(keys) == 1:
+            stages.append(Polybius(keys[0], alphabet))
+        elif name == 'transpos' and len(keys) in (1, 2) and all(keys):
+            stages.append(Transposition(keys[0], keys[1] if len(keys) == 2 else None, framed))
+        else:
+            raise ValueError(f"Invalid pipeline stage '{item}'.")
+    return Pipeline(stages)
+
+
+def main(argv=None):
+    """
+    Командний рядок
+
+    Приклади:
+        python pipeline.py encrypt "vigenere:KEY polybius:CRYPTO transpos:SECRET" < message.txt > message.enc
+        python pipeline.py decrypt "vigenere:KEY polybius:CRYPTO transpos:SECRET" --input message.enc --output message.txt
+    """
+    parser = argparse.ArgumentParser(description="Ланцюжок шифрів за один прохід")
+    commands = parser.add_subparsers(dest='mode', required=True)
+    for mode in ('encrypt', 'decrypt'):
+        command = commands.add_parser(mode, help="Обробка всього тексту stdin -> stdout")
+        command.add_argument('spec', help="Етапи: vigenere:KEY polybius:KEY transpos:COLS[:ROWS]")
+        command.add_argument('--alphabet', default='latin', help="Алфавіт: latin, ukrainian або рядок літер")
+        command.add_argument('--framed', action='store_true', help="Однозначне доповнення в перестановках")
+        command.add_argument('--input', help="Вхідний файл замість stdin")
+        command.add_argument('--output', help="Файл результату замість stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        pipeline = parse_pipeline(args.spec, alphabets.get_alphabet(args.alphabet), args.framed)
+        if args.input:
+            text = cipher_io.read_text(args.input, newline='')
+        else:
+            sys.stdin.reconfigure(encoding='utf-8', newline='')
+            text = sys.stdin.read()
+        result = pipeline.decrypt(text) if args.mode == 'decrypt' else pipeline.encrypt(text)
+        if args.output:
+            with cipher_io.open_output(args.output, 'utf-8') as file:
+                file.write(result)
+        else:
+            sys.stdout.reconfigure(encoding='utf-8', newline='')
+            sys.stdout.write(result)
+    except (cipher_io.CipherIOError, ValueError) as error:
+        parser.exit(1, f"Помилка: {error}\n")
+
+
+if __name__ == "__main__":
+    main()
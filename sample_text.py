@@ -0,0 +1,43 @@
+import os
+import random
+
+import cipher_io
+
+# Корпус за замовчуванням: слова plain_text.txt поруч зі скриптом
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plain_text.txt')
+SIZE_UNITS = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parse_size(value: str) -> int:
+    """
+    Розмір у байтах із суфіксом K, M або G ('100M' -> 104857600).
+    Аргументи:
+        value (str): Розмір.
+    Повертає:
+        int: Кількість байтів.
+    """
+    value = value.strip().upper().removesuffix('B')
+    if value[-1:] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def generate_corpus(size: int, seed: int = 0, source: str = CORPUS_PATH) -> str:
+    """
+    Відтворюваний текст заданого розміру: слова вихідного корпусу (з пунктуацією
+    і регістром) у випадковому порядку. Менші корпуси - префікси більших з тим самим seed.
+    Аргументи:
+        size (int): Розмір у символах.
+        seed (int): Початкове значення генератора.
+        source (str): Корпус, з якого беруться слова.
+    Повертає:
+        str: Текст.
+    """
+    words = cipher_io.read_text(source).split()
+    if not words:
+        raise ValueError(f"Corpus '{source}' has no words.")
+    average = sum(map(len, words)) / len(words) + 1
+    text = ' '.join(random.Random(seed).choices(words, k=int(size / average) + 16))
+    while len(text) < size:
+        text += ' ' + text
+    return text[:size]
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAIN_TEXT = os.path.join(ROOT, 'plain_text.txt')
+
+# Команди шифрування на місці (--input і --output - той самий файл); дешифрування - з 'decrypt'
+IN_PLACE_COMMANDS = [
+    ['1_vigenere.py', '--key', 'KEY'],
+    ['1_vigenere.py', '--key', 'KEY', '--bytes'],
+    ['1_vigenere.py', '--key', 'KEY', '--chunk-size', '4096'],
+    ['2_transpos.py', '--key', 'SECRET', '--rows', '16'],
+    ['2_transpos.py', '--key', 'SECRET', '--row-key', 'ROW', '--rows', '16'],
+    ['pipeline.py', 'vigenere:KEY polybius:CRYPTO transpos:SECRET', '--framed'],
+]
+
+
+def run(script, mode, arguments, path):
+    completed = subprocess.run([sys.executable, os.path.join(ROOT, script), mode, *arguments,
+                                '--input', str(path), '--output', str(path)], capture_output=True, cwd=ROOT)
+    assert completed.returncode == 0, completed.stderr.decode()
+
+
+def test_in_place_encryption_keeps_data(tmp_path):
+    with open(PLAIN_TEXT, 'rb') as file:
+        original = file.read() * 20
+    for script, *arguments in IN_PLACE_COMMANDS:
+        path = tmp_path / 'message.txt'
+        path.write_bytes(original)
+        run(script, 'encrypt', arguments, path)
+        encrypted = path.read_bytes()
+        assert len(encrypted) >= len(original) and encrypted != original, script
+        run(script, 'decrypt', arguments, path)
+        decrypted = path.read_bytes()
+        if '--bytes' in arguments:
+            assert decrypted == original
+        else:
+            # Віженер повертає літери у верхньому регістрі, перестановка без --framed - без доповнення
+            assert decrypted.decode().upper().rstrip() == original.decode().upper().rstrip(), arguments
+        assert os.listdir(tmp_path) == ['message.txt']
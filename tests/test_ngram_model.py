@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cipher_io
+import ngram_model
+
+
+def test_load_model_reports_damaged_files(tmp_path):
+    model = ngram_model.build_model('THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG ' * 20, max_order=2)
+    path = tmp_path / 'model.ngm'
+    ngram_model.save_model(model, str(path))
+    data = path.read_bytes()
+    assert ngram_model.load_model(str(path)).max_order == 2
+
+    for name, content in [('header.ngm', data[:ngram_model.HEADER.size - 1]), ('tables.ngm', data[:-1]),
+                          ('empty.txt', b''), ('short.txt', b'ab')]:
+        damaged = tmp_path / name
+        damaged.write_bytes(content)
+        with pytest.raises(cipher_io.CipherIOError, match=name):
+            ngram_model.load_model(str(damaged))
@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pipeline
+
+STAGE_CHAINS = [
+    [pipeline.Vigenere('KEY'), pipeline.Polybius('CRYPTO')],
+    [pipeline.Polybius('CRYPTO'), pipeline.Vigenere('KEY')],
+    [pipeline.Vigenere('KEY'), pipeline.Polybius('CRYPTO'), pipeline.Vigenere('LEMONS')],
+    [pipeline.Polybius('CRYPTO'), pipeline.Transposition('SECRET'), pipeline.Vigenere('KEY')],
+    [pipeline.Vigenere('KEY'), pipeline.Transposition('SECRET', 'ROW'), pipeline.Polybius('CRYPTO')],
+]
+
+
+def sequential(stages, text, decrypt=False):
+    """Послідовні виклики vigenere_encrypt, table_transform і функцій перестановки"""
+    for stage in stages[::-1] if decrypt else stages:
+        if isinstance(stage, pipeline.Vigenere):
+            function = pipeline.vigenere.vigenere_decrypt if decrypt else pipeline.vigenere.vigenere_encrypt
+            text = function(text, stage.key)
+        elif isinstance(stage, pipeline.Polybius):
+            text = pipeline.table_vig.table_transform(text, stage.key, not decrypt)
+        else:
+            text = stage.apply(text, decrypt)
+    return text
+
+
+def test_fused_chain_matches_sequential_calls_when_upper_expands():
+    rng = random.Random(2)
+    for _ in range(300):
+        text = ''.join(rng.choices('abcjXYZ ßﬁİŉ.,\n', k=rng.randint(1, 30)))
+        for stages in STAGE_CHAINS:
+            chain = pipeline.Pipeline(stages)
+            assert chain.encrypt(text) == sequential(stages, text), (stages, text)
+            assert chain.decrypt(text) == sequential(stages, text, decrypt=True), (stages, text)
+
+
+def test_composed_tables_do_not_cache_arbitrary_unicode():
+    chain = pipeline.Pipeline([pipeline.Vigenere('KEY'), pipeline.Polybius('CRYPTO')])
+    text = ''.join(map(chr, range(0x4E00, 0x5E00))) + 'Hello, World'
+    assert chain.encrypt(text) == sequential(chain.stages, text)
+    for group in chain.plan:
+        for table in group.tables(False)[0]:
+            assert all(code < pipeline.alphabets.CACHED_CODES for code in table)
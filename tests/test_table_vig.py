@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import alphabets
+table_vig = __import__('3_table_vig')
+
+# Результати початкової реалізації з пошуком у стовпчиках: (текст, ключ, шифрування, дешифрування)
+BASELINE_CASES = [
+    ('Hello, World!', 'MATRIX', 'Plssv, Tvdsk!', 'Cieeg, Pgyer!'),
+    ('The Quick Brown Fox jumps over the Lazy Dog, Jim.', 'CRYPTO',
+     'Enk Xcqos Hafyw Lfp jcvdz frka enk Ugtb Ifm, Jqv.', 'Zbt Ildue Yvcnh Ocq jlgxk cmtv zbt Frsw Pca, Jdg.'),
+    ('Привіт Jack! ß ij IJ', 'KEYWORD', 'Привіт Jhlr! ß qj QJ', 'Привіт Jyot! ß bj BJ'),
+]
+
+
+def test_polybius_table_does_not_cache_arbitrary_unicode():
+    encrypt_table, _ = table_vig.compile_tables('BOUNDED')
+    text = ''.join(map(chr, range(0x4E00, 0x5E00))) + 'Hello, World'
+    assert table_vig.table_transform(text, 'BOUNDED', True).startswith(text[:0x1000])
+    assert all(code < alphabets.CACHED_CODES for code in encrypt_table)
+
+
+def test_table_transform_matches_baseline():
+    for text, key, encrypted_text, decrypted_text in BASELINE_CASES:
+        assert table_vig.table_transform(text, key, True) == encrypted_text, text
+        assert table_vig.table_transform(text, key, False) == decrypted_text, text
+        assert table_vig.table_transform(encrypted_text, key, False) == text, text
+
+
+def test_byte_mode_round_trip():
+    data = bytes(range(256)) * 16
+    encrypted = table_vig.table_transform_bytes(data, 'KEY', True, chunk_size=100)
+    assert sorted(encrypted) == sorted(data) and encrypted != data
+    assert table_vig.table_transform_bytes(encrypted, b'KEY', False) == data
+    # Обробка на місці
+    buffer = bytearray(encrypted)
+    table_vig.table_transform_bytes(buffer, 'KEY', False, out=buffer)
+    assert buffer == data
@@ -0,0 +1,169 @@
+import io
+import os
+import random
+import string
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+transpos = __import__('2_transpos')
+
+# Символи тексту: літери, пробіли й символи доповнення, щоб доповнення не можна було сплутати з текстом
+ALPHABET = string.ascii_letters + '  \t\n' + transpos.PAD_MARK + transpos.PAD_FILL + 'ßЇ'
+KEY_LETTERS = string.ascii_uppercase
+CASES = 300
+
+SPECIAL_TEXTS = [
+    '',
+    ' ',
+    'ATTACK AT DAWN   ',
+    'trailing\n\n',
+    transpos.PAD_MARK,
+    transpos.PAD_FILL,
+    'TEXT' + transpos.PAD_MARK,
+    'TEXT' + transpos.PAD_MARK + transpos.PAD_FILL * 3,
+    transpos.PAD_FILL * 7 + ' ',
+]
+
+
+# Шифротексти початкової реалізації (матриця списків): повні матриці, неповний
+# останній рядок і ключі з однаковими літерами
+COLUMN_CASES = [
+    ('WE ARE DISCOVERED FLEE AT ONCE', 'ZEBRAS', 'RCD C IREOEDEL ASEENEO AEW VFT'),
+    ('Hello, World', 'KEY', 'eoWlHl rl,od'),
+    ('abcdefghij', 'SECRET', 'cibhe djagf '),
+    ('Attack at dawn!\nRetreat at dusk.', 'CIPHER', 'A wtakcdRtu a \nad tanrt.tt!e  kae s '),
+]
+DOUBLE_CASES = [
+    ('WE ARE DISCOVERED FLEE AT ONCE', 'ROW', 'ZEBRAS', 'CCR DIO ERD ELESNAEEOEEA  TWFV'),
+    ('Hello, World', 'SECRET', 'KEY', 'Wole lrHo,dl'),
+    ('The quick brown fox jumps over the lazy dog', 'BACK', 'CRYPTO',
+     'i Tsoaxgrluroop  e v  u cth wz  b qefdm kheonyj '),
+    ('abcdefghijk', 'ZZA', 'TOP', 'hbekicf gadj'),
+]
+
+
+def random_text(rng: random.Random) -> str:
+    return ''.join(rng.choices(ALPHABET, k=rng.randint(0, 80)))
+
+
+def random_key(rng: random.Random, max_length: int = 12) -> str:
+    return ''.join(rng.choices(KEY_LETTERS, k=rng.randint(1, max_length)))
+
+
+def texts(seed: int):
+    rng = random.Random(seed)
+    yield from ((text, rng) for text in SPECIAL_TEXTS)
+    for _ in range(CASES):
+        yield random_text(rng), rng
+
+
+def test_framed_columns_round_trip():
+    for text, rng in texts(1):
+        key = random_key(rng)
+        encrypted = transpos.transpos_cols_encrypt(text, key, framed=True)
+        assert transpos.transpos_cols_decrypt(encrypted, key, framed=True) == text, (text, key)
+
+
+def test_framed_double_round_trip():
+    for text, rng in texts(2):
+        key_col, key_row = random_key(rng), random_key(rng, 6)
+        encrypted = transpos.double_transpos_encrypt(text, key_row, key_col, framed=True)
+        assert transpos.double_transpos_decrypt(encrypted, key_row, key_col, framed=True) == text, (text, key_row, key_col)
+
+
+def test_framed_ciphertext_fills_matrix():
+    for text, rng in texts(3):
+        key = random_key(rng)
+        assert len(transpos.transpos_cols_encrypt(text, key, framed=True)) % len(key) == 0
+
+
+def test_unframed_round_trip_strips_trailing_whitespace():
+    for text, rng in texts(4):
+        text = text.replace(transpos.PAD_FILL, '').replace(transpos.PAD_MARK, '')
+        if not text:
+            continue
+        key = random_key(rng)
+        encrypted = transpos.transpos_cols_encrypt(text, key)
+        assert transpos.transpos_cols_decrypt(encrypted, key) == text.rstrip()
+
+
+def test_empty_keys_are_rejected():
+    calls = [
+        lambda: transpos.transpos_cols_encrypt('hello world', ''),
+        lambda: transpos.transpos_cols_decrypt('hello world', ''),
+        lambda: transpos.double_transpos_encrypt('hello world', '', 'KEY'),
+        lambda: transpos.double_transpos_encrypt('hello world', 'ROW', ''),
+        lambda: transpos.double_transpos_decrypt('hello world ', '', 'KEY'),
+        lambda: transpos.double_transpos_decrypt('hello world ', 'ROW', ''),
+        lambda: transpos.transpos_bytes(b'hello world ', 'KEY', key_row=''),
+        lambda: transpos.transpos_bytes(b'hello world ', ''),
+        lambda: transpos.transposition_plan(4, 'KEY', ''),
+    ]
+    for call in calls:
+        with pytest.raises(ValueError):
+            call()
+
+
+def test_columns_match_baseline():
+    for text, key, encrypted_text in COLUMN_CASES:
+        assert transpos.transpos_cols_encrypt(text, key) == encrypted_text, text
+        assert transpos.transpos_cols_decrypt(encrypted_text, key) == text, text
+
+
+def test_double_matches_baseline():
+    for text, key_row, key_col, encrypted_text in DOUBLE_CASES:
+        assert transpos.double_transpos_encrypt(text, key_row, key_col) == encrypted_text, text
+        assert transpos.double_transpos_decrypt(encrypted_text, key_row, key_col) == text, text
+
+
+def test_byte_mode_matches_text_mode():
+    rng = random.Random(4)
+    for _ in range(100):
+        key_col, key_row = random_key(rng), rng.choice([None, random_key(rng)])
+        data = bytes(rng.randrange(256) for _ in range(len(key_col) * rng.randint(0, 20)))
+        text = data.decode('latin-1')
+        if not text:
+            expected = ''
+        elif key_row is None:
+            expected = transpos.transpos_cols_encrypt(text, key_col)
+        else:
+            expected = transpos.double_transpos_encrypt(text, key_row, key_col)
+        encrypted = transpos.transpos_bytes(data, key_col, key_row=key_row)
+        assert encrypted == expected.encode('latin-1'), (key_col, key_row)
+        assert transpos.transpos_bytes(encrypted, key_col, key_row=key_row, decrypt=True) == data
+
+
+def split_chunks(text: str, rng: random.Random) -> list:
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 4))))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_stream_block_mode_round_trip():
+    rng = random.Random(5)
+    for _ in range(CASES):
+        text = random_text(rng)
+        key_col, key_row = random_key(rng, 6), rng.choice([None, random_key(rng, 4)])
+        rows = rng.randint(1, 4)
+        encrypted = ''.join(transpos.transpos_stream_encrypt(split_chunks(text, rng), key_col, key_row, rows))
+        block_size = rows * len(key_col)
+        assert len(encrypted) % block_size == 0 and len(encrypted) > len(text)
+        # Повні блоки шифруються так само, як окремі тексти
+        if len(text) >= block_size:
+            if key_row is None:
+                assert encrypted[:block_size] == transpos.transpos_cols_encrypt(text[:block_size], key_col)
+            else:
+                assert encrypted[:block_size] == transpos.double_transpos_encrypt(text[:block_size], key_row, key_col)
+        decrypted = transpos.transpos_stream_decrypt(split_chunks(encrypted, rng), key_col, key_row, rows)
+        assert ''.join(decrypted) == text, (text, key_col, key_row, rows)
+
+
+def test_stream_block_mode_files(tmp_path):
+    text = 'Attack at dawn!\r\nRetreat at dusk.\n' * 50 + transpos.PAD_MARK
+    (tmp_path / 'plain.txt').write_text(text, encoding='utf-8', newline='')
+    transpos.transpos_path(str(tmp_path / 'plain.txt'), str(tmp_path / 'message.enc'), 'SECRET', 'ROW', rows_per_block=8)
+    source = io.StringIO((tmp_path / 'message.enc').read_bytes().decode('utf-8'), newline='')
+    target = io.StringIO(newline='')
+    transpos.transpos_file(source, target, 'SECRET', 'ROW', decrypt=True, rows_per_block=8, workers=1)
+    assert target.getvalue() == text
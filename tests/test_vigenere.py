@@ -0,0 +1,145 @@
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+vigenere = __import__('1_vigenere')
+
+
+# Шифротексти початкової посимвольної реалізації: (текст, ключ, шифрування, дешифрування)
+BASELINE_CASES = [
+    ('Hello, World! 123', 'KEY', 'RIJVS, UYVJN! 123', 'XANBK, YENNT! 123'),
+    ('The Quick Brown Fox\nJumps over the lazy dog.\t(2024)', 'Lemon',
+     'ELQ EHTGW PEZAZ TBI\nNGACD SHSE ELQ ZNKC PCT.\t(2024)',
+     'IDS CHXYY NEDSB RBM\nFIYCH KJQE IDS XNOU RAT.\t(2024)'),
+    ('Привіт, світе! Café naïve façade', 'Crypto',
+     'EUTEWT, GGBUL! QCWE CTAXV DPXOFV', 'AMXAKR, CYFQZ! OYOI YHYTN HLLMBN'),
+    ('ATTACK AT DAWN', 'k3y!', 'KRDYMI KR NYGL', 'QVJCSM QV TCMP'),
+    ('  ...  ', 'KEY', '  ...  ', '  ...  '),
+    ('ÀÉÎõü Ωμέγα', 'ZEBRA', 'WKMJZ NFIJQ', 'YCKBZ PXGBQ'),
+]
+
+def pairwise_kasiski(text, seq_length=3, max_key_length=20):
+    """Початкова реалізація методу Касіскі: перебір усіх пар повторень"""
+    factor_counts = {}
+    sequences = vigenere.find_repeated_sequences(text, seq_length)
+    for positions in sequences.values():
+        for spacing in vigenere.calculate_spacings(positions):
+            for factor in vigenere.find_factors(spacing, max_key_length):
+                if factor > 1:
+                    factor_counts[factor] = factor_counts.get(factor, 0) + 1
+    possible_lengths = list(factor_counts.items())
+    possible_lengths.sort(key=lambda x: x[1], reverse=True)
+    return possible_lengths
+
+
+def test_kasiski_tie_order_regression():
+    text = ('BDCBCDBBBDACDBDDCACBCBCAACCADCBACABCACABDCCDCBCCAABCABCBDDAAABBDCBCBCBBBDDADBDCBCACCADDBABDCACDCDDBDADAA')
+    assert vigenere.kasiski_examination(text, 2) == pairwise_kasiski(text, 2)
+
+
+def test_first_spacing_pair_scans_all_occurrences():
+    # Входження 0, 1, 3, 4: перша пара з парною відстанню - (0, 3), а не (1, 2)
+    assert vigenere.first_spacing_pair('AA.AA', 'A', 2) == [0, 3]
+
+
+def test_kasiski_matches_pairwise_on_random_text():
+    rng = random.Random(0)
+    for _ in range(300):
+        letters = rng.choice(['AB', 'ABC', 'ABCD', 'ABCDEFGH'])
+        text = ''.join(rng.choices(letters, k=rng.randint(0, 150)))
+        seq_length = rng.randint(2, 4)
+        max_key_length = rng.randint(2, 20)
+        assert vigenere.kasiski_examination(text, seq_length, max_key_length) == pairwise_kasiski(text, seq_length, max_key_length), (text, seq_length)
+
+
+def test_crack_batch_reports_malformed_lines(tmp_path):
+    plain_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plain_text.txt')
+    with open(plain_path, encoding='utf-8') as file:
+        encrypted_text = vigenere.vigenere_encrypt(file.read(2000), 'LEMON')
+    path = tmp_path / 'messages.jsonl'
+    path.write_text(json.dumps({'id': 'a', 'ciphertext': encrypted_text}) + '\n{bad\n[1]\n{"id": "b"}\n', encoding='utf-8')
+    results = list(vigenere.crack_batch(vigenere.read_messages(str(path)), workers=0))
+    assert [result['id'] for result in results] == ['a', 2, 3, 'b']
+    assert results[0]['key'] == 'LEMON'
+    assert results[1]['error'].startswith('JSONDecodeError')
+    assert results[2]['error'] == 'ValueError: Record must be a JSON object'
+    assert results[3]['error'] == "ValueError: Missing field 'ciphertext'"
+
+
+def test_stream_matches_whole_text_when_upper_expands():
+    rng = random.Random(1)
+    for _ in range(500):
+        text = ''.join(rng.choices('abcXYZ ßﬁİŉ.,\n', k=rng.randint(0, 40)))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 5))))
+        chunks = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        assert ''.join(vigenere.vigenere_stream(chunks, 'KEY')) == vigenere.vigenere_encrypt(text, 'KEY'), chunks
+        assert ''.join(vigenere.vigenere_stream(chunks, 'KEY', decrypt=True)) == vigenere.vigenere_decrypt(text, 'KEY'), chunks
+
+
+def test_crack_batch_reports_unreadable_files(tmp_path):
+    plain_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plain_text.txt')
+    with open(plain_path, encoding='utf-8') as file:
+        encrypted_text = vigenere.vigenere_encrypt(file.read(2000), 'LEMON')
+    (tmp_path / 'a.txt').write_text(encrypted_text, encoding='utf-8')
+    (tmp_path / 'b.bin').write_bytes(b'\xff\xfe\x00broken')
+    (tmp_path / 'c.txt').write_text(encrypted_text, encoding='utf-8')
+    for workers in (0, 1):
+        results = list(vigenere.crack_batch(vigenere.read_messages(str(tmp_path)), workers=workers, chunksize=1))
+        assert [result['id'] for result in results] == ['a.txt', 'b.bin', 'c.txt']
+        assert results[0]['key'] == results[2]['key'] == 'LEMON'
+        assert results[1]['error'].startswith("CipherIOError: Cannot decode")
+
+    path = tmp_path / 'messages.jsonl'
+    path.write_bytes(b'{"id": "x", "ciphertext": "\xff"}\n' + json.dumps({'id': 'y', 'ciphertext': encrypted_text}).encode() + b'\n')
+    results = list(vigenere.crack_batch(vigenere.read_messages(str(path)), workers=0))
+    assert results[0]['id'] == 1 and results[0]['error'].startswith('UnicodeDecodeError')
+    assert results[1]['key'] == 'LEMON'
+
+
+def test_shift_tables_do_not_cache_arbitrary_unicode():
+    text = ''.join(map(chr, range(0x4E00, 0x5E00)))
+    encrypted_text = vigenere.vigenere_encrypt(text, 'KEY')
+    assert vigenere.vigenere_decrypt(encrypted_text, 'KEY') == vigenere.vigenere_encrypt(text, 'A')
+    for table in vigenere.LATIN.shift_tables:
+        assert all(code < vigenere.alphabets.CACHED_CODES for code in table)
+
+
+def test_vigenere_matches_baseline_ciphertexts():
+    for text, key, encrypted_text, decrypted_text in BASELINE_CASES:
+        assert vigenere.vigenere_encrypt(text, key) == encrypted_text, text
+        assert vigenere.vigenere_decrypt(text, key) == decrypted_text, text
+        assert ''.join(vigenere.vigenere_stream([text[:5], text[5:]], key)) == encrypted_text, text
+        if text.isascii():
+            # Літери повертаються у верхньому регістрі, решта символів - без змін
+            assert vigenere.vigenere_decrypt(encrypted_text, key) == text.upper(), text
+
+
+def test_byte_mode_round_trips():
+    rng = random.Random(3)
+    data = bytes(rng.randrange(256) for _ in range(10000))
+    key = 'Ключ'
+    shifts = key.encode('utf-8')
+    expected = bytes((byte + shifts[i % len(shifts)]) % 256 for i, byte in enumerate(data))
+    for chunk_size in (1, 7, 64, 1 << 20):
+        assert vigenere.vigenere_bytes(data, key, chunk_size=chunk_size) == expected
+    # Обробка на місці і продовження потоку з позиції position
+    buffer = bytearray(expected)
+    vigenere.vigenere_bytes(buffer[:5000], key, memoryview(buffer)[:5000], decrypt=True)
+    vigenere.vigenere_bytes(memoryview(buffer)[5000:], key, memoryview(buffer)[5000:], decrypt=True, position=5000)
+    assert buffer == data
+
+
+def test_binary_file_and_mapped_path_round_trip(tmp_path):
+    data = bytes(range(256)) * 40 + b'tail'
+    source = tmp_path / 'data.bin'
+    source.write_bytes(data)
+    with open(source, 'rb') as input_file, open(tmp_path / 'stream.enc', 'wb') as output_file:
+        vigenere.vigenere_binary_file(input_file, output_file, b'\x01\xff\x10', chunk_size=1000)
+    vigenere.vigenere_path(str(source), str(tmp_path / 'mapped.enc'), b'\x01\xff\x10', chunk_size=1000, binary=True)
+    assert (tmp_path / 'stream.enc').read_bytes() == (tmp_path / 'mapped.enc').read_bytes()
+    assert (tmp_path / 'mapped.enc').read_bytes() == vigenere.vigenere_bytes(data, b'\x01\xff\x10')
+    vigenere.vigenere_path(str(tmp_path / 'mapped.enc'), str(tmp_path / 'mapped.dec'), b'\x01\xff\x10',
+                           decrypt=True, binary=True)
+    assert (tmp_path / 'mapped.dec').read_bytes() == data